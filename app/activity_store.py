@@ -0,0 +1,163 @@
+import json
+import zlib
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+# Free-text fields holding an activity's body, one per activity type
+BODY_FIELDS = ("body", "call_body", "internal_meeting_notes", "note_body", "task_body")
+
+# Bodies are split into paragraphs so quoted text repeated across an email thread is stored once
+CHUNK_SEPARATOR = "\n\n"
+
+TIMESTAMP_FIELDS = ("sent_at", "createdate", "meeting_start_time", "lastmodifieddate")
+
+# Text search configuration for body chunks and deal search vectors
+SEARCH_CONFIG = "english"
+
+# A deal's search vector merges the vectors of its distinct body chunks, so quoted
+# email text is indexed once per deal; tsvector_agg is created by migration 10
+DEAL_SEARCH_VECTOR = """
+    SELECT tsvector_agg(b.search_vector)
+    FROM activity_bodies b
+    WHERE b.body_hash IN (
+        SELECT jsonb_array_elements_text(refs.value)
+        FROM activities a, jsonb_each(a.body_refs) refs
+        WHERE a.deal_id = deals.deal_id
+    )
+"""
+
+def sort_activities_chronologically(activities: List[Dict]) -> List[Dict]:
+    """Sort activities by timestamp"""
+    def get_timestamp(activity):
+        for field in TIMESTAMP_FIELDS:
+            if field in activity and activity[field]:
+                try:
+                    timestamp_str = activity[field]
+                    if isinstance(timestamp_str, str):
+                        # Handle various timestamp formats
+                        timestamp_str = timestamp_str.replace('Z', '+00:00')
+                        return datetime.fromisoformat(timestamp_str)
+                except:
+                    continue
+
+        return datetime.min.replace(tzinfo=timezone.utc)
+
+    return sorted(activities, key=get_timestamp)
+
+def chunk_hash(chunk: str) -> str:
+    """Content address of a body chunk"""
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+def compress_chunk(chunk: str) -> bytes:
+    """Compress a body chunk for storage"""
+    return zlib.compress(chunk.encode("utf-8"), 6)
+
+def decompress_chunk(data: bytes) -> str:
+    """Decompress a stored body chunk"""
+    return zlib.decompress(data).decode("utf-8")
+
+def pack_activity(activity: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]], Dict[str, str]]:
+    """Split an activity into metadata, body chunk references and the chunks themselves"""
+    metadata = {}
+    body_refs = {}
+    chunks = {}
+
+    for key, value in activity.items():
+        if key in BODY_FIELDS and isinstance(value, str) and value:
+            refs = []
+            for chunk in value.split(CHUNK_SEPARATOR):
+                digest = chunk_hash(chunk)
+                chunks[digest] = chunk
+                refs.append(digest)
+            body_refs[key] = refs
+        else:
+            metadata[key] = value
+
+    return metadata, body_refs, chunks
+
+def unpack_activity(metadata: Dict[str, Any], body_refs: Dict[str, List[str]],
+                    chunks: Dict[str, str]) -> Dict[str, Any]:
+    """Rebuild an activity from its metadata and body chunks"""
+    activity = dict(metadata)
+    for field, refs in body_refs.items():
+        activity[field] = CHUNK_SEPARATOR.join(chunks[digest] for digest in refs)
+    return activity
+
+async def store_deal_activities(connection, deal_id: str, activities: List[Dict[str, Any]],
+                                index_search: bool = True):
+    """Replace a deal's activities, storing each distinct body chunk once.
+
+    Must run inside a transaction. Activities are stored in chronological
+    order, so readers get them sorted by seq. index_search is off only for
+    migrations that run before the search columns exist.
+    """
+    rows = []
+    all_chunks = {}
+    for seq, activity in enumerate(sort_activities_chronologically(activities)):
+        metadata, body_refs, chunks = pack_activity(activity)
+        all_chunks.update(chunks)
+        rows.append((deal_id, seq, activity.get("activity_type"), json.dumps(metadata), json.dumps(body_refs)))
+
+    if all_chunks:
+        # Skip chunks already stored before paying for compression
+        existing = await connection.fetch("""
+            SELECT body_hash FROM activity_bodies WHERE body_hash = ANY($1::text[])
+        """, list(all_chunks))
+        stored = {row['body_hash'] for row in existing}
+        new_chunks = [(digest, compress_chunk(chunk), len(chunk), chunk)
+                      for digest, chunk in all_chunks.items() if digest not in stored]
+        if new_chunks and index_search:
+            await connection.executemany(f"""
+                INSERT INTO activity_bodies (body_hash, body, size, search_vector)
+                VALUES ($1, $2, $3, to_tsvector('{SEARCH_CONFIG}', $4))
+                ON CONFLICT (body_hash) DO NOTHING
+            """, new_chunks)
+        elif new_chunks:
+            await connection.executemany("""
+                INSERT INTO activity_bodies (body_hash, body, size)
+                VALUES ($1, $2, $3)
+                ON CONFLICT (body_hash) DO NOTHING
+            """, [chunk[:3] for chunk in new_chunks])
+
+    await connection.execute("DELETE FROM activities WHERE deal_id = $1", deal_id)
+    if rows:
+        await connection.executemany("""
+            INSERT INTO activities (deal_id, seq, activity_type, metadata, body_refs)
+            VALUES ($1, $2, $3, $4, $5)
+        """, rows)
+
+    # Touching the deal row rolls its version, so cached views and ETags are refreshed
+    search_vector = f", search_vector = ({DEAL_SEARCH_VECTOR})" if index_search else ""
+    await connection.execute(f"""
+        UPDATE deals SET activity_count = $2{search_vector} WHERE deal_id = $1
+    """, deal_id, len(rows))
+
+async def load_deal_activities(connection, deal_ids: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Load activities for deals in seq order, with bodies reassembled"""
+    rows = await connection.fetch("""
+        SELECT deal_id, metadata, body_refs
+        FROM activities
+        WHERE deal_id = ANY($1::text[])
+        ORDER BY deal_id, seq
+    """, list(deal_ids))
+
+    parsed = []
+    wanted = set()
+    for row in rows:
+        body_refs = json.loads(row['body_refs'])
+        for refs in body_refs.values():
+            wanted.update(refs)
+        parsed.append((row['deal_id'], json.loads(row['metadata']), body_refs))
+
+    chunks = {}
+    if wanted:
+        chunk_rows = await connection.fetch("""
+            SELECT body_hash, body FROM activity_bodies WHERE body_hash = ANY($1::text[])
+        """, list(wanted))
+        chunks = {row['body_hash']: decompress_chunk(row['body']) for row in chunk_rows}
+
+    activities = {}
+    for deal_id, metadata, body_refs in parsed:
+        activities.setdefault(deal_id, []).append(unpack_activity(metadata, body_refs, chunks))
+    return activities
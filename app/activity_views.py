@@ -0,0 +1,69 @@
+from typing import Any, Dict, List, Optional
+
+from .activity_store import TIMESTAMP_FIELDS
+
+ACTIVITY_ICONS = {"email": "📧", "call": "📞", "meeting": "🤝", "note": "📝", "task": "✅"}
+
+# Per activity type: title label, title field, body field and the text shown without a body
+ACTIVITY_FIELDS = {
+    "email": ("Subject", "subject", "body", "No email content available"),
+    "call": ("Call", "call_title", "call_body", "No call notes available"),
+    "meeting": ("Meeting", "meeting_title", "internal_meeting_notes", "No meeting notes available"),
+    "note": (None, None, "note_body", "No note content available"),
+    "task": ("Task", "task_subject", "task_body", "No task description available")
+}
+
+def activity_timestamp(activity: Dict[str, Any]) -> Optional[str]:
+    """First timestamp of the activity as 'YYYY-MM-DD HH:MM:SS'"""
+    for field in TIMESTAMP_FIELDS:
+        if activity.get(field):
+            return str(activity[field])[:19].replace("T", " ")
+    return None
+
+def activity_tags(activity: Dict[str, Any]) -> List[str]:
+    """Metadata badges shown under an activity"""
+    tags = []
+    direction = activity.get("direction")
+    if direction:
+        arrow = "⬆️" if direction.lower() in ("outgoing", "outbound") else "⬇️"
+        tags.append(f"{arrow} {direction.title()}")
+    if activity.get("call_duration"):
+        tags.append(f"⏱️ {activity['call_duration']} min")
+    call_direction = activity.get("call_direction")
+    if call_direction:
+        tags.append(f"{'📤' if call_direction.upper() == 'OUTBOUND' else '📥'} {call_direction.title()}")
+    call_status = activity.get("call_status")
+    if call_status:
+        tags.append(f"{'✅' if call_status.upper() == 'COMPLETED' else '⚠️'} {call_status.title()}")
+    task_status = activity.get("task_status")
+    if task_status:
+        mark = "✅" if "complete" in task_status.lower() else "⏳"
+        tags.append(f"{mark} {task_status.title().replace('_', ' ')}")
+    priority = activity.get("task_priority")
+    if priority and priority != "NONE":
+        if priority.upper() == "HIGH":
+            tags.append("🔴 High Priority")
+        elif priority.upper() == "MEDIUM":
+            tags.append("🟡 Medium Priority")
+        else:
+            tags.append(f"🟢 {priority.title()} Priority")
+    if activity.get("meeting_outcome"):
+        tags.append(f"📊 {activity['meeting_outcome'].title()}")
+    return tags
+
+def activity_view(activity: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything activities.html shows for an activity, worked out once per deal instead of per render"""
+    activity_type = activity.get("activity_type") or ""
+    title_label, title_field, body_field, empty_text = ACTIVITY_FIELDS.get(activity_type, (None, None, None, None))
+    return {
+        "type": activity_type,
+        "icon": ACTIVITY_ICONS.get(activity_type, ""),
+        "label": activity_type.upper(),
+        "timestamp": activity_timestamp(activity),
+        "title_label": title_label,
+        "title": activity.get(title_field) if title_field else None,
+        "location": activity.get("meeting_location") if activity_type == "meeting" else None,
+        "body": activity.get(body_field) if body_field else None,
+        "empty_text": empty_text,
+        "tags": activity_tags(activity)
+    }
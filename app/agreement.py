@@ -0,0 +1,107 @@
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .models import RATING_FIELDS
+from .analytics import json_number
+
+AGREEMENT_CONFIDENCE_BINS = 10
+
+SCORES = np.arange(1, 6)
+
+def build_agreement_report(rows: List[Any], bins: int = AGREEMENT_CONFIDENCE_BINS) -> Dict[str, Any]:
+    """Assemble the LLM-vs-human report from grouped rating counts.
+
+    Each row is one (overall_sentiment, confidence_bin, field, score) group with
+    its rating count and the sums of LLM confidence, sentiment_score and
+    sentiment_score squared over those ratings. Everything below is a
+    reduction of the resulting (sentiment x bin x field x score) arrays.
+    """
+    sentiments = sorted({row['overall_sentiment'] for row in rows})
+    sentiment_index = {sentiment: i for i, sentiment in enumerate(sentiments)}
+    field_index = {field: i for i, field in enumerate(RATING_FIELDS)}
+
+    shape = (len(sentiments), bins, len(RATING_FIELDS), len(SCORES))
+    counts = np.zeros(shape)
+    confidence_sums = np.zeros(shape)
+    sentiment_sums = np.zeros(shape)
+    sentiment_squares = np.zeros(shape)
+    for row in rows:
+        if row['field'] not in field_index or not 1 <= row['score'] <= 5:
+            continue
+        cell = (sentiment_index[row['overall_sentiment']], row['confidence_bin'],
+                field_index[row['field']], row['score'] - 1)
+        counts[cell] += row['ratings']
+        confidence_sums[cell] += row['confidence_sum']
+        sentiment_sums[cell] += row['sentiment_score_sum']
+        sentiment_squares[cell] += row['sentiment_score_squares']
+
+    score_sums = counts * SCORES
+
+    def mean(numerator, denominator):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return numerator / denominator
+
+    # Calibration: LLM confidence bin against the human scores given in it
+    bin_counts = counts.sum(axis=(0, 2, 3))
+    bin_means = mean(score_sums.sum(axis=(0, 2, 3)), bin_counts)
+    bin_field_means = mean(score_sums.sum(axis=(0, 3)), counts.sum(axis=(0, 3)))
+    bin_confidence = mean(confidence_sums.sum(axis=(0, 2, 3)), bin_counts)
+    calibration = [
+        {
+            "confidence_range": [round(b / bins, 3), round((b + 1) / bins, 3)],
+            "ratings": int(bin_counts[b]),
+            "mean_llm_confidence": json_number(bin_confidence[b]),
+            "mean_human_score": json_number(bin_means[b]),
+            # Human score on the LLM confidence scale, so a calibrated model lies on the diagonal
+            "normalized_human_score": json_number((bin_means[b] - 1) / 4),
+            "field_mean_scores": {field: json_number(bin_field_means[b, f]) for f, field in enumerate(RATING_FIELDS)}
+        }
+        for b in range(bins)
+    ]
+
+    # Per field: score distribution and correlation of human score with LLM sentiment_score
+    field_counts = counts.sum(axis=(0, 1))
+    field_n = field_counts.sum(axis=1)
+    x_sum = sentiment_sums.sum(axis=(0, 1))
+    x_squares = sentiment_squares.sum(axis=(0, 1)).sum(axis=1)
+    y_sum = (field_counts * SCORES).sum(axis=1)
+    y_squares = (field_counts * SCORES ** 2).sum(axis=1)
+    xy_sum = (x_sum * SCORES).sum(axis=1)
+    x_sum = x_sum.sum(axis=1)
+    covariance = field_n * xy_sum - x_sum * y_sum
+    correlation = mean(covariance, np.sqrt((field_n * x_squares - x_sum ** 2) * (field_n * y_squares - y_sum ** 2)))
+    fields = {
+        field: {
+            "ratings": int(field_n[f]),
+            "distribution": {str(score): int(field_counts[f, score - 1]) for score in SCORES},
+            "mean_score": json_number(mean(y_sum[f], field_n[f])),
+            "sentiment_score_correlation": json_number(correlation[f])
+        }
+        for f, field in enumerate(RATING_FIELDS)
+    }
+
+    # Per LLM overall_sentiment label
+    label_counts = counts.sum(axis=1)
+    by_sentiment = {}
+    for s, sentiment in enumerate(sentiments):
+        ratings = label_counts[s].sum()
+        by_sentiment[sentiment] = {
+            "ratings": int(ratings),
+            "mean_llm_confidence": json_number(mean(confidence_sums[s].sum(), ratings)),
+            "mean_sentiment_score": json_number(mean(sentiment_sums[s].sum(), ratings)),
+            "field_mean_scores": {
+                field: json_number(mean((label_counts[s, f] * SCORES).sum(), label_counts[s, f].sum()))
+                for f, field in enumerate(RATING_FIELDS)
+            },
+            "overall_sentiment_distribution": {
+                str(score): int(label_counts[s, field_index["overall_sentiment"], score - 1]) for score in SCORES
+            }
+        }
+
+    return {
+        "ratings": int(counts.sum()),
+        "calibration": calibration,
+        "fields": fields,
+        "by_overall_sentiment": by_sentiment
+    }
@@ -0,0 +1,287 @@
+import os
+import math
+import time
+import asyncio
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .models import RATING_FIELDS
+
+# Seconds between reads of new annotations for a campaign
+ANALYTICS_REFRESH_INTERVAL = float(os.getenv("ANALYTICS_REFRESH_INTERVAL", 10))
+
+# updated_at is stamped when a flush transaction starts, so rows committed late can land
+# behind the watermark; re-reading a short window before it catches them
+ANALYTICS_WATERMARK_OVERLAP = timedelta(seconds=int(os.getenv("ANALYTICS_WATERMARK_OVERLAP", 300)))
+
+# Annotators need this many annotations before they are flagged
+MIN_FLAG_ANNOTATIONS = 10
+STRAIGHT_LINING_SHARE = 0.3
+SPEED_OUTLIER_Z = 3.5
+BIAS_THRESHOLD = 0.75
+
+# Turns a median absolute deviation into a standard deviation estimate for normal data
+MAD_SCALE = 1.4826
+
+class AnnotationMatrix:
+    """Columnar copy of a campaign's annotations, updated in place from changed rows.
+
+    Rows are keyed by annotation id, so a resubmitted annotation overwrites
+    its row. Scores and confidences are (rows x fields) float arrays with NaN
+    for unrated fields.
+    """
+
+    COLUMNS = ("ids", "users", "deals", "time_spent", "scores", "confidences")
+
+    def __init__(self, capacity: int = 1024):
+        field_count = len(RATING_FIELDS)
+        self.size = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.users = np.zeros(capacity, dtype=np.int32)
+        self.deals = np.zeros(capacity, dtype=np.int32)
+        self.time_spent = np.zeros(capacity, dtype=np.float64)
+        self.scores = np.full((capacity, field_count), np.nan, dtype=np.float32)
+        self.confidences = np.full((capacity, field_count), np.nan, dtype=np.float32)
+
+        self.user_emails: List[str] = []
+        self.user_index: Dict[str, int] = {}
+        self.deal_index: Dict[str, int] = {}
+        self.row_by_id: Dict[int, int] = {}
+        self.updated_at_by_id: Dict[int, Any] = {}
+        self.watermark = None
+        self.version = 0
+
+    def _grow(self, needed: int):
+        capacity = len(self.ids)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self.COLUMNS:
+            old = getattr(self, name)
+            new = np.full((capacity,) + old.shape[1:], np.nan if old.dtype.kind == "f" else 0, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def _user(self, email: str) -> int:
+        index = self.user_index.get(email)
+        if index is None:
+            index = self.user_index[email] = len(self.user_emails)
+            self.user_emails.append(email)
+        return index
+
+    def _deal(self, deal_id: str) -> int:
+        index = self.deal_index.get(deal_id)
+        if index is None:
+            index = self.deal_index[deal_id] = len(self.deal_index)
+        return index
+
+    def upsert(self, rows: List[Any]):
+        """Add or replace annotation rows (id, user_email, deal_id, time_spent_seconds, updated_at, scores, confidences).
+
+        Rows already held at the same updated_at, as re-read by the watermark overlap, are skipped,
+        so version only changes when the data does.
+        """
+        rows = [row for row in rows if self.updated_at_by_id.get(row['id']) != row['updated_at']]
+        if not rows:
+            return
+        positions = np.empty(len(rows), dtype=np.int64)
+        added = 0
+        for i, row in enumerate(rows):
+            position = self.row_by_id.get(row['id'])
+            if position is None:
+                position = self.row_by_id[row['id']] = self.size + added
+                added += 1
+            positions[i] = position
+            self.updated_at_by_id[row['id']] = row['updated_at']
+
+        self._grow(self.size + added)
+        self.ids[positions] = [row['id'] for row in rows]
+        self.users[positions] = [self._user(row['user_email']) for row in rows]
+        self.deals[positions] = [self._deal(row['deal_id']) for row in rows]
+        self.time_spent[positions] = [row['time_spent_seconds'] for row in rows]
+        self.scores[positions] = np.array([row['scores'] for row in rows], dtype=np.float32)
+        self.confidences[positions] = np.array([row['confidences'] for row in rows], dtype=np.float32)
+
+        self.size += added
+        latest = max(row['updated_at'] for row in rows)
+        if self.watermark is None or latest > self.watermark:
+            self.watermark = latest
+        self.version += 1
+
+def group_percentiles(groups: np.ndarray, values: np.ndarray, group_count: int,
+                      quantiles: List[float]) -> np.ndarray:
+    """Per-group quantiles (lower interpolation) via one sort, returns (quantiles x groups)"""
+    counts = np.bincount(groups, minlength=group_count)
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    result = np.full((len(quantiles), group_count), np.nan)
+    present = counts > 0
+    for i, q in enumerate(quantiles):
+        offsets = np.floor(q * (counts[present] - 1)).astype(np.int64)
+        result[i, present] = sorted_values[starts[present] + offsets]
+    return result
+
+def group_mean(groups: np.ndarray, values: np.ndarray, group_count: int) -> np.ndarray:
+    """Per-group mean ignoring NaN, NaN for empty groups"""
+    valid = ~np.isnan(values)
+    sums = np.bincount(groups[valid], weights=values[valid], minlength=group_count)
+    counts = np.bincount(groups[valid], minlength=group_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts
+
+def group_field_sums(groups: np.ndarray, values: np.ndarray, group_count: int) -> tuple:
+    """Per-group, per-field sums and counts of a (rows x fields) array ignoring NaN"""
+    field_count = values.shape[1]
+    valid = ~np.isnan(values)
+    cells = (groups[:, None] * field_count + np.arange(field_count))[valid]
+    sums = np.bincount(cells, weights=values[valid], minlength=group_count * field_count)
+    counts = np.bincount(cells, minlength=group_count * field_count)
+    return sums.reshape(group_count, field_count), counts.reshape(group_count, field_count)
+
+def consensus_residuals(deals: np.ndarray, scores: np.ndarray, deal_count: int) -> np.ndarray:
+    """Each score minus the mean of the other annotators' scores for the same deal and field"""
+    valid = ~np.isnan(scores)
+    sums, counts = group_field_sums(deals, scores, deal_count)
+
+    # Leave-one-out so an annotator's own score does not pull the consensus towards it
+    other_sums = sums[deals] - np.where(valid, scores, 0)
+    other_counts = counts[deals] - valid
+    with np.errstate(invalid="ignore", divide="ignore"):
+        residuals = scores - other_sums / other_counts
+    residuals[other_counts < 1] = np.nan
+    return residuals
+
+def json_number(value: float, digits: int = 3) -> Optional[float]:
+    """Round a float for JSON, NaN becomes None"""
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+def annotator_report(matrix: AnnotationMatrix) -> Dict[str, Any]:
+    """Time distributions, straight-lining, speed outliers and consensus bias per annotator"""
+    n = matrix.size
+    user_count = len(matrix.user_emails)
+    users = matrix.users[:n]
+    time_spent = matrix.time_spent[:n]
+    scores = matrix.scores[:n]
+    counts = np.bincount(users, minlength=user_count)
+
+    # Time spent per annotation
+    p10, median, p90 = group_percentiles(users, time_spent, user_count, [0.1, 0.5, 0.9])
+    mean_time = group_mean(users, time_spent, user_count)
+
+    # Straight-lining: every field rated, all with the same score
+    complete = ~np.isnan(scores).any(axis=1)
+    straight = complete & (scores.max(axis=1) == scores.min(axis=1))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        straight_share = (np.bincount(users, weights=straight, minlength=user_count)
+                          / np.bincount(users, weights=complete, minlength=user_count))
+
+    # Speed: robust z-scores of log time, per annotation and per annotator median
+    log_time = np.log(np.maximum(time_spent, 1.0))
+    center = np.median(log_time) if n else np.nan
+    spread = MAD_SCALE * np.median(np.abs(log_time - center)) if n else np.nan
+    spread = spread if spread > 0 else 1.0
+    fast = (log_time - center) / spread < -SPEED_OUTLIER_Z
+    fast_share = np.bincount(users, weights=fast, minlength=user_count) / np.maximum(counts, 1)
+    speed_z = (np.log(np.maximum(median, 1.0)) - center) / spread
+
+    # Bias against the consensus of the other annotators
+    residuals = consensus_residuals(matrix.deals[:n], scores, len(matrix.deal_index))
+    residual_sums, residual_counts = group_field_sums(users, residuals, user_count)
+    deviation_sums, _ = group_field_sums(users, np.abs(residuals), user_count)
+    confidence_sums, confidence_counts = group_field_sums(users, matrix.confidences[:n], user_count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        field_bias = residual_sums / residual_counts
+        bias = residual_sums.sum(axis=1) / residual_counts.sum(axis=1)
+        deviation = deviation_sums.sum(axis=1) / residual_counts.sum(axis=1)
+        mean_confidence = confidence_sums.sum(axis=1) / confidence_counts.sum(axis=1)
+
+    annotators = []
+    for u, email in enumerate(matrix.user_emails):
+        flags = []
+        if counts[u] >= MIN_FLAG_ANNOTATIONS:
+            if straight_share[u] > STRAIGHT_LINING_SHARE:
+                flags.append("straight_lining")
+            if speed_z[u] < -SPEED_OUTLIER_Z:
+                flags.append("fast")
+            if abs(bias[u]) > BIAS_THRESHOLD:
+                flags.append("biased")
+        annotators.append({
+            "user_email": email,
+            "annotations": int(counts[u]),
+            "time_spent": {
+                "mean": json_number(mean_time[u]),
+                "p10": json_number(p10[u]),
+                "median": json_number(median[u]),
+                "p90": json_number(p90[u])
+            },
+            "straight_lining_share": json_number(straight_share[u]),
+            "fast_share": json_number(fast_share[u]),
+            "speed_z": json_number(speed_z[u]),
+            "bias": json_number(bias[u]),
+            "mean_abs_deviation": json_number(deviation[u]),
+            "field_bias": {field: json_number(field_bias[u, f]) for f, field in enumerate(RATING_FIELDS)},
+            "mean_confidence": json_number(mean_confidence[u]),
+            "flags": flags
+        })
+
+    return {
+        "annotations": n,
+        "median_time_spent": json_number(np.exp(center)) if n else None,
+        "watermark": matrix.watermark.isoformat() if matrix.watermark else None,
+        "annotators": annotators,
+        "flagged": [annotator["user_email"] for annotator in annotators if annotator["flags"]]
+    }
+
+class AnnotatorAnalytics:
+    """Per-campaign annotation matrices with cached reports.
+
+    A refresh reads only annotations updated since the last one; the report
+    is recomputed only when the matrix changed.
+    """
+
+    def __init__(self, refresh_interval: float = ANALYTICS_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.matrices: Dict[str, AnnotationMatrix] = {}
+        self.reports: Dict[str, tuple] = {}
+        self._refreshed_at: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def refresh(self, campaign_id: str, db):
+        """Pull annotations changed since the watermark, reloading when rows were deleted"""
+        matrix = self.matrices.get(campaign_id)
+        since = matrix.watermark - ANALYTICS_WATERMARK_OVERLAP if matrix and matrix.watermark else None
+        total, rows = await db.get_annotation_rows(campaign_id, since)
+        if matrix is not None:
+            await asyncio.to_thread(matrix.upsert, rows)
+        if matrix is None or matrix.size != total:
+            previous = matrix
+            matrix = AnnotationMatrix()
+            if since is not None:
+                total, rows = await db.get_annotation_rows(campaign_id)
+            await asyncio.to_thread(matrix.upsert, rows)
+            if previous is not None:
+                # Versions keep rising across rebuilds so a report cached for the old matrix is never reused
+                matrix.version = previous.version + 1
+            self.matrices[campaign_id] = matrix
+        self._refreshed_at[campaign_id] = time.monotonic()
+
+    async def get_report(self, campaign_id: str, db) -> Dict[str, Any]:
+        """Get the analytics report of a campaign"""
+        lock = self._locks.setdefault(campaign_id, asyncio.Lock())
+        async with lock:
+            if time.monotonic() - self._refreshed_at.get(campaign_id, -math.inf) >= self.refresh_interval:
+                await self.refresh(campaign_id, db)
+
+            matrix = self.matrices[campaign_id]
+            cached = self.reports.get(campaign_id)
+            if cached is None or cached[0] != matrix.version:
+                report = await asyncio.to_thread(annotator_report, matrix)
+                cached = self.reports[campaign_id] = (matrix.version, report)
+            return cached[1]
+
+annotator_analytics = AnnotatorAnalytics()
@@ -0,0 +1,130 @@
+import os
+import sys
+import gzip
+import json
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/archive")
+
+async def find_archivable_deals(connection, target: Optional[int] = None) -> List[str]:
+    """Get deals that reached their campaign's target, plus archived deals with late annotations still hot.
+
+    Gold deals stay hot so annotator accuracy can be rescored when their expected ratings change.
+    """
+    rows = await connection.fetch("""
+        SELECT a.deal_id
+        FROM annotations a
+        JOIN deals d ON d.deal_id = a.deal_id
+        JOIN campaigns c ON c.campaign_id = d.campaign_id
+        JOIN deal_progress p ON p.deal_id = a.deal_id
+        WHERE a.archived = FALSE AND p.gold = FALSE
+        GROUP BY a.deal_id, d.archived_at, c.target_annotations_per_deal
+        HAVING COUNT(*) >= COALESCE($1, c.target_annotations_per_deal) OR d.archived_at IS NOT NULL
+        ORDER BY a.deal_id
+    """, target)
+    return [row['deal_id'] for row in rows]
+
+def write_archive_file(archive_dir: str, deals: Dict[str, List[Dict[str, Any]]]) -> str:
+    """Write annotations of archived deals as gzipped JSON lines, one deal per line"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"annotations-{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz")
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for deal_id, annotations in deals.items():
+            f.write(json.dumps({"deal_id": deal_id, "annotations": annotations}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    return path
+
+async def archive_completed_deals(connection, target: Optional[int] = None,
+                                  archive_dir: str = ARCHIVE_DIR, purge: bool = False,
+                                  dry_run: bool = False) -> Dict[str, Any]:
+    """Move completed deals and their annotations out of the hot partition.
+
+    Runs in one transaction holding the deals' progress row locks, which
+    flushes take before writing annotations, so every row moved or deleted
+    is the one written to the compressed archive file. The file is durable
+    before the transaction commits.
+    """
+    if dry_run:
+        deal_ids = await find_archivable_deals(connection, target)
+        return {"deals": len(deal_ids), "annotations": 0, "file": None}
+
+    async with connection.transaction():
+        deal_ids = await find_archivable_deals(connection, target)
+        locked = await connection.fetch("""
+            SELECT deal_id FROM deal_progress
+            WHERE deal_id = ANY($1::text[]) AND gold = FALSE
+            ORDER BY deal_id
+            FOR UPDATE
+        """, deal_ids)
+        deal_ids = [row['deal_id'] for row in locked]
+        result = {"deals": len(deal_ids), "annotations": 0, "file": None}
+        if not deal_ids:
+            return result
+
+        if purge:
+            rows = await connection.fetch("""
+                DELETE FROM annotations WHERE archived = FALSE AND deal_id = ANY($1::text[])
+                RETURNING deal_id, user_email, campaign_id, ratings, time_spent_seconds, created_at, updated_at
+            """, deal_ids)
+        else:
+            # Updating the partition key moves the rows into annotations_archived
+            rows = await connection.fetch("""
+                UPDATE annotations SET archived = TRUE
+                WHERE archived = FALSE AND deal_id = ANY($1::text[])
+                RETURNING deal_id, user_email, campaign_id, ratings, time_spent_seconds, created_at, updated_at
+            """, deal_ids)
+        await connection.execute("""
+            UPDATE deals SET archived_at = CURRENT_TIMESTAMP
+            WHERE deal_id = ANY($1::text[]) AND archived_at IS NULL
+        """, deal_ids)
+        await connection.execute("""
+            UPDATE deal_progress SET archived = TRUE WHERE deal_id = ANY($1::text[])
+        """, deal_ids)
+
+        deals = {}
+        for row in sorted(rows, key=lambda row: (row['deal_id'], row['user_email'])):
+            deals.setdefault(row['deal_id'], []).append({
+                "user_email": row['user_email'],
+                "campaign_id": row['campaign_id'],
+                "ratings": json.loads(row['ratings']),
+                "time_spent_seconds": row['time_spent_seconds'],
+                "created_at": row['created_at'].isoformat(),
+                "updated_at": row['updated_at'].isoformat()
+            })
+
+        # A failed write rolls the transaction back; a failed commit leaves a file whose rows are archived again next run
+        result["file"] = await asyncio.to_thread(write_archive_file, archive_dir, deals)
+        result["annotations"] = len(rows)
+
+    return result
+
+async def main(argv: List[str]) -> int:
+    from .database import db_manager
+
+    purge = "--purge" in argv
+    dry_run = "--dry-run" in argv
+    unknown = [arg for arg in argv if arg not in ("--purge", "--dry-run")]
+    if unknown:
+        print(f"Unknown arguments: {' '.join(unknown)} (expected --dry-run and/or --purge)")
+        return 2
+
+    connection = await db_manager.connect()
+    try:
+        result = await archive_completed_deals(connection, purge=purge, dry_run=dry_run)
+    finally:
+        await connection.close()
+
+    if dry_run:
+        print(f"{result['deals']} deals would be archived")
+    elif result["file"]:
+        action = "Purged" if purge else "Archived"
+        print(f"{action} {result['annotations']} annotations from {result['deals']} deals to {result['file']}")
+    else:
+        print("No deals to archive")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
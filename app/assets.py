@@ -0,0 +1,82 @@
+import os
+import json
+import hashlib
+from typing import Dict
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+from starlette.types import Scope
+
+STATIC_DIR = "app/static"
+STATIC_URL_PREFIX = "/static"
+
+# Fingerprinted assets never change under the same URL, so browsers may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Files served from their own route, so never precached from the static mount
+PRECACHE_EXCLUDED = {"js/sw.js"}
+
+class AssetManifest:
+    """Content hashes for static files, used to build cache-busting URLs"""
+
+    def __init__(self, static_dir: str = STATIC_DIR):
+        self.static_dir = static_dir
+        self.hashes: Dict[str, str] = {}
+        self.version = ""
+
+    def build(self):
+        """Hash every static file"""
+        hashes = {}
+        for root, _, files in os.walk(self.static_dir):
+            for name in files:
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, self.static_dir).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    hashes[rel_path] = hashlib.sha256(f.read()).hexdigest()[:12]
+
+        self.hashes = dict(sorted(hashes.items()))
+        self.version = hashlib.sha256(json.dumps(self.hashes).encode()).hexdigest()[:12]
+
+    def url(self, path: str) -> str:
+        """Get the fingerprinted URL for a static file"""
+        path = path.lstrip("/")
+        content_hash = self.hashes.get(path)
+        if not content_hash:
+            return f"{STATIC_URL_PREFIX}/{path}"
+        return f"{STATIC_URL_PREFIX}/{path}?v={content_hash}"
+
+    def precache_urls(self):
+        """Get fingerprinted URLs of the files the service worker precaches"""
+        return [self.url(path) for path in self.hashes if path not in PRECACHE_EXCLUDED]
+
+class VersionedStaticFiles(StaticFiles):
+    """Static files with immutable caching for fingerprinted URLs"""
+
+    def __init__(self, *args, manifest: AssetManifest, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.manifest = manifest
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code not in (200, 304):
+            return response
+
+        query = scope.get("query_string", b"").decode()
+        expected = self.manifest.hashes.get(path.replace(os.sep, "/"))
+        if expected and f"v={expected}" in query.split("&"):
+            response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+def render_service_worker(manifest: AssetManifest) -> str:
+    """Render the service worker with the current cache version and precache list"""
+    with open(os.path.join(manifest.static_dir, "js", "sw.js"), "r", encoding="utf-8") as f:
+        script = f.read()
+    return (script
+            .replace("__CACHE_VERSION__", manifest.version)
+            .replace("__PRECACHE_URLS__", json.dumps(manifest.precache_urls())))
+
+# Global asset manifest, built once at startup
+asset_manifest = AssetManifest()
+asset_manifest.build()
@@ -1,65 +1,251 @@
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
 from jose import JWTError, jwt
-from fastapi import HTTPException, Cookie, Depends
+from fastapi import HTTPException, Cookie, Request
+from starlette.responses import Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import os
+import hmac
+import time
+import asyncio
+import hashlib
+import secrets
 from dotenv import load_dotenv
 
+from .cache import TTLCache
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_HOURS = 1
+
+def load_signing_keys() -> List[Tuple[str, str]]:
+    """(key id, secret) pairs from SESSION_KEYS as 'kid:secret,...', newest first, or SECRET_KEY alone"""
+    keys = []
+    for item in os.getenv("SESSION_KEYS", "").split(","):
+        kid, _, secret = item.strip().partition(":")
+        if kid and secret:
+            keys.append((kid, secret))
+    return keys or [("default", SECRET_KEY)]
+
+# Tokens are signed with the first key and verified with any, so keys can be rotated without logging anyone out
+SIGNING_KEYS = load_signing_keys()
+KEYS_BY_ID = dict(SIGNING_KEYS)
+
+# Sessions end after this long without a request
+ACCESS_TOKEN_EXPIRE_HOURS = int(os.getenv("SESSION_IDLE_HOURS", 24))
+
+# Tokens older than this are reissued on the next request, once the user is confirmed to still exist
+SESSION_RENEW_MINUTES = int(os.getenv("SESSION_RENEW_MINUTES", 60))
+
+# No session outlives this, however active
+SESSION_MAX_DAYS = int(os.getenv("SESSION_MAX_DAYS", 7))
+
+ADMIN_SESSION_HOURS = int(os.getenv("ADMIN_SESSION_HOURS", 1))
+ADMIN_SUBJECT = "admin"
+
+# Seconds between reloads of the revocation list in each worker
+SESSION_REVOCATION_REFRESH = float(os.getenv("SESSION_REVOCATION_REFRESH", 5))
+
+# Claims of recently verified tokens, so repeat requests skip the signature check
+verified_tokens = TTLCache(max_size=10000, ttl_seconds=60)
+
+class SessionRevocations:
+    """Revoked session ids and per-subject cutoffs, reloaded from the database every few seconds"""
+
+    def __init__(self, refresh_seconds: float = SESSION_REVOCATION_REFRESH):
+        self.refresh_seconds = refresh_seconds
+        self.session_ids: Set[str] = set()
+        self.subjects: Dict[str, float] = {}
+        self.loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def is_revoked(self, claims: Dict[str, Any]) -> bool:
+        """Whether the session was revoked, or its subject's sessions were after it started"""
+        if claims.get("sid") in self.session_ids:
+            return True
+        cutoff = self.subjects.get(claims["sub"])
+        return cutoff is not None and claims.get("auth_time", claims.get("iat", 0)) <= cutoff
+
+    def add(self, session_id: Optional[str] = None, subject: Optional[str] = None,
+            revoked_before: Optional[float] = None):
+        """Apply a revocation in this worker right away"""
+        if session_id:
+            self.session_ids.add(session_id)
+        if subject:
+            self.subjects[subject] = max(self.subjects.get(subject, 0), revoked_before or time.time())
+
+    async def refresh(self, db, force: bool = False):
+        """Reload the revocations when the local copy is stale; keeps the old copy if the database fails"""
+        if not force and time.monotonic() - self.loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if not force and time.monotonic() - self.loaded_at < self.refresh_seconds:
+                return
+            try:
+                rows = await db.get_session_revocations()
+            except Exception as e:
+                print(f"Error loading session revocations: {e}")
+            else:
+                session_ids, subjects = set(), {}
+                for row in rows:
+                    if row["session_id"]:
+                        session_ids.add(row["session_id"])
+                    if row["subject"]:
+                        subjects[row["subject"]] = max(subjects.get(row["subject"], 0), row["revoked_before"])
+                self.session_ids, self.subjects = session_ids, subjects
+            self.loaded_at = time.monotonic()
+
+session_revocations = SessionRevocations()
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+    """Create a signed session token; data may carry sid and auth_time over from a renewed session"""
+    now = int(time.time())
+    lifetime = expires_delta or timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
+    to_encode = {"sid": secrets.token_urlsafe(12), "auth_time": now, **data,
+                 "iat": now, "exp": now + int(lifetime.total_seconds())}
+    kid, secret = SIGNING_KEYS[0]
+    return jwt.encode(to_encode, secret, algorithm=ALGORITHM, headers={"kid": kid})
+
+def decode_session(token: str) -> Dict[str, Any]:
+    """Verify a session token and return its claims, from the cache when recently seen"""
+    claims = verified_tokens.get(token)
+    if claims is None:
+        try:
+            secret = KEYS_BY_ID.get(jwt.get_unverified_header(token).get("kid", "default"))
+            if secret is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            claims = jwt.decode(token, secret, algorithms=[ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        if claims.get("sub") is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        # Cached no longer than the token is valid, so expiry needs no separate check
+        verified_tokens.set(token, claims, ttl_seconds=min(verified_tokens.ttl_seconds, claims["exp"] - time.time()))
+
+    if session_revocations.is_revoked(claims):
+        raise HTTPException(status_code=401, detail="Session revoked")
+    return claims
 
 def verify_token(token: str):
     """Verify JWT token"""
+    return decode_session(token)["sub"]
+
+def set_session_cookie(response: Response, token: str):
+    """Store a user session token in its cookie"""
+    response.set_cookie(
+        key="access_token",
+        value=token,
+        httponly=True,
+        max_age=ACCESS_TOKEN_EXPIRE_HOURS * 60 * 60,
+        samesite="lax"
+    )
+
+async def renew_session(claims: Dict[str, Any]) -> str:
+    """Reissue a session token with a fresh expiry, if its user still exists and the session is not too old"""
+    from .database import db_manager
+
+    auth_time = claims.get("auth_time", claims["iat"])
+    if time.time() - auth_time > SESSION_MAX_DAYS * 24 * 60 * 60:
+        raise HTTPException(status_code=401, detail="Session expired")
+
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return email
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        user = await db_manager.get_user_by_email(claims["sub"])
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
 
-async def get_current_user(access_token: Optional[str] = Cookie(None)):
-    """Get current user from JWT token with database verification"""
+    carried = {key: claims[key] for key in ("sid", "auth_time") if key in claims}
+    return create_access_token({"sub": claims["sub"], **carried})
+
+async def get_current_user(request: Request, access_token: Optional[str] = Cookie(None)):
+    """Get current user from the session token, renewing it once it is older than SESSION_RENEW_MINUTES.
+
+    Users are checked against the database only on renewal; removed users are
+    locked out sooner through the revocation list.
+    """
     if not access_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    
+
+    from .database import db_manager
+    await session_revocations.refresh(db_manager)
+
     try:
-        email = verify_token(access_token)
+        claims = decode_session(access_token)
     except HTTPException as e:
         # Token expired or invalid - redirect to login
         if e.status_code == 401:
             raise HTTPException(status_code=401, detail="Token expired")
         raise e
-    
-    # Import here to avoid circular imports
+
+    if claims.get("adm"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if time.time() - claims["iat"] >= SESSION_RENEW_MINUTES * 60:
+        request.state.renewed_session = await renew_session(claims)
+
+    return claims["sub"]
+
+@lru_cache(maxsize=8)
+def password_fingerprint(password: str) -> str:
+    """Short keyed hash of a password"""
+    return hmac.new(SIGNING_KEYS[0][1].encode(), password.encode(), hashlib.sha256).hexdigest()[:16]
+
+def admin_password_fingerprint() -> str:
+    """Fingerprint of ADMIN_PASSWORD carried by admin sessions, so changing the password ends them"""
+    return password_fingerprint(os.getenv("ADMIN_PASSWORD") or "")
+
+def create_admin_token() -> str:
+    """Create a signed admin session token"""
+    return create_access_token({"sub": ADMIN_SUBJECT, "adm": True, "pwd": admin_password_fingerprint()},
+                               timedelta(hours=ADMIN_SESSION_HOURS))
+
+async def verify_admin_session(admin_token: Optional[str]) -> bool:
+    """Check an admin session cookie"""
+    if not admin_token or not os.getenv("ADMIN_PASSWORD"):
+        return False
+
     from .database import db_manager
-    
-    # Verify user exists in database
+    await session_revocations.refresh(db_manager)
+
     try:
-        user = await db_manager.get_user_by_email(email)
-        
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        
-        return email
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Authentication error: {str(e)}")
+        claims = decode_session(admin_token)
+    except HTTPException:
+        return False
+    return bool(claims.get("adm")) and hmac.compare_digest(claims.get("pwd", ""), admin_password_fingerprint())
+
+async def revoke_tokens(tokens: List[Optional[str]]):
+    """Revoke the sessions of tokens that are still valid, in every worker"""
+    from .database import db_manager
+
+    revocations = []
+    for token in tokens:
+        if not token:
+            continue
+        try:
+            claims = decode_session(token)
+        except HTTPException:
+            continue
+        if "sid" in claims:
+            session_revocations.add(session_id=claims["sid"])
+            revocations.append((claims["sid"], None, None, float(claims["exp"])))
+    if revocations:
+        await db_manager.revoke_sessions(revocations)
+
+async def revoke_users(emails: List[str]):
+    """Revoke every current session of users, in every worker"""
+    from .database import db_manager
+
+    if not emails:
+        return
+    now = time.time()
+    expires_at = now + SESSION_MAX_DAYS * 24 * 60 * 60
+    for email in emails:
+        session_revocations.add(subject=email, revoked_before=now)
+    await db_manager.revoke_sessions([(None, email, now, expires_at) for email in emails])
 
 async def is_admin(email: str) -> bool:
     """Check if user is admin"""
@@ -70,11 +256,32 @@ async def is_admin(email: str) -> bool:
     except Exception:
         return False
 
-async def get_admin_user(access_token: Optional[str] = Cookie(None)):
+async def get_admin_user(request: Request, access_token: Optional[str] = Cookie(None)):
     """Get current admin user"""
-    email = await get_current_user(access_token)
-    
+    email = await get_current_user(request, access_token)
+
     if not await is_admin(email):
         raise HTTPException(status_code=403, detail="Admin access required")
-    
-    return email
\ No newline at end of file
+
+    return email
+
+class SessionRenewalMiddleware:
+    """Set the cookie of a session renewed by get_current_user on successful responses"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            token = scope.get("state", {}).get("renewed_session")
+            if message["type"] == "http.response.start" and token and message["status"] < 400:
+                cookie = Response()
+                set_session_cookie(cookie, token)
+                MutableHeaders(scope=message).append("set-cookie", cookie.headers["set-cookie"])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
@@ -0,0 +1,81 @@
+import os
+import csv
+import io
+import json
+from typing import Any, Dict, List, Tuple
+
+# Rows accepted by one bulk request
+MAX_BULK_USERS = int(os.getenv("MAX_BULK_USERS", 5000))
+
+def parse_records(body: bytes, content_type: str, list_key: str) -> List[Any]:
+    """Records of a bulk request: CSV rows as dicts, or a JSON list (bare or under list_key)"""
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type:
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "email" not in [name.strip().lower() for name in reader.fieldnames]:
+            raise ValueError("CSV needs a header row with an email column")
+        return [{(key or "").strip().lower(): (value or "").strip() for key, value in row.items()} for row in reader]
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get(list_key)
+    if not isinstance(data, list):
+        raise ValueError(f"Expected a JSON list or an object with a '{list_key}' list")
+    return data
+
+def check_size(records: List[Any]):
+    """Reject empty and oversized batches"""
+    if not records:
+        raise ValueError("No rows given")
+    if len(records) > MAX_BULK_USERS:
+        raise ValueError(f"At most {MAX_BULK_USERS} rows per request")
+
+def valid_email(email: str) -> bool:
+    """Loose address check, enough to catch shifted CSV columns"""
+    local, _, domain = email.partition("@")
+    return bool(local) and "." in domain and " " not in email
+
+def prepare_new_users(records: List[Any], default_campaign_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split records into users to create and per-row errors, keeping row numbers"""
+    users, errors = [], []
+    seen = set()
+    for row, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append({"row": row, "email": None, "status": "error", "detail": "Expected an object with email and name"})
+            continue
+        email = str(record.get("email") or "").strip().lower()
+        name = str(record.get("name") or "").strip()
+        campaign_id = str(record.get("campaign_id") or "").strip() or default_campaign_id
+        if not valid_email(email):
+            errors.append({"row": row, "email": email or None, "status": "error", "detail": "Invalid email"})
+        elif not name:
+            errors.append({"row": row, "email": email, "status": "error", "detail": "Name is required"})
+        elif email in seen:
+            errors.append({"row": row, "email": email, "status": "error", "detail": "Duplicate email in request"})
+        else:
+            seen.add(email)
+            users.append({"row": row, "email": email, "name": name, "campaign_id": campaign_id})
+    return users, errors
+
+def prepare_emails(records: List[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split records (emails or objects with an email) into removals and per-row errors"""
+    removals, errors = [], []
+    seen = set()
+    for row, record in enumerate(records, start=1):
+        email = record.get("email") if isinstance(record, dict) else record
+        email = str(email or "").strip().lower()
+        if not valid_email(email):
+            errors.append({"row": row, "email": email or None, "status": "error", "detail": "Invalid email"})
+        elif email in seen:
+            errors.append({"row": row, "email": email, "status": "error", "detail": "Duplicate email in request"})
+        else:
+            seen.add(email)
+            removals.append({"row": row, "email": email})
+    return removals, errors
+
+def summarize_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-status counts and the per-row results in request order"""
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    return {"counts": counts, "results": sorted(results, key=lambda result: result["row"])}
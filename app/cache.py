@@ -0,0 +1,87 @@
+import time
+import asyncio
+from datetime import timedelta
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+class TTLCache:
+    """Small in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return default
+
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return a value"""
+        entry = self._entries.pop(key, None)
+        return entry[1] if entry else default
+
+    def clear(self):
+        """Remove all entries"""
+        self._entries.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+_MISSING = object()
+
+class CacheInvalidations:
+    """Cache keys invalidated by any worker, polled from the database every few seconds.
+
+    ``load`` is an async callable taking the database time of the previous poll
+    (None on the first) and returning the keys invalidated since then along with
+    the database time of this poll; ``drop`` evicts keys from the local caches.
+    Polls overlap by ``overlap_seconds`` so invalidations committed late are not missed.
+    """
+
+    def __init__(self, load: Callable, drop: Callable, refresh_seconds: float = 5, overlap_seconds: float = 60):
+        self.load = load
+        self.drop = drop
+        self.refresh_seconds = refresh_seconds
+        self.overlap_seconds = overlap_seconds
+        self.since = None
+        self.loaded_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        """Drop keys invalidated elsewhere when the last poll is stale; a failed poll is retried next time"""
+        if time.monotonic() - self.loaded_at < self.refresh_seconds:
+            return
+        async with self._lock:
+            if time.monotonic() - self.loaded_at < self.refresh_seconds:
+                return
+            try:
+                keys, polled_at = await self.load(self.since)
+            except Exception as e:
+                print(f"Error loading cache invalidations: {e}")
+            else:
+                self.drop(keys)
+                # Caches start empty, so the first poll only marks where the next one starts
+                self.since = polled_at - timedelta(seconds=self.overlap_seconds)
+            self.loaded_at = time.monotonic()
@@ -0,0 +1,61 @@
+import os
+import random
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .convergence import field_scores
+
+DEFAULT_CALIBRATION_RATE = 0.1
+
+# Annotators are only judged once they rated enough gold deals
+CALIBRATION_MIN_GOLD = int(os.getenv("CALIBRATION_MIN_GOLD", 5))
+CALIBRATION_MIN_ACCURACY = float(os.getenv("CALIBRATION_MIN_ACCURACY", 0.6))
+
+def score_against_gold(ratings: Optional[Dict[str, Any]], expected: Dict[str, Any]) -> Tuple[int, int, float]:
+    """Compare ratings with expected ratings, returns (fields compared, exact matches, absolute error)"""
+    expected_scores = field_scores(expected)
+    scores = field_scores(ratings)
+    fields = exact = 0
+    abs_error = 0.0
+    for field, expected_score in expected_scores.items():
+        if field in scores:
+            fields += 1
+            exact += scores[field] == expected_score
+            abs_error += abs(scores[field] - expected_score)
+    return fields, exact, abs_error
+
+def accuracy_delta(removed: Optional[Dict[str, Any]], added: Optional[Dict[str, Any]],
+                   old_expected: Optional[Dict[str, Any]], new_expected: Optional[Dict[str, Any]]) -> List[float]:
+    """Change to an annotator's (gold annotations, fields, exact matches, absolute error) counters.
+
+    Covers both a replaced annotation on a gold deal and a gold deal whose
+    expected ratings changed; replaying the same change yields zeros.
+    """
+    delta = [0, 0, 0, 0.0]
+    for sign, ratings, expected in ((-1, removed, old_expected), (1, added, new_expected)):
+        if ratings is None or expected is None:
+            continue
+        fields, exact, abs_error = score_against_gold(ratings, expected)
+        for i, value in enumerate((1, fields, exact, abs_error)):
+            delta[i] += sign * value
+    return delta
+
+def summarize_accuracy(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Add accuracy, mean absolute error and a low-quality flag to an annotator's counters"""
+    fields = row["fields_compared"]
+    accuracy = row["exact_matches"] / fields if fields else None
+    return {
+        **row,
+        "accuracy": accuracy,
+        "mean_abs_error": row["abs_error_sum"] / fields if fields else None,
+        "flagged": (row["gold_annotations"] >= CALIBRATION_MIN_GOLD
+                    and accuracy is not None and accuracy < CALIBRATION_MIN_ACCURACY)
+    }
+
+def pick_calibration_deal(rate: float, gold_deal_ids: Iterable[str], completed_deals: Iterable[str],
+                          rng: random.Random = random) -> Optional[str]:
+    """With probability rate, pick a gold deal the annotator has not rated yet"""
+    if rate <= 0 or rng.random() >= rate:
+        return None
+    completed = set(completed_deals)
+    candidates = [deal_id for deal_id in gold_deal_ids if deal_id not in completed]
+    return rng.choice(candidates) if candidates else None
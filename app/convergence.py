@@ -0,0 +1,99 @@
+import math
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .models import RATING_FIELDS
+
+# Two-sided 95% normal quantile for score confidence intervals
+CONFIDENCE_Z = 1.96
+
+DEFAULT_MIN_ANNOTATIONS = 3
+DEFAULT_MAX_HALF_WIDTH = 0.5
+
+# Pseudo-observations of prior score variance, so a few unanimous ratings do not read as zero variance
+PRIOR_VARIANCE = 0.25
+PRIOR_WEIGHT = 2
+
+def field_scores(ratings: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Get the score of each rated field"""
+    scores = {}
+    for field in RATING_FIELDS:
+        rating = (ratings or {}).get(field)
+        if isinstance(rating, dict) and rating.get("score") is not None:
+            scores[field] = int(rating["score"])
+    return scores
+
+def update_score_stats(stats: Dict[str, Dict[str, float]], removed: Optional[Dict[str, Any]] = None,
+                       added: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, float]]:
+    """Update running per-field n, sum and sum of squares for a replaced annotation.
+
+    Replacing an annotation with itself leaves the stats unchanged, so
+    replayed submissions are harmless.
+    """
+    updated = {field: dict(values) for field, values in stats.items()}
+    for sign, ratings in ((-1, removed), (1, added)):
+        for field, score in field_scores(ratings).items():
+            values = updated.setdefault(field, {"n": 0, "sum": 0.0, "sumsq": 0.0})
+            values["n"] += sign
+            values["sum"] += sign * score
+            values["sumsq"] += sign * score * score
+    return updated
+
+def field_interval(values: Dict[str, float], z: float = CONFIDENCE_Z) -> Tuple[Optional[float], Optional[float]]:
+    """Get the mean and confidence interval half-width of one field's scores"""
+    n = values.get("n", 0)
+    if n < 1:
+        return None, None
+    mean = values["sum"] / n
+    if n < 2:
+        return mean, None
+    # Sample variance shrunk towards the prior; clamp tiny negatives from float cancellation
+    squared_deviations = max(values["sumsq"] - n * mean * mean, 0.0)
+    variance = (squared_deviations + PRIOR_VARIANCE * PRIOR_WEIGHT) / (n - 1 + PRIOR_WEIGHT)
+    return mean, z * math.sqrt(variance / n)
+
+def deal_uncertainty(stats: Dict[str, Dict[str, float]], z: float = CONFIDENCE_Z) -> Optional[float]:
+    """Widest confidence interval half-width across fields, None until every field has two scores"""
+    if not stats:
+        return None
+    widths = []
+    for values in stats.values():
+        _, half_width = field_interval(values, z)
+        if half_width is None:
+            return None
+        widths.append(half_width)
+    return max(widths)
+
+def is_converged(stats: Dict[str, Dict[str, float]], min_annotations: int = DEFAULT_MIN_ANNOTATIONS,
+                 max_half_width: float = DEFAULT_MAX_HALF_WIDTH, z: float = CONFIDENCE_Z) -> bool:
+    """Whether every field's score estimate is tight enough to stop collecting ratings"""
+    if not stats or min(values["n"] for values in stats.values()) < min_annotations:
+        return False
+    uncertainty = deal_uncertainty(stats, z)
+    return uncertainty is not None and uncertainty <= max_half_width
+
+def assignment_priority(annotation_count: int, uncertainty: Optional[float],
+                        min_annotations: int = DEFAULT_MIN_ANNOTATIONS) -> Tuple:
+    """Sort key for adaptive assignment.
+
+    Deals still short of the minimum come first, least annotated first; then
+    the most contested deals, so spare capacity goes where raters disagree.
+    """
+    if annotation_count < min_annotations or uncertainty is None:
+        return (0, annotation_count, 0.0)
+    return (1, -uncertainty, annotation_count)
+
+def mean_scores(stats: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Get the mean score of each field"""
+    means = {}
+    for field, values in stats.items():
+        mean, _ = field_interval(values)
+        if mean is not None:
+            means[field] = mean
+    return means
+
+def merge_ratings_stats(ratings_list: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Build score stats from scratch for a set of annotations"""
+    stats: Dict[str, Dict[str, float]] = {}
+    for ratings in ratings_list:
+        stats = update_score_stats(stats, added=ratings)
+    return stats
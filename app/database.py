@@ -1,12 +1,246 @@
 import os
+import html
 import json
 import asyncpg
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timezone
 from dotenv import load_dotenv
 
+from .models import RATING_FIELDS, DEFAULT_CAMPAIGN_ID, TARGET_ANNOTATIONS_PER_DEAL
+from .activity_store import store_deal_activities, load_deal_activities, decompress_chunk, SEARCH_CONFIG
+from .fast_json import RawJSON
+from .deal_facets import FACETS, FACETED_DEALS, ANNOTATION_STATUSES, filter_conditions
+from .convergence import (update_score_stats, deal_uncertainty, is_converged,
+                          DEFAULT_MIN_ANNOTATIONS, DEFAULT_MAX_HALF_WIDTH)
+from .calibration import accuracy_delta, summarize_accuracy, DEFAULT_CALIBRATION_RATE
+from .llm_versions import LLM_OUTPUT_FIELDS, LLM_OUTPUT_JSON_FIELDS, normalize_output, diff_outputs, rebuild_versions
+
 load_dotenv()
 
+# Count queries run through the pool, for load tests; off by default
+DB_QUERY_STATS = os.getenv("DB_QUERY_STATS", "false").lower() == "true"
+
+# LLM output list columns searchable by element (GIN indexed)
+LLM_OUTPUT_INDICATOR_COLUMNS = [
+    "professional_gaps", "excellence_indicators", "risk_indicators",
+    "opportunity_indicators", "recommended_actions"
+]
+
+# Search snippets mark matches with <mark>; bodies are HTML-escaped before highlighting
+SEARCH_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MinWords=15, MaxWords=35, MaxFragments=2"
+
+CAMPAIGN_COLUMNS = """
+    campaign_id, name, target_annotations_per_deal, assignment_mode,
+    convergence_min_annotations, convergence_max_half_width, calibration_rate, created_at
+"""
+
+# Errors caused by the submitted values themselves (bad types, out of range integers, unknown deals),
+# which no retry can fix; asyncpg raises a ValueError when an argument cannot be encoded
+REJECTED_SUBMISSION_ERRORS = (asyncpg.DataError, asyncpg.IntegrityConstraintViolationError, ValueError)
+
+# Resubmitting a deal replaces the earlier annotation; the campaign follows the deal
+UPSERT_ANNOTATION = """
+    INSERT INTO annotations (deal_id, user_email, ratings, time_spent_seconds, llm_output_version, campaign_id)
+    VALUES ($1, $2, $3, $4, $5, (SELECT campaign_id FROM deals WHERE deal_id = $1))
+    ON CONFLICT (deal_id, user_email, archived)
+    DO UPDATE SET
+        ratings = EXCLUDED.ratings,
+        time_spent_seconds = EXCLUDED.time_spent_seconds,
+        llm_output_version = EXCLUDED.llm_output_version,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+# Status of an active deal from its counters, given placeholders for the campaign target and
+# whether the campaign is adaptive. Ranges on annotation_count let the assignment index seek.
+DISTRIBUTION_STATUS_CONDITIONS = {
+    "not_started": "annotation_count = 0 AND annotation_count < {target} AND NOT (converged AND {adaptive})",
+    "in_progress": "annotation_count > 0 AND annotation_count < {target} AND NOT (converged AND {adaptive})",
+    "completed": "annotation_count >= {target} AND NOT (converged AND {adaptive})",
+    "converged": "converged AND {adaptive}"
+}
+
+async def lock_deal_progress(connection, deal_ids):
+    """Lock the progress rows of deals in deal_id order.
+
+    Every transaction that writes annotations takes these locks before touching
+    annotations or counters, so concurrent flushes and removals cannot deadlock.
+    """
+    if not deal_ids:
+        return
+    await connection.execute("""
+        SELECT 1 FROM deal_progress WHERE deal_id = ANY($1::text[]) ORDER BY deal_id FOR UPDATE
+    """, sorted(deal_ids))
+
+async def apply_score_changes(connection, changes: List[tuple]):
+    """Fold (deal_id, removed_ratings, added_ratings) changes into each deal's running score stats"""
+    if not changes:
+        return
+    # Same order as lock_deal_progress, which writers of annotations have normally called already
+    rows = await connection.fetch("""
+        SELECT p.deal_id, p.score_stats, c.convergence_min_annotations, c.convergence_max_half_width
+        FROM deal_progress p
+        JOIN campaigns c ON c.campaign_id = p.campaign_id
+        WHERE p.deal_id = ANY($1::text[])
+        ORDER BY p.deal_id
+        FOR UPDATE OF p
+    """, sorted({deal_id for deal_id, _, _ in changes}))
+    
+    deals = {row['deal_id']: dict(row, score_stats=json.loads(row['score_stats'])) for row in rows}
+    for deal_id, removed, added in changes:
+        if deal_id in deals:
+            deals[deal_id]['score_stats'] = update_score_stats(deals[deal_id]['score_stats'], removed, added)
+    
+    await connection.executemany("""
+        UPDATE deal_progress SET score_stats = $2, uncertainty = $3, converged = $4
+        WHERE deal_id = $1
+    """, [
+        (deal_id, json.dumps(deal['score_stats']), deal_uncertainty(deal['score_stats']),
+         is_converged(deal['score_stats'], deal['convergence_min_annotations'],
+                      deal['convergence_max_half_width']))
+        for deal_id, deal in deals.items()
+    ])
+
+async def get_gold_expectations(connection, deal_ids) -> Dict[str, Dict[str, Any]]:
+    """Get expected ratings and campaign of the gold deals among deal_ids"""
+    rows = await connection.fetch("""
+        SELECT g.deal_id, g.expected_ratings, d.campaign_id
+        FROM gold_deals g
+        JOIN deals d ON d.deal_id = g.deal_id
+        WHERE g.deal_id = ANY($1::text[])
+    """, list(deal_ids))
+    return {row['deal_id']: {'expected': json.loads(row['expected_ratings']), 'campaign_id': row['campaign_id']}
+            for row in rows}
+
+async def apply_accuracy_changes(connection, changes: List[tuple]):
+    """Fold (user_email, campaign_id, delta) changes into per-annotator gold accuracy counters"""
+    totals = {}
+    for user_email, campaign_id, delta in changes:
+        total = totals.setdefault((user_email, campaign_id), [0, 0, 0, 0.0])
+        for i, value in enumerate(delta):
+            total[i] += value
+    
+    # Sorted keys keep concurrent flushes from deadlocking on the upsert
+    rows = [(user_email, campaign_id, *total) for (user_email, campaign_id), total in sorted(totals.items())
+            if any(total)]
+    if not rows:
+        return
+    await connection.executemany("""
+        INSERT INTO annotator_accuracy (user_email, campaign_id, gold_annotations, fields_compared,
+                                        exact_matches, abs_error_sum)
+        VALUES ($1, $2, $3, $4, $5, $6)
+        ON CONFLICT (user_email, campaign_id)
+        DO UPDATE SET
+            gold_annotations = annotator_accuracy.gold_annotations + EXCLUDED.gold_annotations,
+            fields_compared = annotator_accuracy.fields_compared + EXCLUDED.fields_compared,
+            exact_matches = annotator_accuracy.exact_matches + EXCLUDED.exact_matches,
+            abs_error_sum = annotator_accuracy.abs_error_sum + EXCLUDED.abs_error_sum,
+            updated_at = CURRENT_TIMESTAMP
+    """, rows)
+
+async def write_annotations(connection, submissions: List[Dict[str, Any]]):
+    """Upsert annotations and update per-deal counters and score stats; must run in a transaction"""
+    # Submissions of users removed since they were journaled are dropped, whichever worker holds them.
+    # The key share lock makes a concurrent removal wait for this transaction, then delete what it wrote.
+    existing_users = await connection.fetch("""
+        SELECT email FROM users WHERE email = ANY($1::text[]) ORDER BY email FOR KEY SHARE
+    """, sorted({s['user_email'] for s in submissions}))
+    existing_emails = {row['email'] for row in existing_users}
+    submissions = [s for s in submissions if s['user_email'] in existing_emails]
+    if not submissions:
+        return
+    await lock_deal_progress(connection, {s['deal_id'] for s in submissions})
+    
+    previous_rows = await connection.fetch("""
+        SELECT deal_id, user_email, ratings FROM annotations
+        WHERE archived = FALSE
+          AND (deal_id, user_email) IN (SELECT * FROM unnest($1::text[], $2::text[]))
+    """, [s['deal_id'] for s in submissions], [s['user_email'] for s in submissions])
+    current = {(row['deal_id'], row['user_email']): json.loads(row['ratings']) for row in previous_rows}
+    
+    # A later submission in the same batch replaces an earlier one
+    changes = []
+    for s in submissions:
+        key = (s['deal_id'], s['user_email'])
+        changes.append((s['deal_id'], current.get(key), s['ratings'], s['user_email']))
+        current[key] = s['ratings']
+    
+    await connection.executemany(UPSERT_ANNOTATION, [
+        (s['deal_id'], s['user_email'], json.dumps(s['ratings']), s['time_spent'],
+         s.get('llm_output_version'))
+        for s in submissions
+    ])
+    await refresh_annotation_counts(connection, {s['deal_id'] for s in submissions})
+    await apply_score_changes(connection, [(deal_id, removed, added) for deal_id, removed, added, _ in changes])
+    
+    # Read after the deal_progress row locks above, so a deal being marked gold concurrently is seen
+    gold = await get_gold_expectations(connection, {s['deal_id'] for s in submissions})
+    await apply_accuracy_changes(connection, [
+        (user_email, gold[deal_id]['campaign_id'],
+         accuracy_delta(removed, added, gold[deal_id]['expected'], gold[deal_id]['expected']))
+        for deal_id, removed, added, user_email in changes if deal_id in gold
+    ])
+
+def llm_output_values(output_data: Dict[str, Any]) -> List[Any]:
+    """Column values for an LLM output, in LLM_OUTPUT_FIELDS order"""
+    values = []
+    for field in LLM_OUTPUT_FIELDS:
+        value = output_data.get(field)
+        if field in ("sentiment_score", "confidence"):
+            value = float(value)
+        elif field in LLM_OUTPUT_JSON_FIELDS:
+            value = json.dumps(value if value is not None else LLM_OUTPUT_JSON_FIELDS[field])
+        values.append(value)
+    return values
+
+async def refresh_annotation_counts(connection, deal_ids):
+    """Recount the annotation counters of deals; recounting keeps journal replays idempotent"""
+    if not deal_ids:
+        return
+    await connection.execute("""
+        UPDATE deal_progress p
+        SET annotation_count = (SELECT COUNT(*) FROM annotations a WHERE a.deal_id = p.deal_id)
+        WHERE p.deal_id = ANY($1::text[])
+    """, list(deal_ids))
+
+def row_versions_hash(key: str) -> str:
+    """SQL aggregate hashing every visible row's key and xmin, independent of row order.
+
+    Any committed insert, update or delete changes it, whatever order transactions
+    commit in, unlike MAX(updated_at) (stamped at transaction start) or MAX(xmin).
+    """
+    return f"SUM(hashtextextended({key}::text || ':' || xmin::text, 0)::numeric)::text"
+
+def rating_score_expression(field: str) -> str:
+    """SQL expression for a rating field's score, matching its expression index"""
+    if field not in RATING_FIELDS:
+        raise ValueError(f"Unknown rating field: {field}")
+    return f"((ratings -> '{field}' ->> 'score')::int)"
+
+# Scores and confidences of every rating field as int arrays in RATING_FIELDS order, NULL when unrated
+RATING_ARRAY_COLUMNS = f"""
+    ARRAY[{', '.join(rating_score_expression(field) for field in RATING_FIELDS)}] AS scores,
+    ARRAY[{', '.join(f"((ratings -> '{field}' ->> 'confidence')::int)" for field in RATING_FIELDS)}] AS confidences
+"""
+
+class QueryStats:
+    """Running count and time of queries executed on pooled connections in this process"""
+
+    def __init__(self):
+        self.queries = 0
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, query):
+        """asyncpg query logger callback"""
+        self.queries += 1
+        self.elapsed += query.elapsed
+        if query.exception is not None:
+            self.errors += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters"""
+        return {"queries": self.queries, "errors": self.errors, "query_seconds": round(self.elapsed, 6)}
+
 class DatabaseManager:
     def __init__(self):
         self.db_host = os.getenv("DB_HOST")
@@ -19,6 +253,10 @@ class DatabaseManager:
         if not all([self.db_host, self.db_name, self.db_user, self.db_password]):
             raise Exception("Database environment variables not set (DB_HOST, DB_NAME, DB_USER, DB_PASSWORD)")
         self.pool = None
+        self.query_stats = QueryStats() if DB_QUERY_STATS else None
+    
+    async def _init_connection(self, connection):
+        connection.add_query_logger(self.query_stats.record)
     
     async def initialize(self):
         """Initialize database connection pool"""
@@ -32,13 +270,32 @@ class DatabaseManager:
                 ssl=self.db_ssl,
                 min_size=1,
                 max_size=10,
-                command_timeout=60
+                command_timeout=60,
+                init=self._init_connection if self.query_stats else None
             )
             print("Database connection pool initialized")
         except Exception as e:
             print(f"Failed to initialize database: {e}")
             raise e
     
+    async def connect(self) -> asyncpg.Connection:
+        """Open a standalone connection outside the pool"""
+        return await asyncpg.connect(
+            host=self.db_host,
+            port=self.db_port,
+            database=self.db_name,
+            user=self.db_user,
+            password=self.db_password,
+            ssl=self.db_ssl
+        )
+    
+    async def migrate(self) -> List[int]:
+        """Apply pending schema migrations"""
+        from .migrations import run_migrations
+        
+        async with self.pool.acquire() as connection:
+            return await run_migrations(connection)
+    
     async def close(self):
         """Close database connection pool"""
         if self.pool:
@@ -49,7 +306,7 @@ class DatabaseManager:
         """Get all users"""
         async with self.pool.acquire() as connection:
             rows = await connection.fetch("""
-                SELECT email, name, is_admin, created_at 
+                SELECT email, name, is_admin, campaign_id, created_at 
                 FROM users 
                 ORDER BY created_at
             """)
@@ -59,20 +316,21 @@ class DatabaseManager:
         """Get user by email"""
         async with self.pool.acquire() as connection:
             row = await connection.fetchrow("""
-                SELECT email, name, is_admin, created_at 
+                SELECT email, name, is_admin, campaign_id, created_at 
                 FROM users 
                 WHERE email = $1
             """, email)
             return dict(row) if row else None
     
-    async def create_user(self, email: str, name: str, is_admin: bool = False) -> bool:
+    async def create_user(self, email: str, name: str, is_admin: bool = False,
+                          campaign_id: str = DEFAULT_CAMPAIGN_ID) -> bool:
         """Create new user"""
         try:
             async with self.pool.acquire() as connection:
                 await connection.execute("""
-                    INSERT INTO users (email, name, is_admin) 
-                    VALUES ($1, $2, $3)
-                """, email, name, is_admin)
+                    INSERT INTO users (email, name, is_admin, campaign_id) 
+                    VALUES ($1, $2, $3, $4)
+                """, email, name, is_admin, campaign_id)
                 return True
         except asyncpg.UniqueViolationError:
             return False
@@ -92,13 +350,190 @@ class DatabaseManager:
             print(f"Error deleting user: {e}")
             return False
     
+    async def set_user_campaign(self, email: str, campaign_id: str) -> bool:
+        """Move a user to another campaign"""
+        try:
+            async with self.pool.acquire() as connection:
+                result = await connection.execute("""
+                    UPDATE users SET campaign_id = $2 WHERE email = $1
+                """, email, campaign_id)
+                return result == "UPDATE 1"
+        except asyncpg.ForeignKeyViolationError:
+            return False
+        except Exception as e:
+            print(f"Error setting user campaign: {e}")
+            return False
+    
+    async def create_users_batch(self, users: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Create users in one transaction, returns a result per user: created, exists or error"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                # Checked up front, since one foreign key violation would abort the whole insert
+                known = await connection.fetch("""
+                    SELECT campaign_id FROM campaigns WHERE campaign_id = ANY($1::text[])
+                """, list({user['campaign_id'] for user in users}))
+                known_campaigns = {row['campaign_id'] for row in known}
+                valid = [user for user in users if user['campaign_id'] in known_campaigns]
+                
+                created = set()
+                if valid:
+                    rows = await connection.fetch("""
+                        INSERT INTO users (email, name, is_admin, campaign_id)
+                        SELECT email, name, FALSE, campaign_id
+                        FROM unnest($1::text[], $2::text[], $3::text[]) AS u (email, name, campaign_id)
+                        ON CONFLICT (email) DO NOTHING
+                        RETURNING email
+                    """, [user['email'] for user in valid], [user['name'] for user in valid],
+                        [user['campaign_id'] for user in valid])
+                    created = {row['email'] for row in rows}
+        
+        results = []
+        for user in users:
+            result = {"row": user['row'], "email": user['email'], "campaign_id": user['campaign_id']}
+            if user['campaign_id'] not in known_campaigns:
+                result.update(status="error", detail="Unknown campaign")
+            elif user['email'] in created:
+                result["status"] = "created"
+            else:
+                result.update(status="exists", detail="User already exists")
+            results.append(result)
+        return results
+    
+    async def delete_users_batch(self, emails: List[str], keep_progress: bool = False) -> Dict[str, Any]:
+        """Delete users in one transaction, with their annotations unless keep_progress.
+
+        Returns the removed users with their campaigns, and the number of annotations deleted.
+        """
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                # Lock in the same order as flushes take their key share locks, so the two cannot deadlock
+                removed = await connection.fetch("""
+                    DELETE FROM users WHERE email IN (
+                        SELECT email FROM users WHERE email = ANY($1::text[]) ORDER BY email FOR UPDATE
+                    )
+                    RETURNING email, campaign_id
+                """, emails)
+                removed_emails = [row['email'] for row in removed]
+                
+                annotations = []
+                if removed_emails and not keep_progress:
+                    deal_ids = await connection.fetch("""
+                        SELECT deal_id FROM annotations WHERE user_email = ANY($1::text[])
+                    """, removed_emails)
+                    await lock_deal_progress(connection, {row['deal_id'] for row in deal_ids})
+                    annotations = await connection.fetch("""
+                        DELETE FROM annotations WHERE user_email = ANY($1::text[]) RETURNING deal_id, ratings
+                    """, removed_emails)
+                    await refresh_annotation_counts(connection, {row['deal_id'] for row in annotations})
+                    await apply_score_changes(connection, [
+                        (row['deal_id'], json.loads(row['ratings']), None) for row in annotations
+                    ])
+                    await connection.execute("""
+                        DELETE FROM annotator_accuracy WHERE user_email = ANY($1::text[])
+                    """, removed_emails)
+        
+        return {
+            "removed": {row['email']: row['campaign_id'] for row in removed},
+            "annotations_deleted": len(annotations)
+        }
+    
+    # Session revocations
+    async def revoke_sessions(self, revocations: List[tuple]):
+        """Record (session_id, subject, revoked_before, expires_at) revocations and drop expired ones"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany("""
+                    INSERT INTO session_revocations (session_id, subject, revoked_before, expires_at)
+                    VALUES ($1, $2, $3, $4)
+                """, revocations)
+                await connection.execute("""
+                    DELETE FROM session_revocations WHERE expires_at < extract(epoch FROM now())
+                """)
+    
+    async def get_session_revocations(self) -> List[Dict[str, Any]]:
+        """Get revocations of sessions that could still be valid"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT session_id, subject, revoked_before
+                FROM session_revocations
+                WHERE expires_at > extract(epoch FROM now())
+            """)
+            return [dict(row) for row in rows]
+    
+    # Cross-worker cache invalidation
+    async def invalidate_user_caches(self, emails: List[str]):
+        """Record users whose cached state every worker must drop, and prune records no poll still needs"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                await connection.executemany("""
+                    INSERT INTO user_cache_invalidations (email) VALUES ($1)
+                """, [(email,) for email in emails])
+                await connection.execute("""
+                    DELETE FROM user_cache_invalidations WHERE invalidated_at < LOCALTIMESTAMP - INTERVAL '1 hour'
+                """)
+    
+    async def get_user_cache_invalidations(self, since: Optional[datetime]) -> tuple:
+        """Get users invalidated after since (none when since is None) and the database time of the read"""
+        async with self.pool.acquire() as connection:
+            now = await connection.fetchval("SELECT LOCALTIMESTAMP")
+            if since is None:
+                return [], now
+            rows = await connection.fetch("""
+                SELECT DISTINCT email FROM user_cache_invalidations WHERE invalidated_at > $1
+            """, since)
+            return [row['email'] for row in rows], now
+    
+    # Campaign operations
+    async def get_campaigns(self) -> List[Dict[str, Any]]:
+        """Get all campaigns"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT {CAMPAIGN_COLUMNS}
+                FROM campaigns
+                ORDER BY created_at
+            """)
+            return [dict(row) for row in rows]
+    
+    async def get_campaign(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        """Get campaign by campaign_id"""
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow(f"""
+                SELECT {CAMPAIGN_COLUMNS}
+                FROM campaigns
+                WHERE campaign_id = $1
+            """, campaign_id)
+            return dict(row) if row else None
+    
+    async def create_campaign(self, campaign_id: str, name: str,
+                              target_annotations_per_deal: int = TARGET_ANNOTATIONS_PER_DEAL,
+                              assignment_mode: str = "fixed",
+                              convergence_min_annotations: int = DEFAULT_MIN_ANNOTATIONS,
+                              convergence_max_half_width: float = DEFAULT_MAX_HALF_WIDTH,
+                              calibration_rate: float = DEFAULT_CALIBRATION_RATE) -> bool:
+        """Create new campaign"""
+        try:
+            async with self.pool.acquire() as connection:
+                await connection.execute("""
+                    INSERT INTO campaigns (campaign_id, name, target_annotations_per_deal, assignment_mode,
+                                           convergence_min_annotations, convergence_max_half_width,
+                                           calibration_rate)
+                    VALUES ($1, $2, $3, $4, $5, $6, $7)
+                """, campaign_id, name, target_annotations_per_deal, assignment_mode,
+                convergence_min_annotations, convergence_max_half_width, calibration_rate)
+                return True
+        except asyncpg.UniqueViolationError:
+            return False
+        except Exception as e:
+            print(f"Error creating campaign: {e}")
+            return False
+    
     # Deal operations
     async def get_deals(self) -> Dict[str, Any]:
-        """Get all deals"""
+        """Get all deals without their activities"""
         async with self.pool.acquire() as connection:
             rows = await connection.fetch("""
                 SELECT deal_id, amount, dealstage, dealtype, deal_stage_probability,
-                       createdate, closedate, activities
+                       createdate, closedate, activity_count, campaign_id
                 FROM deals
                 ORDER BY deal_id
             """)
@@ -117,11 +552,11 @@ class DatabaseManager:
             return deals
     
     async def get_deal_by_id(self, deal_id: str) -> Optional[Dict[str, Any]]:
-        """Get deal by deal_id"""
+        """Get deal metadata by deal_id, without its activities"""
         async with self.pool.acquire() as connection:
             row = await connection.fetchrow("""
                 SELECT deal_id, amount, dealstage, dealtype, deal_stage_probability,
-                       createdate, closedate, activities
+                       createdate, closedate, activity_count, campaign_id, xmin::text AS row_version
                 FROM deals
                 WHERE deal_id = $1
             """, deal_id)
@@ -138,6 +573,29 @@ class DatabaseManager:
             
             return deal_data
     
+    async def get_deal_activities(self, deal_id: str) -> List[Dict[str, Any]]:
+        """Get a deal's activities in chronological order"""
+        async with self.pool.acquire() as connection:
+            activities = await load_deal_activities(connection, [deal_id])
+            return activities.get(deal_id, [])
+    
+    async def get_activities_by_deal(self, deal_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get activities for several deals, keyed by deal_id"""
+        async with self.pool.acquire() as connection:
+            return await load_deal_activities(connection, deal_ids)
+    
+    async def get_deal_versions(self, deal_id: str) -> Optional[Dict[str, Any]]:
+        """Get row versions of a deal and its LLM output without fetching their data"""
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow("""
+                SELECT d.xmin::text AS deal_version, l.xmin::text AS llm_output_version,
+                       l.version AS llm_output_latest
+                FROM deals d
+                LEFT JOIN llm_outputs l ON l.deal_id = d.deal_id
+                WHERE d.deal_id = $1
+            """, deal_id)
+            return dict(row) if row else None
+    
     async def create_deal(self, deal_data: Dict[str, Any]) -> bool:
         """Create new deal"""
         def parse_datetime(dt_str):
@@ -166,20 +624,25 @@ class DatabaseManager:
         
         try:
             async with self.pool.acquire() as connection:
-                await connection.execute("""
-                    INSERT INTO deals (deal_id, amount, dealstage, dealtype, 
-                                    deal_stage_probability, createdate, closedate, activities)
-                    VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                """, 
-                deal_data['deal_id'],
-                float(deal_data.get('amount', 0)) if deal_data.get('amount') else None,
-                deal_data.get('dealstage'),
-                deal_data.get('dealtype'),
-                float(deal_data.get('deal_stage_probability', 0)) if deal_data.get('deal_stage_probability') else None,
-                parse_datetime(deal_data.get('createdate')),
-                parse_datetime(deal_data.get('closedate')),
-                json.dumps(deal_data.get('activities', []))
-                )
+                async with connection.transaction():
+                    await connection.execute("""
+                        INSERT INTO deals (deal_id, amount, dealstage, dealtype, 
+                                        deal_stage_probability, createdate, closedate, campaign_id)
+                        VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
+                    """, 
+                    deal_data['deal_id'],
+                    float(deal_data.get('amount', 0)) if deal_data.get('amount') else None,
+                    deal_data.get('dealstage'),
+                    deal_data.get('dealtype'),
+                    float(deal_data.get('deal_stage_probability', 0)) if deal_data.get('deal_stage_probability') else None,
+                    parse_datetime(deal_data.get('createdate')),
+                    parse_datetime(deal_data.get('closedate')),
+                    deal_data.get('campaign_id', DEFAULT_CAMPAIGN_ID)
+                    )
+                    await connection.execute("""
+                        INSERT INTO deal_progress (deal_id, campaign_id) VALUES ($1, $2)
+                    """, deal_data['deal_id'], deal_data.get('campaign_id', DEFAULT_CAMPAIGN_ID))
+                    await store_deal_activities(connection, deal_data['deal_id'], deal_data.get('activities', []))
                 return True
         except Exception as e:
             print(f"Error creating deal: {e}")
@@ -214,52 +677,125 @@ class DatabaseManager:
                        activity_breakdown, deal_momentum_indicators, reasoning,
                        professional_gaps, excellence_indicators, risk_indicators,
                        opportunity_indicators, temporal_trend, recommended_actions,
-                       context_analysis_notes
+                       context_analysis_notes, version
                 FROM llm_outputs
                 WHERE deal_id = $1
             """, deal_id)
             
             return dict(row) if row else None
     
-    async def create_llm_output(self, deal_id: str, output_data: Dict[str, Any]) -> bool:
-        """Create new LLM output"""
+    async def get_llm_output_history(self, deal_ids: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get every version of the LLM outputs of deals in one query, newest first"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT o.deal_id, {', '.join(f'o.{field}' for field in LLM_OUTPUT_FIELDS)},
+                       v.version, v.label, v.created_at, v.reverse_diff
+                FROM llm_outputs o
+                JOIN llm_output_versions v ON v.deal_id = o.deal_id
+                WHERE o.deal_id = ANY($1::text[])
+                ORDER BY o.deal_id, v.version DESC
+            """, list(deal_ids))
+        
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            grouped.setdefault(row['deal_id'], []).append(dict(row))
+        
+        return {
+            deal_id: rebuild_versions(normalize_output(versions[0]), versions)
+            for deal_id, versions in grouped.items()
+        }
+    
+    async def get_llm_output_version(self, deal_id: str, version: int) -> Optional[Dict[str, Any]]:
+        """Get one version of a deal's LLM output, applying only the diffs newer than it"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT {', '.join(f'o.{field}' for field in LLM_OUTPUT_FIELDS)},
+                       v.version, v.label, v.created_at, v.reverse_diff
+                FROM llm_outputs o
+                JOIN llm_output_versions v ON v.deal_id = o.deal_id
+                WHERE o.deal_id = $1 AND v.version >= $2
+                ORDER BY v.version DESC
+            """, deal_id, version)
+        
+        if not rows or rows[-1]['version'] != version:
+            return None
+        
+        versions = [dict(row) for row in rows]
+        output = rebuild_versions(normalize_output(versions[0]), versions)[-1]["output"]
+        output["version"] = version
+        return output
+    
+    async def create_llm_output(self, deal_id: str, output_data: Dict[str, Any],
+                                label: Optional[str] = None) -> bool:
+        """Create new LLM output as version 1"""
         try:
             async with self.pool.acquire() as connection:
-                await connection.execute("""
-                    INSERT INTO llm_outputs (
-                        deal_id, overall_sentiment, sentiment_score, confidence,
-                        activity_breakdown, deal_momentum_indicators, reasoning,
-                        professional_gaps, excellence_indicators, risk_indicators,
-                        opportunity_indicators, temporal_trend, recommended_actions,
-                        context_analysis_notes
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
-                """,
-                deal_id,
-                output_data['overall_sentiment'],
-                float(output_data['sentiment_score']),
-                float(output_data['confidence']),
-                json.dumps(output_data.get('activity_breakdown', {})),
-                json.dumps(output_data.get('deal_momentum_indicators', {})),
-                output_data.get('reasoning'),
-                json.dumps(output_data.get('professional_gaps', [])),
-                json.dumps(output_data.get('excellence_indicators', [])),
-                json.dumps(output_data.get('risk_indicators', [])),
-                json.dumps(output_data.get('opportunity_indicators', [])),
-                output_data.get('temporal_trend'),
-                json.dumps(output_data.get('recommended_actions', [])),
-                json.dumps(output_data.get('context_analysis_notes', []))
-                )
+                async with connection.transaction():
+                    await connection.execute("""
+                        INSERT INTO llm_outputs (
+                            deal_id, overall_sentiment, sentiment_score, confidence,
+                            activity_breakdown, deal_momentum_indicators, reasoning,
+                            professional_gaps, excellence_indicators, risk_indicators,
+                            opportunity_indicators, temporal_trend, recommended_actions,
+                            context_analysis_notes
+                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13, $14)
+                    """, deal_id, *llm_output_values(output_data))
+                    await connection.execute("""
+                        INSERT INTO llm_output_versions (deal_id, version, label) VALUES ($1, 1, $2)
+                    """, deal_id, label or "initial")
                 return True
         except Exception as e:
             print(f"Error creating LLM output: {e}")
             return False
     
+    async def add_llm_output_version(self, deal_id: str, output_data: Dict[str, Any],
+                                     label: Optional[str] = None) -> Optional[int]:
+        """Store a new version of a deal's LLM output, returns its version number.
+        
+        The previous version is reduced to a reverse diff against the new one.
+        """
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.transaction():
+                    current = await connection.fetchrow(f"""
+                        SELECT {', '.join(LLM_OUTPUT_FIELDS)}, version
+                        FROM llm_outputs WHERE deal_id = $1
+                        FOR UPDATE
+                    """, deal_id)
+                    if not current:
+                        return None
+                    
+                    new_version = current['version'] + 1
+                    previous = normalize_output(dict(current))
+                    updated = normalize_output({
+                        field: output_data.get(field, previous[field]) for field in LLM_OUTPUT_FIELDS
+                    })
+                    
+                    await connection.execute("""
+                        UPDATE llm_output_versions SET reverse_diff = $3
+                        WHERE deal_id = $1 AND version = $2
+                    """, deal_id, current['version'], json.dumps(diff_outputs(updated, previous)))
+                    await connection.execute("""
+                        INSERT INTO llm_output_versions (deal_id, version, label) VALUES ($1, $2, $3)
+                    """, deal_id, new_version, label)
+                    await connection.execute(f"""
+                        UPDATE llm_outputs
+                        SET {', '.join(f'{field} = ${i + 2}' for i, field in enumerate(LLM_OUTPUT_FIELDS))},
+                            version = ${len(LLM_OUTPUT_FIELDS) + 2}
+                        WHERE deal_id = $1
+                    """, deal_id, *llm_output_values(updated), new_version)
+                return new_version
+        except Exception as e:
+            print(f"Error adding LLM output version: {e}")
+            return None
+    
     # Annotation operations
     async def get_annotations(self) -> Dict[str, Any]:
         """Get all annotations grouped by deal_id and user_email"""
         async with self.pool.acquire() as connection:
             rows = await connection.fetch("""
-                SELECT deal_id, user_email, ratings, time_spent_seconds, created_at
+                SELECT deal_id, user_email, campaign_id, ratings, time_spent_seconds,
+                       llm_output_version, created_at
                 FROM annotations
                 ORDER BY deal_id, user_email
             """)
@@ -274,19 +810,27 @@ class DatabaseManager:
                 
                 annotations[deal_id][user_email] = {
                     'user_email': user_email,
+                    'campaign_id': row['campaign_id'],
                     'timestamp': row['created_at'].isoformat(),
-                    'ratings': row['ratings'],
+                    # Stored JSON, embedded in the export without parsing
+                    'ratings': RawJSON(row['ratings']),
+                    'llm_output_version': row['llm_output_version'],
                     'time_spent_seconds': row['time_spent_seconds']
                 }
             
             return annotations
     
-    async def get_user_annotations(self, user_email: str) -> List[str]:
-        """Get list of deal_ids that user has annotated"""
+    async def get_user_annotations(self, user_email: str, campaign_id: Optional[str] = None) -> List[str]:
+        """Get list of deal_ids that user has annotated, optionally within one campaign"""
         async with self.pool.acquire() as connection:
-            rows = await connection.fetch("""
-                SELECT deal_id FROM annotations WHERE user_email = $1
-            """, user_email)
+            if campaign_id is None:
+                rows = await connection.fetch("""
+                    SELECT deal_id FROM annotations WHERE user_email = $1
+                """, user_email)
+            else:
+                rows = await connection.fetch("""
+                    SELECT deal_id FROM annotations WHERE campaign_id = $1 AND user_email = $2
+                """, campaign_id, user_email)
             return [row['deal_id'] for row in rows]
     
     async def create_annotation(self, deal_id: str, user_email: str, 
@@ -294,55 +838,442 @@ class DatabaseManager:
         """Create new annotation"""
         try:
             async with self.pool.acquire() as connection:
-                await connection.execute("""
-                    INSERT INTO annotations (deal_id, user_email, ratings, time_spent_seconds)
-                    VALUES ($1, $2, $3, $4)
-                    ON CONFLICT (deal_id, user_email) 
-                    DO UPDATE SET 
-                        ratings = EXCLUDED.ratings,
-                        time_spent_seconds = EXCLUDED.time_spent_seconds,
-                        updated_at = CURRENT_TIMESTAMP
-                """, deal_id, user_email, json.dumps(ratings), time_spent)
+                async with connection.transaction():
+                    await write_annotations(connection, [{
+                        'deal_id': deal_id, 'user_email': user_email,
+                        'ratings': ratings, 'time_spent': time_spent
+                    }])
                 return True
         except Exception as e:
             print(f"Error creating annotation: {e}")
             return False
-    
+
+    async def create_annotations_batch(self, submissions: List[Dict[str, Any]]) -> bool:
+        """Create many annotations in a single transaction; raises REJECTED_SUBMISSION_ERRORS for bad values"""
+        try:
+            async with self.pool.acquire() as connection:
+                async with connection.transaction():
+                    await write_annotations(connection, submissions)
+                return True
+        except REJECTED_SUBMISSION_ERRORS:
+            raise
+        except Exception as e:
+            print(f"Error creating annotations batch: {e}")
+            return False
+
     async def delete_user_annotations(self, user_email: str) -> bool:
         """Delete all annotations for a user"""
         try:
             async with self.pool.acquire() as connection:
-                await connection.execute("""
-                    DELETE FROM annotations WHERE user_email = $1
-                """, user_email)
+                async with connection.transaction():
+                    deal_ids = await connection.fetch("""
+                        SELECT deal_id FROM annotations WHERE user_email = $1
+                    """, user_email)
+                    await lock_deal_progress(connection, {row['deal_id'] for row in deal_ids})
+                    rows = await connection.fetch("""
+                        DELETE FROM annotations WHERE user_email = $1 RETURNING deal_id, ratings
+                    """, user_email)
+                    await refresh_annotation_counts(connection, {row['deal_id'] for row in rows})
+                    await apply_score_changes(connection, [
+                        (row['deal_id'], json.loads(row['ratings']), None) for row in rows
+                    ])
+                    await connection.execute("""
+                        DELETE FROM annotator_accuracy WHERE user_email = $1
+                    """, user_email)
                 return True
         except Exception as e:
             print(f"Error deleting user annotations: {e}")
             return False
     
-    # Statistics and analytics
-    async def get_annotation_counts_by_deal(self) -> Dict[str, int]:
-        """Get count of annotations per deal"""
+    # Server-side rating queries
+    async def get_annotations_by_score(self, field: str, min_score: Optional[int] = None,
+                                       max_score: Optional[int] = None,
+                                       limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get annotations whose score for a rating field falls in a range"""
+        score = rating_score_expression(field)
+        conditions = [f"{score} IS NOT NULL"]
+        params: List[Any] = []
+        if min_score is not None:
+            params.append(min_score)
+            conditions.append(f"{score} >= ${len(params)}")
+        if max_score is not None:
+            params.append(max_score)
+            conditions.append(f"{score} <= ${len(params)}")
+        params.append(limit)
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT deal_id, user_email, ratings, time_spent_seconds, created_at
+                FROM annotations
+                WHERE {' AND '.join(conditions)}
+                ORDER BY deal_id, user_email
+                LIMIT ${len(params)}
+            """, *params)
+            return [dict(row) for row in rows]
+    
+    async def get_annotations_matching(self, ratings_subset: Dict[str, Any],
+                                       limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get annotations whose ratings contain the given JSON subset"""
         async with self.pool.acquire() as connection:
             rows = await connection.fetch("""
-                SELECT deal_id, COUNT(*) as count
+                SELECT deal_id, user_email, ratings, time_spent_seconds, created_at
                 FROM annotations
-                GROUP BY deal_id
+                WHERE ratings @> $1::jsonb
+                ORDER BY deal_id, user_email
+                LIMIT $2
+            """, json.dumps(ratings_subset), limit)
+            return [dict(row) for row in rows]
+    
+    async def get_score_distribution(self, field: str) -> Dict[int, int]:
+        """Get count of annotations per score for a rating field"""
+        score = rating_score_expression(field)
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT {score} AS score, COUNT(*) AS count
+                FROM annotations
+                WHERE {score} IS NOT NULL
+                GROUP BY 1
+                ORDER BY 1
             """)
-            return {row['deal_id']: row['count'] for row in rows}
+            return {row['score']: row['count'] for row in rows}
+    
+    async def get_deals_with_llm_indicator(self, column: str, indicator: str) -> List[str]:
+        """Get deal_ids whose LLM output lists the given indicator"""
+        if column not in LLM_OUTPUT_INDICATOR_COLUMNS:
+            raise ValueError(f"Unknown indicator column: {column}")
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT deal_id FROM llm_outputs
+                WHERE {column} ? $1
+                ORDER BY deal_id
+            """, indicator)
+            return [row['deal_id'] for row in rows]
+    
+    # Full-text search over activity bodies
+    async def search_deals(self, query: str, campaign_id: Optional[str] = None,
+                           limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """Rank deals whose activity bodies match a web-style query, with a highlighted snippet per deal"""
+        params: List[Any] = [query]
+        campaign_filter = ""
+        if campaign_id is not None:
+            params.append(campaign_id)
+            campaign_filter = f"AND d.campaign_id = ${len(params)}"
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT d.deal_id, d.campaign_id, d.dealstage, d.amount,
+                       ts_rank_cd(d.search_vector, q) AS rank, COUNT(*) OVER () AS total
+                FROM deals d, websearch_to_tsquery('{SEARCH_CONFIG}', $1) q
+                WHERE d.search_vector @@ q {campaign_filter}
+                ORDER BY rank DESC, d.deal_id
+                LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}
+            """, *params, limit, offset)
+            if rows:
+                total = rows[0]['total']
+            elif offset:
+                total = await connection.fetchval(f"""
+                    SELECT COUNT(*) FROM deals d, websearch_to_tsquery('{SEARCH_CONFIG}', $1) q
+                    WHERE d.search_vector @@ q {campaign_filter}
+                """, *params)
+            else:
+                total = 0
+            
+            snippets = await self._search_snippets(connection, query, [row['deal_id'] for row in rows])
+            
+        results = []
+        for row in rows:
+            result = dict(row)
+            del result['total']
+            result.update(snippets.get(row['deal_id'], {"activity_seq": None, "activity_type": None,
+                                                        "field": None, "snippet": None}))
+            results.append(result)
+        return {"total": total, "results": results}
+    
+    async def _search_snippets(self, connection, query: str, deal_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Highlight the best matching body chunk of each deal"""
+        if not deal_ids:
+            return {}
+        rows = await connection.fetch(f"""
+            SELECT DISTINCT ON (a.deal_id) a.deal_id, a.seq, a.activity_type, refs.key AS field, b.body
+            FROM activities a
+            CROSS JOIN LATERAL jsonb_each(a.body_refs) refs
+            CROSS JOIN LATERAL jsonb_array_elements_text(refs.value) ref (body_hash)
+            JOIN activity_bodies b ON b.body_hash = ref.body_hash,
+            websearch_to_tsquery('{SEARCH_CONFIG}', $2) q
+            WHERE a.deal_id = ANY($1::text[]) AND b.search_vector @@ q
+            ORDER BY a.deal_id, ts_rank_cd(b.search_vector, q) DESC, a.seq
+        """, deal_ids, query)
+        if not rows:
+            return {}
+        # Bodies are compressed, so the chosen chunks go back to the server for highlighting
+        headlines = await connection.fetch(f"""
+            SELECT ts_headline('{SEARCH_CONFIG}', t.body, websearch_to_tsquery('{SEARCH_CONFIG}', $2), $3) AS snippet
+            FROM unnest($1::text[]) WITH ORDINALITY AS t (body, n)
+            ORDER BY t.n
+        """, [html.escape(decompress_chunk(row['body'])) for row in rows], query, SEARCH_HEADLINE_OPTIONS)
+        return {
+            row['deal_id']: {"activity_seq": row['seq'], "activity_type": row['activity_type'],
+                             "field": row['field'], "snippet": headline['snippet']}
+            for row, headline in zip(rows, headlines)
+        }
+    
+    # Faceted deal browser
+    async def browse_deals(self, campaign_id: str, filters: tuple, after: Optional[str] = None,
+                           limit: int = 50) -> List[Dict[str, Any]]:
+        """Get a page of a campaign's deals matching facet filters, in deal_id order after a cursor"""
+        params: List[Any] = [campaign_id]
+        conditions = ["p.campaign_id = $1", "NOT p.gold", *filter_conditions(filters, params).values()]
+        if after is not None:
+            params.append(after)
+            conditions.append(f"p.deal_id > ${len(params)}")
+        params.append(limit)
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT p.deal_id, d.dealstage, d.dealtype, d.amount, {FACETS['amount_bucket']} AS amount_bucket,
+                       l.overall_sentiment, d.activity_count, p.annotation_count,
+                       c.target_annotations_per_deal AS target_annotations, {FACETS['status']} AS status
+                {FACETED_DEALS}
+                WHERE {' AND '.join(conditions)}
+                ORDER BY p.deal_id
+                LIMIT ${len(params)}
+            """, *params)
+            return [dict(row) for row in rows]
+    
+    async def get_deal_facet_counts(self, campaign_id: str, filters: tuple) -> Dict[str, Dict[str, int]]:
+        """Count a campaign's deals per value of every facet, in one pass.
+
+        Each facet is counted under all filters except its own, so the
+        counts show what selecting another value of that facet would match.
+        """
+        params: List[Any] = [campaign_id]
+        conditions = filter_conditions(filters, params)
+        facet_rows = ",\n".join(
+            f"('{facet}', {expression}, {' AND '.join(c for f, c in conditions.items() if f != facet) or 'TRUE'})"
+            for facet, expression in FACETS.items()
+        )
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT f.facet, f.value, COUNT(*) AS count
+                {FACETED_DEALS}
+                CROSS JOIN LATERAL (VALUES {facet_rows}) AS f (facet, value, keep)
+                WHERE p.campaign_id = $1 AND NOT p.gold AND f.keep
+                GROUP BY f.facet, f.value
+            """, *params)
+        
+        facets = {facet: {} for facet in FACETS}
+        facets["status"] = {status: 0 for status in ANNOTATION_STATUSES}
+        for row in rows:
+            facets[row['facet']][row['value']] = row['count']
+        return facets
+    
+    async def get_annotation_rows(self, campaign_id: str, since: Optional[datetime] = None) -> tuple:
+        """Get a campaign's annotation count and its annotations updated since a time, from one snapshot"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction(isolation='repeatable_read', readonly=True):
+                total = await connection.fetchval("""
+                    SELECT COUNT(*) FROM annotations WHERE campaign_id = $1
+                """, campaign_id)
+                rows = await connection.fetch(f"""
+                    SELECT id, user_email, deal_id, time_spent_seconds, updated_at, {RATING_ARRAY_COLUMNS}
+                    FROM annotations
+                    WHERE campaign_id = $1 AND ($2::timestamp IS NULL OR updated_at >= $2)
+                """, campaign_id, since)
+                return total, rows
+    
+    async def get_agreement_counts(self, campaign_id: str, bins: int) -> List[Dict[str, Any]]:
+        """Count ratings per LLM overall_sentiment, LLM confidence bin, field and score.
+
+        Only annotations made against the current LLM output version (or before
+        versioning) are compared with it.
+        """
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT l.overall_sentiment,
+                       LEAST(GREATEST(FLOOR(l.confidence * $3)::int, 0), $3 - 1) AS confidence_bin,
+                       f.field,
+                       (a.ratings -> f.field ->> 'score')::int AS score,
+                       COUNT(*) AS ratings,
+                       SUM(l.confidence) AS confidence_sum,
+                       SUM(l.sentiment_score) AS sentiment_score_sum,
+                       SUM(l.sentiment_score * l.sentiment_score) AS sentiment_score_squares
+                FROM annotations a
+                JOIN llm_outputs l ON l.deal_id = a.deal_id
+                CROSS JOIN unnest($2::text[]) AS f(field)
+                WHERE a.campaign_id = $1
+                  AND (a.llm_output_version IS NULL OR a.llm_output_version = l.version)
+                  AND a.ratings -> f.field ->> 'score' IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            """, campaign_id, RATING_FIELDS, bins)
+            return [dict(row) for row in rows]
+    
+    async def get_agreement_version(self, campaign_id: str) -> str:
+        """Watermark that changes whenever a campaign's annotations or any LLM output change"""
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow(f"""
+                SELECT (SELECT COUNT(*) FROM annotations WHERE campaign_id = $1) AS annotations,
+                       (SELECT {row_versions_hash('id')} FROM annotations WHERE campaign_id = $1) AS annotations_version,
+                       (SELECT {row_versions_hash('deal_id')} FROM llm_outputs) AS llm_outputs_version
+            """, campaign_id)
+            return f"{row['annotations']}:{row['annotations_version']}:{row['llm_outputs_version']}"
+    
+    # Gold-standard calibration
+    async def get_gold_deal_ids(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> List[str]:
+        """Get ids of a campaign's gold deals"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT deal_id FROM deal_progress WHERE campaign_id = $1 AND gold ORDER BY deal_id
+            """, campaign_id)
+            return [row['deal_id'] for row in rows]
+    
+    async def get_gold_deals(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> List[Dict[str, Any]]:
+        """Get a campaign's gold deals with their expected ratings"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT g.deal_id, g.expected_ratings, g.created_at, p.annotation_count
+                FROM gold_deals g
+                JOIN deal_progress p ON p.deal_id = g.deal_id
+                WHERE p.campaign_id = $1
+                ORDER BY g.deal_id
+            """, campaign_id)
+            return [dict(row, expected_ratings=json.loads(row['expected_ratings'])) for row in rows]
+    
+    async def set_gold_deal(self, deal_id: str, expected_ratings: Dict[str, Any]) -> bool:
+        """Mark a deal as gold standard, rescoring annotators who already rated it"""
+        return await self._update_gold_deal(deal_id, expected_ratings)
+    
+    async def remove_gold_deal(self, deal_id: str) -> bool:
+        """Return a gold deal to production, removing it from annotator accuracy"""
+        return await self._update_gold_deal(deal_id, None)
+    
+    async def _update_gold_deal(self, deal_id: str, expected_ratings: Optional[Dict[str, Any]]) -> bool:
+        """Change a deal's expected ratings and apply the difference to annotator accuracy"""
+        async with self.pool.acquire() as connection:
+            async with connection.transaction():
+                # Locking the progress row orders this against annotation flushes of the deal
+                campaign_id = await connection.fetchval("""
+                    UPDATE deal_progress SET gold = $2 WHERE deal_id = $1 RETURNING campaign_id
+                """, deal_id, expected_ratings is not None)
+                if campaign_id is None:
+                    return False
+                
+                old_expected = await connection.fetchval("""
+                    SELECT expected_ratings FROM gold_deals WHERE deal_id = $1
+                """, deal_id)
+                old_expected = json.loads(old_expected) if old_expected else None
+                if expected_ratings is None:
+                    await connection.execute("DELETE FROM gold_deals WHERE deal_id = $1", deal_id)
+                else:
+                    await connection.execute("""
+                        INSERT INTO gold_deals (deal_id, expected_ratings) VALUES ($1, $2)
+                        ON CONFLICT (deal_id) DO UPDATE SET expected_ratings = EXCLUDED.expected_ratings
+                    """, deal_id, json.dumps(expected_ratings))
+                
+                rows = await connection.fetch("""
+                    SELECT user_email, ratings FROM annotations WHERE archived = FALSE AND deal_id = $1
+                """, deal_id)
+                await apply_accuracy_changes(connection, [
+                    (row['user_email'], campaign_id,
+                     accuracy_delta(ratings, ratings, old_expected, expected_ratings))
+                    for row in rows for ratings in [json.loads(row['ratings'])]
+                ])
+                return True
     
-    async def get_user_progress(self, user_email: str) -> Dict[str, Any]:
-        """Get user's progress statistics"""
+    async def get_annotator_accuracy(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> List[Dict[str, Any]]:
+        """Get each annotator's accuracy on a campaign's gold deals"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT user_email, gold_annotations, fields_compared, exact_matches, abs_error_sum, updated_at
+                FROM annotator_accuracy
+                WHERE campaign_id = $1
+                ORDER BY user_email
+            """, campaign_id)
+            return [summarize_accuracy(dict(row)) for row in rows]
+    
+    # Statistics and analytics
+    async def get_annotation_counts_by_deal(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> Dict[str, int]:
+        """Get count of annotations per active deal of a campaign"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT deal_id, annotation_count
+                FROM deal_progress
+                WHERE campaign_id = $1 AND archived = FALSE AND gold = FALSE
+            """, campaign_id)
+            return {row['deal_id']: row['annotation_count'] for row in rows}
+
+    async def get_deal_distribution_page(self, campaign_id: str, target: int, adaptive: bool,
+                                         status: Optional[str] = None, after: Optional[tuple] = None,
+                                         descending: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        """Get a page of a campaign's active deals ordered by annotation count, after an (annotation_count, deal_id) cursor"""
+        params: List[Any] = [campaign_id]
+        conditions = ["campaign_id = $1", "archived = FALSE", "gold = FALSE"]
+        if status is not None:
+            if status not in DISTRIBUTION_STATUS_CONDITIONS:
+                raise ValueError(f"Unknown status: {status}")
+            params.extend([target, adaptive])
+            conditions.append(f"({DISTRIBUTION_STATUS_CONDITIONS[status].format(target='$2', adaptive='$3')})")
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            params.extend(after)
+            conditions.append(f"(annotation_count, deal_id) {'<' if descending else '>'} (${len(params) - 1}, ${len(params)})")
+        params.append(limit)
+        
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch(f"""
+                SELECT deal_id, annotation_count, converged
+                FROM deal_progress
+                WHERE {' AND '.join(conditions)}
+                ORDER BY annotation_count {direction}, deal_id {direction}
+                LIMIT ${len(params)}
+            """, *params)
+            return [dict(row) for row in rows]
+    
+    async def get_deal_distribution_summary(self, campaign_id: str, target: int, adaptive: bool) -> Dict[str, int]:
+        """Count a campaign's deals per distribution status in one pass over its counters"""
+        counts = ",\n".join(
+            f"COUNT(*) FILTER (WHERE NOT archived AND {condition.format(target='$2', adaptive='$3')}) AS {status}"
+            for status, condition in DISTRIBUTION_STATUS_CONDITIONS.items()
+        )
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow(f"""
+                SELECT COUNT(*) FILTER (WHERE archived) AS archived, {counts}
+                FROM deal_progress
+                WHERE campaign_id = $1 AND gold = FALSE
+            """, campaign_id, target, adaptive)
+            return dict(row)
+
+    async def get_convergence_by_deal(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> Dict[str, Dict[str, Any]]:
+        """Get annotation count, score uncertainty and convergence of each active deal of a campaign"""
+        async with self.pool.acquire() as connection:
+            rows = await connection.fetch("""
+                SELECT deal_id, annotation_count, uncertainty, converged
+                FROM deal_progress
+                WHERE campaign_id = $1 AND archived = FALSE AND gold = FALSE
+            """, campaign_id)
+            return {row['deal_id']: dict(row) for row in rows}
+
+    async def get_annotation_count_for_deal(self, deal_id: str) -> int:
+        """Get count of annotations for a single deal"""
+        async with self.pool.acquire() as connection:
+            count = await connection.fetchval("""
+                SELECT annotation_count FROM deal_progress WHERE deal_id = $1
+            """, deal_id)
+            return count or 0
+
+    async def get_user_progress(self, user_email: str, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> Dict[str, Any]:
+        """Get user's progress statistics within a campaign"""
         async with self.pool.acquire() as connection:
             # Get completed deals for this user
             completed_deals = await connection.fetch("""
-                SELECT deal_id FROM annotations WHERE user_email = $1
-            """, user_email)
+                SELECT deal_id FROM annotations WHERE campaign_id = $1 AND user_email = $2
+            """, campaign_id, user_email)
             
             # Get total deals count
             total_deals_row = await connection.fetchrow("""
-                SELECT COUNT(*) as total FROM deals
-            """)
+                SELECT COUNT(*) as total FROM deal_progress WHERE campaign_id = $1
+            """, campaign_id)
             
             completed_count = len(completed_deals)
             total_deals = total_deals_row['total']
@@ -353,23 +1284,30 @@ class DatabaseManager:
                 'completed_deals': [row['deal_id'] for row in completed_deals]
             }
     
-    async def get_admin_stats(self) -> Dict[str, Any]:
-        """Get admin dashboard statistics"""
+    async def get_admin_stats(self, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> Dict[str, Any]:
+        """Get admin dashboard statistics for a campaign, read from per-deal counters"""
         async with self.pool.acquire() as connection:
-            # Get basic counts
-            users_count = await connection.fetchval("SELECT COUNT(*) FROM users")
-            deals_count = await connection.fetchval("SELECT COUNT(*) FROM deals")
-            annotations_count = await connection.fetchval("SELECT COUNT(*) FROM annotations")
+            campaign = await connection.fetchrow("""
+                SELECT target_annotations_per_deal, assignment_mode FROM campaigns WHERE campaign_id = $1
+            """, campaign_id)
+            target_per_deal = campaign['target_annotations_per_deal'] if campaign else TARGET_ANNOTATIONS_PER_DEAL
+            adaptive = bool(campaign) and campaign['assignment_mode'] == 'adaptive'
             
-            # Get annotation counts per deal
-            annotation_counts = await connection.fetch("""
-                SELECT deal_id, COUNT(*) as count
-                FROM annotations
-                GROUP BY deal_id
-            """)
+            users_count = await connection.fetchval("""
+                SELECT COUNT(*) FROM users WHERE campaign_id = $1
+            """, campaign_id)
             
-            target_per_deal = 15  # TARGET_ANNOTATIONS_PER_DEAL
-            completed_deals = sum(1 for row in annotation_counts if row['count'] >= target_per_deal)
+            # Archived deals are complete by definition
+            row = await connection.fetchrow("""
+                SELECT COUNT(*) AS deals,
+                       COALESCE(SUM(annotation_count), 0) AS annotations,
+                       COUNT(*) FILTER (WHERE archived OR annotation_count >= $2 OR (converged AND $3)) AS completed
+                FROM deal_progress
+                WHERE campaign_id = $1
+            """, campaign_id, target_per_deal, adaptive)
+            deals_count = row['deals']
+            annotations_count = row['annotations']
+            completed_deals = row['completed']
             
             return {
                 'total_users': users_count,
@@ -379,6 +1317,26 @@ class DatabaseManager:
                 'target_annotations_per_deal': target_per_deal
             }
     
+    async def get_export_version(self, data_type: str) -> Optional[str]:
+        """Get a watermark that changes whenever an exportable table changes"""
+        queries = {
+            # JSON arrays keep field boundaries, so no two different rows hash alike
+            "users": """
+                SELECT COUNT(*), md5(string_agg(json_build_array(email, name, is_admin, campaign_id)::text, ','
+                                                ORDER BY email))
+                FROM users
+            """,
+            "annotations": f"SELECT COUNT(*), {row_versions_hash('id')} FROM annotations",
+            "deals": f"SELECT COUNT(*), {row_versions_hash('deal_id')} FROM deals",
+            "llm_outputs": f"SELECT COUNT(*), {row_versions_hash('deal_id')} FROM llm_outputs"
+        }
+        if data_type not in queries:
+            return None
+        
+        async with self.pool.acquire() as connection:
+            row = await connection.fetchrow(queries[data_type])
+            return f"{row[0]}:{row[1]}"
+    
     async def health_check(self) -> bool:
         """Check database connectivity"""
         try:
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+# Amount buckets as (label, lower bound), ascending; deals without an amount are 'unknown'
+AMOUNT_BUCKETS = [
+    ("<10k", 0),
+    ("10k-50k", 10_000),
+    ("50k-100k", 50_000),
+    ("100k-500k", 100_000),
+    ("500k+", 500_000)
+]
+
+ANNOTATION_STATUSES = ["not_started", "in_progress", "completed", "converged", "archived"]
+
+# Deals of a campaign with their progress counters, campaign settings and LLM output
+FACETED_DEALS = """
+    FROM deal_progress p
+    JOIN deals d ON d.deal_id = p.deal_id
+    JOIN campaigns c ON c.campaign_id = p.campaign_id
+    LEFT JOIN llm_outputs l ON l.deal_id = p.deal_id
+"""
+
+def amount_bucket_expression(column: str = "d.amount") -> str:
+    """SQL expression for the AMOUNT_BUCKETS label of an amount"""
+    cases = " ".join(f"WHEN {column} >= {lower} THEN '{label}'" for label, lower in reversed(AMOUNT_BUCKETS[1:]))
+    return f"(CASE WHEN {column} IS NULL THEN 'unknown' {cases} ELSE '{AMOUNT_BUCKETS[0][0]}' END)"
+
+# Same rules as the deal distribution: convergence only completes deals of adaptive campaigns
+STATUS_EXPRESSION = """(CASE
+    WHEN p.archived THEN 'archived'
+    WHEN p.converged AND c.assignment_mode = 'adaptive' THEN 'converged'
+    WHEN p.annotation_count >= c.target_annotations_per_deal THEN 'completed'
+    WHEN p.annotation_count > 0 THEN 'in_progress'
+    ELSE 'not_started'
+END)"""
+
+# Facet name to its SQL expression over FACETED_DEALS
+FACETS = {
+    "dealstage": "COALESCE(d.dealstage, 'unknown')",
+    "dealtype": "COALESCE(d.dealtype, 'unknown')",
+    "amount_bucket": amount_bucket_expression(),
+    "overall_sentiment": "COALESCE(l.overall_sentiment, 'unknown')",
+    "status": STATUS_EXPRESSION
+}
+
+def normalize_filters(filters: Dict[str, Optional[List[str]]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """Selected values per facet as a sorted, hashable tuple, leaving out facets without a selection"""
+    normalized = []
+    for facet, values in sorted(filters.items()):
+        if facet not in FACETS:
+            raise ValueError(f"Unknown facet: {facet}")
+        if values:
+            normalized.append((facet, tuple(sorted(set(values)))))
+    return tuple(normalized)
+
+def filter_conditions(filters: Tuple[Tuple[str, Tuple[str, ...]], ...], params: List[Any]) -> Dict[str, str]:
+    """SQL condition per filtered facet, appending its values to params"""
+    conditions = {}
+    for facet, values in filters:
+        params.append(list(values))
+        conditions[facet] = f"{FACETS[facet]} = ANY(${len(params)}::text[])"
+    return conditions
+
+def matching_total(facets: Dict[str, Dict[str, int]], filters: Tuple[Tuple[str, Tuple[str, ...]], ...]) -> int:
+    """Deals matching every filter, from the status facet counts (which leave out only the status filter)"""
+    selected = dict(filters).get("status")
+    counts = facets.get("status", {})
+    return sum(count for status, count in counts.items() if selected is None or status in selected)
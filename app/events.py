@@ -0,0 +1,99 @@
+import asyncio
+import json
+from typing import Any, Dict, Optional, Set
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Seconds between keep-alive comments on idle streams (keeps proxies from closing them)
+SSE_KEEPALIVE_SECONDS = 25
+
+def progress_topic(email: str) -> str:
+    """Topic carrying progress updates for a single user"""
+    return f"progress:{email}"
+
+def admin_topic(campaign_id: str) -> str:
+    """Topic carrying annotation updates for one campaign's admin dashboards"""
+    return f"admin:{campaign_id}"
+
+def format_sse(event: str, data: Any) -> str:
+    """Format a server-sent event frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class EventBus:
+    """In-process publish/subscribe bus feeding server-sent event streams.
+
+    Events only reach subscribers connected to the same worker process.
+    """
+
+    def __init__(self, max_queue_size: int = 100):
+        self.max_queue_size = max_queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, topic: str) -> asyncio.Queue:
+        """Register a new subscriber queue for a topic"""
+        queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._subscribers.setdefault(topic, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, topic: str, queue: asyncio.Queue):
+        """Remove a subscriber queue"""
+        queues = self._subscribers.get(topic)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        """Check whether anyone is listening on a topic"""
+        return bool(self._subscribers.get(topic))
+
+    def publish(self, topic: str, event: str, data: Any) -> int:
+        """Publish an event to all subscribers of a topic, returns number of receivers"""
+        queues = self._subscribers.get(topic)
+        if not queues:
+            return 0
+
+        frame = format_sse(event, data)
+        for queue in queues:
+            if queue.full():
+                # Slow consumer - drop the oldest frame rather than block publishers
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(frame)
+        return len(queues)
+
+def stream_events(request: Request, topic: str, initial_event: Optional[str] = None,
+                  initial_data: Any = None) -> StreamingResponse:
+    """Create a text/event-stream response subscribed to a topic"""
+    async def event_generator():
+        # Subscribe only once the response starts so a request that never streams leaves no queue behind
+        queue = event_bus.subscribe(topic)
+        try:
+            if initial_event:
+                yield format_sse(initial_event, initial_data)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                    yield frame
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+        finally:
+            event_bus.unsubscribe(topic, queue)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable nginx response buffering
+        }
+    )
+
+# Global event bus instance
+event_bus = EventBus()
@@ -0,0 +1,85 @@
+import re
+import json
+import math
+import secrets
+from enum import Enum
+from typing import Any, List
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is the fallback
+    orjson = None
+
+if orjson is not None and not hasattr(orjson, "Fragment"):
+    # Fragment arrived in orjson 3.10; older releases take the stdlib path
+    orjson = None
+
+class RawJSON(str):
+    """Text that is already valid JSON, written to the output as is.
+
+    JSON and JSONB columns come back from asyncpg as text, so wrapping them
+    lets a response embed them without a json.loads/json.dumps round trip.
+    """
+    __slots__ = ()
+
+def raw_json_field(data, field_name, default=None):
+    """JSON column text as RawJSON without parsing it, default when missing"""
+    field_data = data.get(field_name)
+    if isinstance(field_data, str):
+        return RawJSON(field_data)
+    return field_data if field_data is not None else default
+
+def _dumps_orjson(content: Any) -> bytes:
+    def default(value):
+        # Subclasses of builtins are passed through so RawJSON reaches this hook
+        if isinstance(value, RawJSON):
+            return orjson.Fragment(str(value))
+        if isinstance(value, Enum):
+            return value.value
+        for base in (str, int, float, dict, list, tuple):
+            if isinstance(value, base):
+                return base(value)
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    return orjson.dumps(content, default=default,
+                        option=orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS)
+
+# The stdlib encoder has no fragments, so raw values are encoded as "<NUL><token><n>" strings
+# and swapped back in afterwards. It escapes NUL as \u0000, and the token is random per process,
+# so genuine strings cannot collide with a placeholder.
+_TOKEN = secrets.token_hex(8)
+_PLACEHOLDER = re.compile(rb'"\\u0000' + _TOKEN.encode("ascii") + rb'(\d+)"')
+
+def _replace_raw(value: Any, fragments: List[str]) -> Any:
+    if isinstance(value, RawJSON):
+        fragments.append(value)
+        return f"\x00{_TOKEN}{len(fragments) - 1}"
+    if isinstance(value, float) and not math.isfinite(value):
+        # null, as orjson writes NaN and infinities
+        return None
+    if isinstance(value, dict):
+        return {key: _replace_raw(item, fragments) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_raw(item, fragments) for item in value]
+    return value
+
+def _dumps_stdlib(content: Any) -> bytes:
+    fragments: List[str] = []
+    body = json.dumps(_replace_raw(content, fragments), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+    if not fragments:
+        return body
+    return _PLACEHOLDER.sub(lambda match: fragments[int(match.group(1))].encode("utf-8"), body)
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact UTF-8 JSON, splicing RawJSON values in unparsed; NaN and infinities become null"""
+    if orjson is not None:
+        return _dumps_orjson(content)
+    return _dumps_stdlib(content)
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when installed, with RawJSON values spliced in"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,39 @@
+import hashlib
+from fastapi import Request
+from fastapi.responses import Response
+
+# Personalized pages may be stored by the browser but must be revalidated on every use
+PRIVATE_REVALIDATE = "private, no-cache"
+
+def make_etag(*parts) -> str:
+    """Build a weak ETag from the versions a response was rendered from"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:20]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header matches an ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    # Weak comparison: W/ prefixes are ignored on both sides
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+def not_modified(etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """Create a 304 response for a matching ETag"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+def set_validators(response: Response, etag: str, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    """Attach ETag and Cache-Control headers to a response"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    return response
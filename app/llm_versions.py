@@ -0,0 +1,85 @@
+import json
+from difflib import SequenceMatcher
+from typing import Any, Dict, List
+
+# Fields of an LLM output that are versioned, in column order
+LLM_OUTPUT_FIELDS = [
+    "overall_sentiment", "sentiment_score", "confidence", "activity_breakdown",
+    "deal_momentum_indicators", "reasoning", "professional_gaps", "excellence_indicators",
+    "risk_indicators", "opportunity_indicators", "temporal_trend", "recommended_actions",
+    "context_analysis_notes"
+]
+
+# Fields stored as JSON in llm_outputs, with their empty values
+LLM_OUTPUT_JSON_FIELDS = {
+    "activity_breakdown": {}, "deal_momentum_indicators": {}, "professional_gaps": [],
+    "excellence_indicators": [], "risk_indicators": [], "opportunity_indicators": [],
+    "recommended_actions": [], "context_analysis_notes": []
+}
+
+def normalize_output(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Get the versioned fields of an LLM output with JSON columns parsed"""
+    output = {}
+    for field in LLM_OUTPUT_FIELDS:
+        value = row.get(field)
+        if field in LLM_OUTPUT_JSON_FIELDS and isinstance(value, str):
+            value = json.loads(value)
+        output[field] = value
+    return output
+
+def diff_outputs(source: Dict[str, Any], target: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute a compact diff that turns source into target.
+
+    Changed lists are stored as splices of the changed items only, other
+    changed fields are stored whole.
+    """
+    diff: Dict[str, Any] = {}
+    for field in LLM_OUTPUT_FIELDS:
+        old, new = source.get(field), target.get(field)
+        if old == new:
+            continue
+        if isinstance(old, list) and isinstance(new, list):
+            matcher = SequenceMatcher(a=[json.dumps(item, sort_keys=True) for item in old],
+                                      b=[json.dumps(item, sort_keys=True) for item in new],
+                                      autojunk=False)
+            diff.setdefault("splice", {})[field] = [
+                [i1, i2, new[j1:j2]]
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"
+            ]
+        else:
+            diff.setdefault("set", {})[field] = new
+    return diff
+
+def apply_diff(source: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a diff from diff_outputs to an output"""
+    result = dict(source)
+    result.update(diff.get("set", {}))
+    for field, splices in diff.get("splice", {}).items():
+        items = list(source.get(field) or [])
+        # Later splices first so earlier indices stay valid
+        for i1, i2, replacement in reversed(splices):
+            items[i1:i2] = replacement
+        result[field] = items
+    return result
+
+def rebuild_versions(latest: Dict[str, Any], versions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rebuild every version from the latest output and the reverse diffs of older versions.
+
+    ``versions`` must be ordered newest first; each entry's ``reverse_diff``
+    turns the next newer version into it.
+    """
+    history = []
+    current = latest
+    for version in versions:
+        if version.get("reverse_diff") is not None:
+            reverse_diff = version["reverse_diff"]
+            if isinstance(reverse_diff, str):
+                reverse_diff = json.loads(reverse_diff)
+            current = apply_diff(current, reverse_diff)
+        history.append({
+            "version": version["version"],
+            "label": version.get("label"),
+            "created_at": version["created_at"].isoformat() if version.get("created_at") else None,
+            "output": current
+        })
+    return history
@@ -1,16 +1,34 @@
-from fastapi import FastAPI, Request, Form, HTTPException, Depends, Cookie
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request, Form, HTTPException, Depends, Cookie, Query
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, Response
+from starlette.background import BackgroundTask
 from datetime import datetime, timedelta, timezone
 import json
+import asyncio
 import os
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Set
 from dotenv import load_dotenv
 
 from .models import *
-from .auth import get_current_user, create_access_token, verify_token
-from .database import db_manager
+from .auth import (get_current_user, create_access_token, verify_token, create_admin_token, verify_admin_session,
+                   set_session_cookie, revoke_tokens, revoke_users, SessionRenewalMiddleware, ADMIN_SESSION_HOURS)
+from .database import db_manager, REJECTED_SUBMISSION_ERRORS
+from .events import event_bus, stream_events, progress_topic, admin_topic
+from .submissions import submission_queue, SubmissionRejected
+from .convergence import assignment_priority, field_scores, DEFAULT_MIN_ANNOTATIONS, DEFAULT_MAX_HALF_WIDTH
+from .calibration import pick_calibration_deal, DEFAULT_CALIBRATION_RATE
+from .analytics import annotator_analytics
+from .agreement import build_agreement_report, AGREEMENT_CONFIDENCE_BINS
+from .cache import TTLCache, CacheInvalidations
+from .assets import asset_manifest, AssetManifest, VersionedStaticFiles, render_service_worker, STATIC_DIR
+from .compression import CompressionMiddleware
+from .profiler import (ProfileRequestMiddleware, acquire_profiler, release_profiler, PROFILE_REQUESTS,
+                       PROFILER_MAX_SECONDS)
+from .fast_json import FastJSONResponse, raw_json_field
+from .templating import create_templates, precompile_templates
+from .activity_views import activity_view
+from .deal_facets import normalize_filters, matching_total
+from .bulk_users import parse_records, check_size, prepare_new_users, prepare_emails, summarize_results
+from .http_cache import make_etag, etag_matches, not_modified, set_validators
 
 # Load environment variables
 load_dotenv()
@@ -18,13 +36,71 @@ load_dotenv()
 # Initialize FastAPI app
 app = FastAPI(title="Deal Validation App", version="2.0.0")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Sends the cookie of sessions renewed while authenticating the request
+app.add_middleware(SessionRenewalMiddleware)
 
-# Templates
-templates = Jinja2Templates(directory="templates")
+# Profile requests sent with an X-Profile header by an admin, only installed when enabled
+if PROFILE_REQUESTS:
+    app.add_middleware(ProfileRequestMiddleware)
 
-TARGET_ANNOTATIONS_PER_DEAL = 7
+# Compress responses above the size threshold (brotli when installed, otherwise gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)))
+
+# Mount static files, fingerprinted URLs are cached as immutable
+app.mount("/static", VersionedStaticFiles(directory=STATIC_DIR, manifest=asset_manifest), name="static")
+
+# Templates, all compiled up front from the bytecode cache so no request pays for compiling one
+templates = create_templates()
+templates.env.globals["static_url"] = asset_manifest.url
+precompile_templates(templates)
+
+# Changes whenever a template or static asset changes, so rendered-page ETags roll over on deploy
+template_manifest = AssetManifest("templates")
+template_manifest.build()
+RENDER_VERSION = f"{template_manifest.version}:{asset_manifest.version}"
+
+# Service worker script, rendered once with the current asset version
+SERVICE_WORKER_SCRIPT = render_service_worker(asset_manifest)
+
+# Largest value a Postgres integer column holds
+INT4_MAX = 2 ** 31 - 1
+
+# Next deal computed while the user is still on the rating page, keyed by email
+precomputed_next_deals = TTLCache(max_size=10000, ttl_seconds=30 * 60)
+
+# Parsed and sorted deals, warmed ahead of the annotator reaching them
+deal_view_cache = TTLCache(max_size=512, ttl_seconds=10 * 60)
+
+# Campaign each user annotates, and campaign settings, keyed by email and campaign_id
+user_campaigns = TTLCache(max_size=10000, ttl_seconds=5 * 60)
+campaign_cache = TTLCache(max_size=256, ttl_seconds=60)
+
+def drop_user_caches(emails: List[str]):
+    """Drop cached campaign assignments and precomputed next deals of users in this worker"""
+    for email in emails:
+        user_campaigns.pop(email)
+        precomputed_next_deals.pop(email)
+
+# Users changed through another worker, dropped from the caches above within a few seconds
+user_cache_invalidations = CacheInvalidations(
+    lambda since: db_manager.get_user_cache_invalidations(since), drop_user_caches,
+    refresh_seconds=float(os.getenv("CACHE_INVALIDATION_REFRESH", 5))
+)
+
+# LLM-vs-human agreement reports keyed by campaign, bins and data watermark
+agreement_report_cache = TTLCache(max_size=64, ttl_seconds=60 * 60)
+
+# Gold deal ids per campaign, mixed into assignment for calibration
+gold_deal_cache = TTLCache(max_size=256, ttl_seconds=60)
+
+# Admin statistics per campaign, dropped whenever a flush touches that campaign
+campaign_stats_cache = TTLCache(max_size=256, ttl_seconds=int(os.getenv("CAMPAIGN_STATS_TTL", 30)))
+
+# Deal browser facet counts keyed by campaign and filters; counts may lag writes by the TTL
+deal_facet_cache = TTLCache(max_size=512, ttl_seconds=int(os.getenv("DEAL_FACETS_TTL", 30)))
+
+# Deal distribution counters per campaign, dropped whenever a flush touches that campaign
+distribution_summary_cache = TTLCache(max_size=256, ttl_seconds=int(os.getenv("CAMPAIGN_STATS_TTL", 30)))
 
 def parse_json_field(data, field_name, default=None):
     """Parse JSON field from database"""
@@ -36,6 +112,16 @@ def parse_json_field(data, field_name, default=None):
             return default
     return field_data if field_data is not None else default
 
+def parse_int_field(value: Any, field: str, minimum: int = 0) -> int:
+    """Parse a submitted integer, rejecting values its integer column cannot store"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+    if not minimum <= number <= INT4_MAX:
+        raise HTTPException(status_code=400, detail=f"{field} out of range")
+    return number
+
 def get_deal_annotation_counts(annotations: Dict) -> Dict[str, int]:
     """Get count of unique annotators for each deal"""
     deal_counts = {}
@@ -43,25 +129,127 @@ def get_deal_annotation_counts(annotations: Dict) -> Dict[str, int]:
         deal_counts[deal_id] = len(deal_annotations.keys())
     return deal_counts
 
-async def get_next_deal_for_user(email: str) -> Optional[str]:
+async def get_user_campaign_id(email: str) -> str:
+    """Get the campaign a user is annotating"""
+    await user_cache_invalidations.refresh()
+    campaign_id = user_campaigns.get(email)
+    if campaign_id is None:
+        user = await db_manager.get_user_by_email(email)
+        campaign_id = user["campaign_id"] if user else DEFAULT_CAMPAIGN_ID
+        user_campaigns.set(email, campaign_id)
+    return campaign_id
+
+async def get_campaign_settings(campaign_id: str) -> Dict[str, Any]:
+    """Get a campaign's target and assignment settings"""
+    campaign = campaign_cache.get(campaign_id)
+    if campaign is None:
+        campaign = await db_manager.get_campaign(campaign_id)
+        if not campaign:
+            return {
+                "campaign_id": campaign_id,
+                "target_annotations_per_deal": TARGET_ANNOTATIONS_PER_DEAL,
+                "assignment_mode": "fixed",
+                "convergence_min_annotations": DEFAULT_MIN_ANNOTATIONS,
+                "convergence_max_half_width": DEFAULT_MAX_HALF_WIDTH,
+                "calibration_rate": DEFAULT_CALIBRATION_RATE
+            }
+        campaign_cache.set(campaign_id, campaign)
+    return campaign
+
+async def get_campaign_target(campaign_id: str) -> int:
+    """Get the annotations each deal of a campaign needs"""
+    campaign = await get_campaign_settings(campaign_id)
+    return campaign["target_annotations_per_deal"]
+
+async def get_gold_deal_ids(campaign_id: str) -> List[str]:
+    """Get a campaign's gold deal ids"""
+    gold_deal_ids = gold_deal_cache.get(campaign_id)
+    if gold_deal_ids is None:
+        gold_deal_ids = await db_manager.get_gold_deal_ids(campaign_id)
+        gold_deal_cache.set(campaign_id, gold_deal_ids)
+    return gold_deal_ids
+
+async def get_campaign_stats(campaign_id: str) -> Dict[str, Any]:
+    """Get admin statistics for a campaign, cached until its next flush"""
+    stats = campaign_stats_cache.get(campaign_id)
+    if stats is None:
+        stats = await db_manager.get_admin_stats(campaign_id)
+        campaign_stats_cache.set(campaign_id, stats)
+    return stats
+
+async def write_submissions(submissions: List[Dict[str, Any]]) -> bool:
+    """Flush journaled submissions and drop the stats of the campaigns they touched"""
+    try:
+        if not await db_manager.create_annotations_batch(submissions):
+            return False
+    except REJECTED_SUBMISSION_ERRORS as e:
+        raise SubmissionRejected(str(e))
+    
+    campaign_ids = {s.get("campaign_id") for s in submissions}
+    if None in campaign_ids:
+        # Journaled before campaigns existed
+        campaign_stats_cache.clear()
+        distribution_summary_cache.clear()
+    for campaign_id in campaign_ids - {None}:
+        campaign_stats_cache.pop(campaign_id)
+        distribution_summary_cache.pop(campaign_id)
+    return True
+
+async def get_user_completed_deals(email: str) -> Set[str]:
+    """Get deals a user has completed in their campaign, including submissions not yet flushed"""
+    campaign_id = await get_user_campaign_id(email)
+    completed_deals = set(await db_manager.get_user_annotations(email, campaign_id))
+    return completed_deals | submission_queue.pending_deals_for_user(email)
+
+async def get_user_progress(email: str) -> Dict[str, Any]:
+    """Get user progress, including submissions not yet flushed"""
+    campaign_id = await get_user_campaign_id(email)
+    progress = await db_manager.get_user_progress(email, campaign_id)
+    
+    pending_deals = submission_queue.pending_deals_for_user(email) - set(progress["completed_deals"])
+    if pending_deals:
+        progress["completed_deals"] = progress["completed_deals"] + sorted(pending_deals)
+        progress["completed_count"] += len(pending_deals)
+    
+    return progress
+
+async def get_annotation_counts_by_deal(campaign_id: str) -> Dict[str, int]:
+    """Get annotation counts per active deal of a campaign, including submissions not yet flushed"""
+    annotation_counts = await db_manager.get_annotation_counts_by_deal(campaign_id)
+    for deal_id, pending_count in submission_queue.pending_counts_by_deal().items():
+        if deal_id in annotation_counts:
+            annotation_counts[deal_id] += pending_count
+    return annotation_counts
+
+async def get_next_deal_for_user(email: str, completed_deals: Optional[Set[str]] = None) -> Optional[str]:
     """Get next deal ID for user to annotate with intelligent distribution"""
     # Get deals this user has already completed
-    user_completed_deals = set(await db_manager.get_user_annotations(email))
+    if completed_deals is None:
+        user_completed_deals = await get_user_completed_deals(email)
+    else:
+        user_completed_deals = completed_deals
+    
+    campaign_id = await get_user_campaign_id(email)
+    campaign = await get_campaign_settings(campaign_id)
+    
+    # Gold deals are mixed into the stream at the campaign's calibration rate
+    calibration_deal = pick_calibration_deal(campaign["calibration_rate"], await get_gold_deal_ids(campaign_id),
+                                             user_completed_deals)
+    if calibration_deal:
+        return calibration_deal
     
-    # Get all deals
-    deals = await db_manager.get_deals()
+    if campaign["assignment_mode"] == "adaptive":
+        return await get_next_adaptive_deal(campaign, user_completed_deals)
     
-    # Get annotation counts for all deals
-    annotation_counts = await db_manager.get_annotation_counts_by_deal()
+    # Get annotation counts for the deals of the user's campaign still open for annotation
+    target = campaign["target_annotations_per_deal"]
+    annotation_counts = await get_annotation_counts_by_deal(campaign_id)
     
     # Create list of available deals for this user with their current annotation counts
     available_deals = []
-    for deal_id in deals.keys():
-        deal_id = str(deal_id)
-        if deal_id not in user_completed_deals:
-            current_count = annotation_counts.get(deal_id, 0)
-            if current_count < TARGET_ANNOTATIONS_PER_DEAL:
-                available_deals.append((deal_id, current_count))
+    for deal_id, current_count in annotation_counts.items():
+        if deal_id not in user_completed_deals and current_count < target:
+            available_deals.append((deal_id, current_count))
     
     if not available_deals:
         return None
@@ -73,29 +261,96 @@ async def get_next_deal_for_user(email: str) -> Optional[str]:
     # Return the deal with the lowest annotation count
     return available_deals[0][0]
 
-def sort_activities_chronologically(activities: List[Dict]) -> List[Dict]:
-    """Sort activities by timestamp"""
-    def get_timestamp(activity):
-        timestamp_fields = [
-            'sent_at', 'createdate', 'meeting_start_time', 'lastmodifieddate'
-        ]
-        
-        for field in timestamp_fields:
-            if field in activity and activity[field]:
-                try:
-                    timestamp_str = activity[field]
-                    if isinstance(timestamp_str, str):
-                        # Handle various timestamp formats
-                        timestamp_str = timestamp_str.replace('Z', '+00:00')
-                        return datetime.fromisoformat(timestamp_str)
-                except:
-                    continue
-        
-        return datetime.min.replace(tzinfo=timezone.utc)
+async def get_next_adaptive_deal(campaign: Dict[str, Any], user_completed_deals: Set[str]) -> Optional[str]:
+    """Pick a deal whose scores have not converged, favouring the most contested ones"""
+    convergence = await db_manager.get_convergence_by_deal(campaign["campaign_id"])
+    pending_counts = submission_queue.pending_counts_by_deal()
+    target = campaign["target_annotations_per_deal"]
+    min_annotations = campaign["convergence_min_annotations"]
+    
+    # Converged deals are retired; the target stays a hard cap for deals that never agree
+    best = None
+    for deal_id, progress in convergence.items():
+        if progress["converged"] or deal_id in user_completed_deals:
+            continue
+        current_count = progress["annotation_count"] + pending_counts.get(deal_id, 0)
+        if current_count >= target:
+            continue
+        key = (assignment_priority(current_count, progress["uncertainty"], min_annotations), deal_id)
+        if best is None or key < best:
+            best = key
+    
+    return best[1] if best else None
+
+async def precompute_next_deal(email: str, current_deal_id: str, completed_deals: Set[str],
+                               progress: Dict[str, Any]):
+    """Pick the deal that follows current_deal_id so submitting it needs no lookups"""
+    next_deal = await get_next_deal_for_user(email, completed_deals | {current_deal_id})
+    
+    entry = {
+        "current_deal": current_deal_id,
+        "next_deal": next_deal,
+        "completed_deals": set(completed_deals),
+        "completed_count": progress["completed_count"],
+        "total_deals": progress["total_deals"]
+    }
+    precomputed_next_deals.set(email, entry)
+    
+    # Warm the next deal so its activities page renders without a database fetch
+    if next_deal:
+        await get_deal_view(next_deal)
     
-    return sorted(activities, key=get_timestamp)
+    return entry
 
-async def get_admin_dashboard_context(request: Request, authenticated: bool = True):
+def peek_precomputed_next_deal(email: str, current_deal_id: str) -> Optional[Dict[str, Any]]:
+    """Get the precomputed next deal if it belongs to this deal"""
+    entry = precomputed_next_deals.get(email)
+    if not entry or entry["current_deal"] != current_deal_id:
+        return None
+    return entry
+
+async def is_deal_open(campaign_id: str, deal_id: str) -> bool:
+    """Whether a deal still needs annotations, counting submissions not yet flushed; gold deals always do"""
+    if deal_id in await get_gold_deal_ids(campaign_id):
+        return True
+    target = await get_campaign_target(campaign_id)
+    current_count = await db_manager.get_annotation_count_for_deal(deal_id)
+    current_count += submission_queue.pending_counts_by_deal().get(deal_id, 0)
+    return current_count < target
+
+def take_precomputed_next_deal(email: str, current_deal_id: str) -> Optional[Dict[str, Any]]:
+    """Consume the precomputed next deal if it belongs to this deal"""
+    entry = peek_precomputed_next_deal(email, current_deal_id)
+    if entry:
+        precomputed_next_deals.pop(email)
+    return entry
+
+async def get_deal_view(deal_id: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get a deal with its activities, cached per deal"""
+    view = deal_view_cache.get(deal_id)
+    if view is not None and (version is None or view["deal"].get("row_version") == version):
+        return view
+    
+    deal = await db_manager.get_deal_by_id(deal_id)
+    if not deal:
+        return None
+    
+    # Activities are stored in chronological order; the page only needs their view models
+    activities = await db_manager.get_deal_activities(deal_id)
+    
+    view = {"deal": deal, "activities": [activity_view(activity) for activity in activities]}
+    deal_view_cache.set(deal_id, view)
+    return view
+
+async def get_deal_summary(deal_id: str, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Get deal metadata, reusing a cached view but never loading activity bodies"""
+    view = deal_view_cache.get(deal_id)
+    if view is not None and (version is None or view["deal"].get("row_version") == version):
+        return view["deal"]
+    return await db_manager.get_deal_by_id(deal_id)
+
+async def get_admin_dashboard_context(request: Request, authenticated: bool = True,
+                                      campaign_id: str = DEFAULT_CAMPAIGN_ID):
     """Get admin dashboard context data"""
     if not authenticated:
         return {
@@ -103,12 +358,12 @@ async def get_admin_dashboard_context(request: Request, authenticated: bool = Tr
             "authenticated": False
         }
     
-    # Get users with their progress
-    users = await db_manager.get_users()
+    # Get the campaign's users with their progress
+    users = [user for user in await db_manager.get_users() if user["campaign_id"] == campaign_id]
     user_progress = []
     
     for user in users:
-        progress = await db_manager.get_user_progress(user["email"])
+        progress = await get_user_progress(user["email"])
         user_progress.append({
             "email": user["email"],
             "name": user["name"],
@@ -118,18 +373,42 @@ async def get_admin_dashboard_context(request: Request, authenticated: bool = Tr
         })
     
     # Get admin stats
-    admin_stats = await db_manager.get_admin_stats()
+    admin_stats = await get_campaign_stats(campaign_id)
     
     return {
         "request": request,
+        "campaign_id": campaign_id,
+        "campaigns": await db_manager.get_campaigns(),
         "users": user_progress,
         "total_deals": admin_stats['total_deals'],
         "total_annotations": admin_stats['total_annotations'],
         "completed_deals": admin_stats['completed_deals'],
-        "target_annotations_per_deal": TARGET_ANNOTATIONS_PER_DEAL,
+        "target_annotations_per_deal": admin_stats['target_annotations_per_deal'],
         "authenticated": True
     }
 
+async def publish_submission_events(email: str, campaign_id: str, deal_id: str, progress: Dict[str, Any]):
+    """Publish progress and distribution updates after an annotation is saved"""
+    event_bus.publish(progress_topic(email), "progress", {
+        "completed_count": progress["completed_count"],
+        "total_deals": progress["total_deals"]
+    })
+    
+    # Only pay for the count query when an admin dashboard is listening
+    topic = admin_topic(campaign_id)
+    if event_bus.has_subscribers(topic):
+        target = await get_campaign_target(campaign_id)
+        current_count = await db_manager.get_annotation_count_for_deal(deal_id)
+        current_count += submission_queue.pending_counts_by_deal().get(deal_id, 0)
+        event_bus.publish(topic, "annotation", {
+            "deal_id": deal_id,
+            "user_email": email,
+            "user_completed_count": progress["completed_count"],
+            "current_annotations": current_count,
+            "target_annotations": target,
+            "deal_completed": current_count == target
+        })
+
 # Custom exception handler for authentication errors
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -153,7 +432,10 @@ async def startup_event():
     """Initialize database connection on startup"""
     try:
         await db_manager.initialize()
+        if os.getenv("DB_AUTO_MIGRATE", "false").lower() == "true":
+            await db_manager.migrate()
         print("Database initialized successfully")
+        await submission_queue.start(write_submissions)
     except Exception as e:
         print(f"Failed to initialize database: {e}")
         raise e
@@ -161,8 +443,18 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close database connection on shutdown"""
+    await submission_queue.stop()
     await db_manager.close()
 
+@app.get("/sw.js")
+async def service_worker():
+    """Service worker served from the root so it controls every page"""
+    return Response(
+        content=SERVICE_WORKER_SCRIPT,
+        media_type="application/javascript",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 @app.get("/", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Login page"""
@@ -185,19 +477,13 @@ async def login(request: Request, email: str = Form(...)):
     
     # Set cookie and redirect
     response = RedirectResponse(url="/instructions", status_code=302)
-    response.set_cookie(
-        key="access_token", 
-        value=token, 
-        httponly=True,
-        max_age=24*60*60,  # 24 hours
-        samesite="lax"
-    )
+    set_session_cookie(response, token)
     return response
 
 @app.get("/instructions", response_class=HTMLResponse)
 async def instructions(request: Request, current_user: str = Depends(get_current_user)):
     """Instructions page"""
-    progress = await db_manager.get_user_progress(current_user)
+    progress = await get_user_progress(current_user)
     
     return templates.TemplateResponse("instructions.html", {
         "request": request,
@@ -215,50 +501,124 @@ async def start_annotation(current_user: str = Depends(get_current_user)):
     
     return RedirectResponse(url=f"/activities/{next_deal}", status_code=302)
 
+def distribution_status(count: int, converged: bool, target: int, adaptive: bool) -> str:
+    """Distribution status of an active deal; in adaptive campaigns a converged deal is complete before the target"""
+    if converged and adaptive:
+        return "converged"
+    if count >= target:
+        return "completed"
+    return "in_progress" if count > 0 else "not_started"
+
+async def get_distribution_summary(campaign_id: str, target: int, adaptive: bool) -> Dict[str, int]:
+    """Get deal counts per distribution status, cached until the campaign's next flush"""
+    summary = distribution_summary_cache.get(campaign_id)
+    if summary is None:
+        summary = await db_manager.get_deal_distribution_summary(campaign_id, target, adaptive)
+        distribution_summary_cache.set(campaign_id, summary)
+    return summary
+
 @app.get("/api/admin/deal-distribution")
-async def get_deal_distribution(admin_token: Optional[str] = Cookie(None)):
-    """Get deal annotation distribution for admin monitoring"""
-    if not admin_token or admin_token != os.getenv("ADMIN_PASSWORD"):
+async def get_deal_distribution(
+    campaign_id: str = DEFAULT_CAMPAIGN_ID,
+    status: Optional[str] = Query(None, pattern="^(not_started|in_progress|completed|converged)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Get deal annotation distribution for admin monitoring, a page of deals at a time.
+
+    Deals are ordered by annotation count, least annotated first unless
+    order=desc. Pass next_cursor as after to get the following page.
+    """
+    if not await verify_admin_session(admin_token):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    deals = await db_manager.get_deals()
-    annotation_counts = await db_manager.get_annotation_counts_by_deal()
+    cursor = None
+    if after:
+        count, _, deal_id = after.partition(":")
+        if not count.isdigit() or not deal_id:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        cursor = (int(count), deal_id)
     
-    distribution_stats = {
-        "target_per_deal": TARGET_ANNOTATIONS_PER_DEAL,
-        "total_deals": len(deals),
-        "completed_deals": 0,
-        "in_progress_deals": 0,
-        "not_started_deals": 0,
-        "deal_details": []
-    }
+    # Archived deals reached their target and are only counted, not listed
+    campaign = await get_campaign_settings(campaign_id)
+    target = campaign["target_annotations_per_deal"]
+    adaptive = campaign["assignment_mode"] == "adaptive"
+    summary = await get_distribution_summary(campaign_id, target, adaptive)
+    rows = await db_manager.get_deal_distribution_page(campaign_id, target, adaptive, status, cursor,
+                                                       order == "desc", limit)
     
-    for deal_id in deals.keys():
-        deal_id = str(deal_id)
-        current_count = annotation_counts.get(deal_id, 0)
-        
-        status = "not_started"
-        if current_count >= TARGET_ANNOTATIONS_PER_DEAL:
-            status = "completed"
-            distribution_stats["completed_deals"] += 1
-        elif current_count > 0:
-            status = "in_progress"
-            distribution_stats["in_progress_deals"] += 1
-        else:
-            distribution_stats["not_started_deals"] += 1
-        
-        distribution_stats["deal_details"].append({
-            "deal_id": deal_id,
+    # Submissions not yet flushed show on the listed deals right away
+    pending_counts = submission_queue.pending_counts_by_deal()
+    deal_details = []
+    for row in rows:
+        current_count = row["annotation_count"] + pending_counts.get(row["deal_id"], 0)
+        deal_details.append({
+            "deal_id": row["deal_id"],
             "current_annotations": current_count,
-            "target_annotations": TARGET_ANNOTATIONS_PER_DEAL,
-            "status": status,
-            "progress_percentage": (current_count / TARGET_ANNOTATIONS_PER_DEAL * 100) if TARGET_ANNOTATIONS_PER_DEAL > 0 else 0
+            "target_annotations": target,
+            "status": distribution_status(current_count, row["converged"], target, adaptive),
+            "progress_percentage": (current_count / target * 100) if target > 0 else 0
         })
     
-    # Sort by progress (lowest first to show which deals need attention)
-    distribution_stats["deal_details"].sort(key=lambda x: x["current_annotations"])
+    last = rows[-1] if len(rows) == limit else None
+    return FastJSONResponse({
+        "campaign_id": campaign_id,
+        "target_per_deal": target,
+        "total_deals": sum(summary.values()),
+        "archived_deals": summary["archived"],
+        "completed_deals": summary["archived"] + summary["completed"] + summary["converged"],
+        "converged_deals": summary["converged"],
+        "in_progress_deals": summary["in_progress"],
+        "not_started_deals": summary["not_started"],
+        "deal_details": deal_details,
+        "next_cursor": f"{last['annotation_count']}:{last['deal_id']}" if last else None
+    })
+
+@app.get("/api/admin/deals")
+async def browse_deals(
+    campaign_id: str = DEFAULT_CAMPAIGN_ID,
+    dealstage: Optional[List[str]] = Query(None),
+    dealtype: Optional[List[str]] = Query(None),
+    amount_bucket: Optional[List[str]] = Query(None),
+    overall_sentiment: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Browse a campaign's deals by facet, a page at a time, with counts per facet value.
+
+    Repeat a facet parameter to select several values. Pass next_cursor as
+    after to get the following page.
+    """
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    filters = normalize_filters({
+        "dealstage": dealstage,
+        "dealtype": dealtype,
+        "amount_bucket": amount_bucket,
+        "overall_sentiment": overall_sentiment,
+        "status": status
+    })
+    
+    cache_key = (campaign_id, filters)
+    facets = deal_facet_cache.get(cache_key)
+    if facets is None:
+        facets = await db_manager.get_deal_facet_counts(campaign_id, filters)
+        deal_facet_cache.set(cache_key, facets)
     
-    return distribution_stats
+    deals = await db_manager.browse_deals(campaign_id, filters, after, limit)
+    return FastJSONResponse({
+        "campaign_id": campaign_id,
+        "filters": {facet: list(values) for facet, values in filters},
+        "total": matching_total(facets, filters),
+        "facets": facets,
+        "deals": deals,
+        "next_cursor": deals[-1]["deal_id"] if len(deals) == limit else None
+    })
 
 @app.get("/activities/{deal_id}", response_class=HTMLResponse)
 async def view_activities(request: Request, deal_id: str, current_user: str = Depends(get_current_user)):
@@ -266,64 +626,105 @@ async def view_activities(request: Request, deal_id: str, current_user: str = De
     # Ensure deal_id is string
     deal_id = str(deal_id)
     
-    deal = await db_manager.get_deal_by_id(deal_id)
-    if not deal:
+    versions = await db_manager.get_deal_versions(deal_id)
+    progress = await get_user_progress(current_user)
+    if not versions:
         return templates.TemplateResponse("activities.html", {
             "request": request,
             "error": f"Deal {deal_id} not found",
             "user_email": current_user,
-            "progress": await db_manager.get_user_progress(current_user)
+            "progress": progress
         })
     
     # Check if user already completed this deal
-    user_completed_deals = await db_manager.get_user_annotations(current_user)
-    if deal_id in user_completed_deals:
+    if deal_id in progress["completed_deals"]:
         return templates.TemplateResponse("activities.html", {
             "request": request,
             "error": "You have already completed this deal. Please continue with the next one.",
             "user_email": current_user,
-            "progress": await db_manager.get_user_progress(current_user)
+            "progress": progress
         })
     
-    # Parse activities from JSON string to Python objects
-    activities = parse_json_field(deal, "activities", [])
+    # Revalidate against the deal version before fetching and rendering it
+    etag = make_etag(RENDER_VERSION, deal_id, versions["deal_version"], current_user, progress["completed_count"])
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    # Sort activities chronologically
-    activities = sort_activities_chronologically(activities)
+    deal_view = await get_deal_view(deal_id, versions["deal_version"])
     
-    return templates.TemplateResponse("activities.html", {
+    response = templates.TemplateResponse("activities.html", {
         "request": request,
-        "deal": deal,
-        "activities": activities,
+        "deal": deal_view["deal"],
+        "activities": deal_view["activities"],
         "deal_id": deal_id,
         "user_email": current_user,
-        "progress": await db_manager.get_user_progress(current_user)
+        "progress": progress
     })
+    return set_validators(response, etag)
 
 @app.get("/rating/{deal_id}", response_class=HTMLResponse)
-async def rating_interface(request: Request, deal_id: str, current_user: str = Depends(get_current_user)):
-    """Rating interface for LLM outputs"""
+async def rating_interface(request: Request, deal_id: str, version: Optional[int] = None,
+                           current_user: str = Depends(get_current_user)):
+    """Rating interface for LLM outputs, showing the latest or a chosen version"""
     # Ensure deal_id is string
     deal_id = str(deal_id)
     
-    deal = await db_manager.get_deal_by_id(deal_id)
-    if not deal:
+    versions = await db_manager.get_deal_versions(deal_id)
+    progress = await get_user_progress(current_user)
+    if not versions:
         return templates.TemplateResponse("rating.html", {
             "request": request,
             "error": f"Deal {deal_id} not found",
             "user_email": current_user,
-            "progress": await db_manager.get_user_progress(current_user)
+            "progress": progress
         })
     
-    llm_output_raw = await db_manager.get_llm_output_by_deal_id(deal_id)
-    if not llm_output_raw:
+    if not versions["llm_output_version"]:
         return templates.TemplateResponse("rating.html", {
             "request": request,
             "error": f"AI analysis not found for deal {deal_id}",
             "user_email": current_user,
-            "progress": await db_manager.get_user_progress(current_user)
+            "progress": progress
+        })
+    
+    # Check if user already completed this deal
+    user_completed_deals = set(progress["completed_deals"])
+    if deal_id in user_completed_deals:
+        return templates.TemplateResponse("rating.html", {
+            "request": request,
+            "error": "You have already completed this deal. Please continue with the next one.",
+            "user_email": current_user,
+            "progress": progress
+        })
+    
+    latest_version = versions["llm_output_latest"]
+    if version is None:
+        version = latest_version
+    if version < 1 or version > latest_version:
+        return templates.TemplateResponse("rating.html", {
+            "request": request,
+            "error": f"AI analysis version {version} not found for deal {deal_id}",
+            "user_email": current_user,
+            "progress": progress
         })
     
+    # Work out the next deal while the user is busy rating this one
+    precompute = BackgroundTask(precompute_next_deal, current_user, deal_id, user_completed_deals, progress)
+    
+    # Revalidate against the deal and LLM output versions before fetching and rendering them
+    etag = make_etag(RENDER_VERSION, deal_id, versions["deal_version"], versions["llm_output_version"],
+                     version, current_user, progress["completed_count"])
+    if etag_matches(request, etag):
+        response = not_modified(etag)
+        response.background = precompute
+        return response
+    
+    deal = await get_deal_summary(deal_id, versions["deal_version"])
+    if version == latest_version:
+        llm_output_raw = await db_manager.get_llm_output_by_deal_id(deal_id)
+    else:
+        llm_output_raw = await db_manager.get_llm_output_version(deal_id, version)
+    
     # Parse JSON fields in LLM output
     llm_output = {
         "overall_sentiment": llm_output_raw.get("overall_sentiment"),
@@ -338,54 +739,57 @@ async def rating_interface(request: Request, deal_id: str, current_user: str = D
         "opportunity_indicators": parse_json_field(llm_output_raw, "opportunity_indicators", []),
         "temporal_trend": llm_output_raw.get("temporal_trend"),
         "recommended_actions": parse_json_field(llm_output_raw, "recommended_actions", []),
-        "context_analysis_notes": parse_json_field(llm_output_raw, "context_analysis_notes", [])
+        "context_analysis_notes": parse_json_field(llm_output_raw, "context_analysis_notes", []),
+        "version": version,
+        "latest_version": latest_version
     }
     
-    # Check if user already completed this deal
-    user_completed_deals = await db_manager.get_user_annotations(current_user)
-    if deal_id in user_completed_deals:
-        return templates.TemplateResponse("rating.html", {
-            "request": request,
-            "error": "You have already completed this deal. Please continue with the next one.",
-            "user_email": current_user,
-            "progress": await db_manager.get_user_progress(current_user)
-        })
-    
-    return templates.TemplateResponse("rating.html", {
+    response = templates.TemplateResponse("rating.html", {
         "request": request,
         "deal": deal,
         "llm_output": llm_output,
         "deal_id": deal_id,
         "user_email": current_user,
-        "progress": await db_manager.get_user_progress(current_user)
-    })
+        "progress": progress
+    }, background=precompute)
+    return set_validators(response, etag)
 
 @app.post("/submit-rating")
 async def submit_rating(request: Request, current_user: str = Depends(get_current_user)):
     """Submit annotation rating"""
     form_data = await request.form()
     
-    deal_id = str(form_data.get("deal_id"))
+    # Replay the original response for retried submissions
+    idempotency_key = form_data.get("idempotency_key") or None
+    previous_response = submission_queue.get_response(current_user, idempotency_key)
+    if previous_response:
+        return JSONResponse(previous_response)
+    
+    deal_id = form_data.get("deal_id")
     if not deal_id:
         raise HTTPException(status_code=400, detail="Deal ID required")
     
+    # Reject what the database would refuse, so a bad record never reaches the submission queue
+    campaign_id = await get_user_campaign_id(current_user)
+    deal = await get_deal_summary(deal_id)
+    if not deal or deal["campaign_id"] != campaign_id:
+        raise HTTPException(status_code=404, detail="Deal not found")
+    
     # Check if user already completed this deal
-    user_completed_deals = await db_manager.get_user_annotations(current_user)
+    precomputed = take_precomputed_next_deal(current_user, deal_id)
+    if precomputed:
+        user_completed_deals = precomputed["completed_deals"] | submission_queue.pending_deals_for_user(current_user)
+    else:
+        user_completed_deals = await get_user_completed_deals(current_user)
     if deal_id in user_completed_deals:
         raise HTTPException(status_code=400, detail="Deal already completed")
     
     # Extract ratings
     ratings = {}
-    rating_fields = [
-        "overall_sentiment", "activity_breakdown", "deal_momentum_indicators",
-        "reasoning", "professional_gaps", "excellence_indicators",
-        "risk_indicators", "opportunity_indicators", "temporal_trend",
-        "recommended_actions"
-    ]
     
     # Validate all required fields
     missing_fields = []
-    for field in rating_fields:
+    for field in RATING_FIELDS:
         score = form_data.get(f"{field}_score")
         confidence = form_data.get(f"{field}_confidence")
         
@@ -393,8 +797,8 @@ async def submit_rating(request: Request, current_user: str = Depends(get_curren
             missing_fields.append(field)
         else:
             ratings[field] = {
-                "score": int(score),
-                "confidence": int(confidence),
+                "score": parse_int_field(score, f"{field}_score"),
+                "confidence": parse_int_field(confidence, f"{field}_confidence"),
                 "notes": form_data.get(f"{field}_notes", "")
             }
     
@@ -404,31 +808,52 @@ async def submit_rating(request: Request, current_user: str = Depends(get_curren
             detail=f"Missing ratings for: {', '.join(missing_fields)}"
         )
     
-    # Save annotation to database
-    time_spent = int(form_data.get("time_spent", 0))
-    success = await db_manager.create_annotation(deal_id, current_user, ratings, time_spent)
+    time_spent = parse_int_field(form_data.get("time_spent") or 0, "time_spent")
+    llm_output_version = (parse_int_field(form_data["llm_output_version"], "llm_output_version", minimum=1)
+                          if form_data.get("llm_output_version") else None)
     
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to save annotation")
-    
-    # Get next deal
-    next_deal = await get_next_deal_for_user(current_user)
-    
-    # Update user progress
-    progress = await db_manager.get_user_progress(current_user)
+    # Get next deal and progress, precomputed while the rating page was open
+    if precomputed:
+        # Other annotators may have filled the deal since it was picked
+        next_deal = precomputed["next_deal"]
+        if next_deal and not await is_deal_open(campaign_id, next_deal):
+            next_deal = await get_next_deal_for_user(current_user, user_completed_deals | {deal_id})
+        progress = {
+            "completed_count": precomputed["completed_count"] + 1,
+            "total_deals": precomputed["total_deals"]
+        }
+    else:
+        next_deal = await get_next_deal_for_user(current_user, user_completed_deals | {deal_id})
+        progress = await get_user_progress(current_user)
+        progress["completed_count"] += 1
     
-    return JSONResponse({
+    response_content = {
         "message": "Rating submitted successfully", 
         "next_deal": next_deal,
         "completed_count": progress["completed_count"]
-    })
+    }
+    
+    # Journal the annotation; the background flusher writes it to the database
+    try:
+        await submission_queue.enqueue(deal_id, current_user, ratings, time_spent,
+                                       response_content, idempotency_key, campaign_id,
+                                       llm_output_version)
+    except Exception as e:
+        print(f"Error queueing annotation: {e}")
+        raise HTTPException(status_code=500, detail="Failed to save annotation")
+    
+    # Push progress and distribution deltas to open dashboards
+    await publish_submission_events(current_user, campaign_id, deal_id, progress)
+    
+    return JSONResponse(response_content)
 
 @app.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, admin_token: Optional[str] = Cookie(None)):
+async def admin_dashboard(request: Request, campaign_id: str = DEFAULT_CAMPAIGN_ID,
+                          admin_token: Optional[str] = Cookie(None)):
     """Admin dashboard with persistent session"""
     # Check if already authenticated via cookie
-    if admin_token and admin_token == os.getenv("ADMIN_PASSWORD"):
-        context = await get_admin_dashboard_context(request, authenticated=True)
+    if await verify_admin_session(admin_token):
+        context = await get_admin_dashboard_context(request, authenticated=True, campaign_id=campaign_id)
         return templates.TemplateResponse("admin.html", context)
     
     return templates.TemplateResponse("admin.html", {
@@ -453,9 +878,9 @@ async def admin_login(request: Request, admin_password: str = Form(...)):
     response = templates.TemplateResponse("admin.html", context)
     response.set_cookie(
         key="admin_token",
-        value=admin_password,
+        value=create_admin_token(),
         httponly=True,
-        max_age=3600,  # 1 hour
+        max_age=ADMIN_SESSION_HOURS * 60 * 60,
         samesite="lax"
     )
     return response
@@ -465,11 +890,12 @@ async def add_user(
     request: Request,
     email: str = Form(...), 
     name: str = Form(...),
+    campaign_id: str = Form(DEFAULT_CAMPAIGN_ID),
     admin_token: Optional[str] = Cookie(None)
 ):
     """Add new user"""
     # Check admin authentication from cookie
-    if not admin_token or admin_token != os.getenv("ADMIN_PASSWORD"):
+    if not await verify_admin_session(admin_token):
         raise HTTPException(status_code=403, detail="Admin authentication required")
     
     # Check if user already exists
@@ -478,7 +904,7 @@ async def add_user(
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Create new user
-    success = await db_manager.create_user(email.lower(), name, False)
+    success = await db_manager.create_user(email.lower(), name, False, campaign_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to create user")
     
@@ -493,7 +919,7 @@ async def remove_user(
 ):
     """Remove user"""
     # Check admin authentication from cookie
-    if not admin_token or admin_token != os.getenv("ADMIN_PASSWORD"):
+    if not await verify_admin_session(admin_token):
         raise HTTPException(status_code=403, detail="Admin authentication required")
     
     # Check if user exists
@@ -501,20 +927,98 @@ async def remove_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # Remove user first, so a flush still in progress can no longer add annotations for them
+    success = await db_manager.delete_user(email.lower())
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to remove user")
+    
     # Remove user's annotations if not keeping progress
     if not keep_progress:
         await db_manager.delete_user_annotations(email.lower())
     
-    # Remove user
-    success = await db_manager.delete_user(email.lower())
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to remove user")
+    await revoke_users([email.lower()])
+    await forget_users([email.lower()])
+    submission_queue.discard_users([email.lower()])
     
     return JSONResponse({"message": "User removed successfully"})
 
+async def forget_users(emails: List[str]):
+    """Drop cached campaign assignments and precomputed next deals of users, in every worker"""
+    drop_user_caches(emails)
+    await db_manager.invalidate_user_caches(emails)
+
+async def read_bulk_records(request: Request, list_key: str) -> List[Any]:
+    """Parse a bulk request body, CSV or JSON by content type"""
+    try:
+        records = parse_records(await request.body(), request.headers.get("content-type", ""), list_key)
+        check_size(records)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return records
+
+@app.post("/admin/users/bulk")
+async def add_users_bulk(request: Request, campaign_id: str = DEFAULT_CAMPAIGN_ID,
+                         admin_token: Optional[str] = Cookie(None)):
+    """Add users from a CSV (email,name[,campaign_id]) or JSON list in one transaction, with a result per row"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    records = await read_bulk_records(request, "users")
+    users, results = prepare_new_users(records, campaign_id)
+    if users:
+        try:
+            results += await db_manager.create_users_batch(users)
+        except Exception as e:
+            print(f"Error creating users: {e}")
+            raise HTTPException(status_code=500, detail="Failed to create users")
+        
+        created = [r for r in results if r["status"] == "created"]
+        await forget_users([r["email"] for r in created])
+        for created_campaign_id in {r["campaign_id"] for r in created}:
+            campaign_stats_cache.pop(created_campaign_id)
+    
+    return JSONResponse(summarize_results(results))
+
+@app.post("/admin/users/bulk-remove")
+async def remove_users_bulk(request: Request, keep_progress: bool = False,
+                            admin_token: Optional[str] = Cookie(None)):
+    """Remove users listed in a CSV (email column) or JSON list in one transaction, with a result per row"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    records = await read_bulk_records(request, "emails")
+    removals, results = prepare_emails(records)
+    if removals:
+        try:
+            deleted = await db_manager.delete_users_batch([r["email"] for r in removals], keep_progress)
+        except Exception as e:
+            print(f"Error removing users: {e}")
+            raise HTTPException(status_code=500, detail="Failed to remove users")
+        
+        removed = deleted["removed"]
+        for removal in removals:
+            if removal["email"] in removed:
+                results.append({**removal, "status": "removed"})
+            else:
+                results.append({**removal, "status": "not_found", "detail": "User not found"})
+        
+        await revoke_users(list(removed))
+        await forget_users(list(removed))
+        submission_queue.discard_users(list(removed))
+        if deleted["annotations_deleted"]:
+            # Annotations may belong to campaigns the users have since left
+            campaign_stats_cache.clear()
+            distribution_summary_cache.clear()
+        else:
+            for removed_campaign_id in set(removed.values()):
+                campaign_stats_cache.pop(removed_campaign_id)
+    
+    return JSONResponse(summarize_results(results))
+
 @app.get("/logout")
-async def logout():
-    """Logout user"""
+async def logout(access_token: Optional[str] = Cookie(None), admin_token: Optional[str] = Cookie(None)):
+    """Logout user, revoking the sessions so copies of the cookies stop working too"""
+    await revoke_tokens([access_token, admin_token])
     response = RedirectResponse(url="/", status_code=302)
     response.delete_cookie("access_token")
     response.delete_cookie("admin_token")
@@ -523,91 +1027,457 @@ async def logout():
 @app.get("/api/progress")
 async def get_progress_api(current_user: str = Depends(get_current_user)):
     """Get user progress API"""
-    progress = await db_manager.get_user_progress(current_user)
+    progress = await get_user_progress(current_user)
     return progress
 
+@app.get("/api/next-deal")
+async def next_deal_api(current: str, current_user: str = Depends(get_current_user)):
+    """Get the deal that follows the one being rated, so the client can prefetch it"""
+    await user_cache_invalidations.refresh()
+    entry = peek_precomputed_next_deal(current_user, current)
+    if not entry:
+        completed_deals = await get_user_completed_deals(current_user)
+        progress = await get_user_progress(current_user)
+        entry = await precompute_next_deal(current_user, current, completed_deals, progress)
+    
+    next_deal = entry["next_deal"]
+    return {
+        "next_deal": next_deal,
+        "prefetch_url": f"/activities/{next_deal}" if next_deal else None
+    }
+
+@app.get("/api/progress/stream")
+async def progress_stream(request: Request, current_user: str = Depends(get_current_user)):
+    """Stream user progress updates as server-sent events"""
+    progress = await get_user_progress(current_user)
+    
+    return stream_events(request, progress_topic(current_user), "progress", {
+        "completed_count": progress["completed_count"],
+        "total_deals": progress["total_deals"]
+    })
+
+@app.get("/api/admin/stream")
+async def admin_stream(request: Request, campaign_id: str = DEFAULT_CAMPAIGN_ID,
+                       admin_token: Optional[str] = Cookie(None)):
+    """Stream annotation and distribution updates to the admin dashboard"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    admin_stats = await get_campaign_stats(campaign_id)
+    target_total_annotations = admin_stats['total_deals'] * admin_stats['target_annotations_per_deal']
+    
+    return stream_events(request, admin_topic(campaign_id), "stats", {
+        "total_deals": admin_stats['total_deals'],
+        "total_annotations": admin_stats['total_annotations'],
+        "completed_deals": admin_stats['completed_deals'],
+        "target_total_annotations": target_total_annotations
+    })
+
 @app.get("/api/admin/stats")
-async def get_admin_stats(request: Request, admin_token: Optional[str] = Cookie(None)):
+async def get_admin_stats(request: Request, campaign_id: str = DEFAULT_CAMPAIGN_ID,
+                          admin_token: Optional[str] = Cookie(None)):
     """Get admin statistics"""
-    if not admin_token or admin_token != os.getenv("ADMIN_PASSWORD"):
+    if not await verify_admin_session(admin_token):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    admin_stats = await db_manager.get_admin_stats()
+    admin_stats = await get_campaign_stats(campaign_id)
     
     # Calculate target total annotations
-    target_total_annotations = admin_stats['total_deals'] * TARGET_ANNOTATIONS_PER_DEAL
+    target_total_annotations = admin_stats['total_deals'] * admin_stats['target_annotations_per_deal']
     
     # Get user completion stats
-    users = await db_manager.get_users()
+    users = [user for user in await db_manager.get_users() if user["campaign_id"] == campaign_id]
     completion_stats = []
     
     for user in users:
-        progress = await db_manager.get_user_progress(user["email"])
+        progress = await get_user_progress(user["email"])
         completion_stats.append({
             "email": user["email"],
             "completed": progress["completed_count"],
             "percentage": (progress["completed_count"] / progress["total_deals"] * 100) if progress["total_deals"] > 0 else 0
         })
     
-    return {
+    return FastJSONResponse({
+        "campaign_id": campaign_id,
         "total_users": admin_stats['total_users'],
         "total_deals": admin_stats['total_deals'],
         "total_annotations": admin_stats['total_annotations'],
         "target_total_annotations": target_total_annotations,
         "overall_progress": (admin_stats['total_annotations'] / target_total_annotations * 100) if target_total_annotations > 0 else 0,
         "user_stats": completion_stats
+    })
+
+@app.get("/api/admin/campaigns")
+async def list_campaigns(admin_token: Optional[str] = Cookie(None)):
+    """List campaigns with their progress"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    campaigns = []
+    for campaign in await db_manager.get_campaigns():
+        stats = await get_campaign_stats(campaign["campaign_id"])
+        campaigns.append({
+            "campaign_id": campaign["campaign_id"],
+            "name": campaign["name"],
+            "target_annotations_per_deal": campaign["target_annotations_per_deal"],
+            "assignment_mode": campaign["assignment_mode"],
+            "calibration_rate": campaign["calibration_rate"],
+            "total_users": stats["total_users"],
+            "total_deals": stats["total_deals"],
+            "total_annotations": stats["total_annotations"],
+            "completed_deals": stats["completed_deals"]
+        })
+    return {"campaigns": campaigns}
+
+@app.post("/admin/campaigns")
+async def add_campaign(
+    campaign_id: str = Form(...),
+    name: str = Form(...),
+    target_annotations_per_deal: int = Form(TARGET_ANNOTATIONS_PER_DEAL),
+    assignment_mode: str = Form("fixed"),
+    convergence_min_annotations: int = Form(DEFAULT_MIN_ANNOTATIONS),
+    convergence_max_half_width: float = Form(DEFAULT_MAX_HALF_WIDTH),
+    calibration_rate: float = Form(DEFAULT_CALIBRATION_RATE),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Add new campaign"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    if target_annotations_per_deal < 1:
+        raise HTTPException(status_code=400, detail="Target must be at least 1")
+    if assignment_mode not in ("fixed", "adaptive"):
+        raise HTTPException(status_code=400, detail="Assignment mode must be fixed or adaptive")
+    if not 0 <= calibration_rate <= 1:
+        raise HTTPException(status_code=400, detail="Calibration rate must be between 0 and 1")
+    
+    success = await db_manager.create_campaign(campaign_id, name, target_annotations_per_deal, assignment_mode,
+                                               convergence_min_annotations, convergence_max_half_width,
+                                               calibration_rate)
+    if not success:
+        raise HTTPException(status_code=400, detail="Campaign already exists")
+    
+    return JSONResponse({"message": "Campaign added successfully"})
+
+@app.post("/admin/user-campaign")
+async def set_user_campaign(
+    email: str = Form(...),
+    campaign_id: str = Form(...),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Move a user to another campaign"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    success = await db_manager.set_user_campaign(email.lower(), campaign_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="User or campaign not found")
+    
+    await forget_users([email.lower()])
+    return JSONResponse({"message": "User campaign updated successfully"})
+
+@app.get("/api/admin/llm-outputs/history")
+async def get_llm_output_history(deal_id: List[str] = Query(...), admin_token: Optional[str] = Cookie(None)):
+    """Get the full version history of the LLM outputs of one or more deals"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    history = await db_manager.get_llm_output_history(deal_id)
+    return {"deals": {requested: history.get(requested, []) for requested in deal_id}}
+
+@app.post("/admin/llm-outputs/{deal_id}/versions")
+async def add_llm_output_version(request: Request, deal_id: str, admin_token: Optional[str] = Cookie(None)):
+    """Add a new version of a deal's LLM output from a JSON body"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    payload = await request.json()
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="LLM output must be a JSON object")
+    label = payload.pop("label", None)
+    version = await db_manager.add_llm_output_version(deal_id, payload, label)
+    if version is None:
+        raise HTTPException(status_code=404, detail="LLM output not found")
+    
+    return JSONResponse({"message": "LLM output version added", "version": version})
+
+@app.get("/api/admin/gold-deals")
+async def list_gold_deals(campaign_id: str = DEFAULT_CAMPAIGN_ID, admin_token: Optional[str] = Cookie(None)):
+    """List a campaign's gold deals with their expected ratings"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {"campaign_id": campaign_id, "gold_deals": await db_manager.get_gold_deals(campaign_id)}
+
+@app.post("/admin/gold-deals/{deal_id}")
+async def set_gold_deal(request: Request, deal_id: str, admin_token: Optional[str] = Cookie(None)):
+    """Mark a deal as gold standard from a JSON body of expected ratings"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    expected_ratings = await request.json()
+    scores = field_scores(expected_ratings if isinstance(expected_ratings, dict) else {})
+    if not scores:
+        raise HTTPException(status_code=400, detail="Expected ratings need at least one scored field")
+    if any(score < 1 or score > 5 for score in scores.values()):
+        raise HTTPException(status_code=400, detail="Expected scores must be between 1 and 5")
+    
+    deal = await get_deal_summary(deal_id)
+    if not deal or not await db_manager.set_gold_deal(deal_id, expected_ratings):
+        raise HTTPException(status_code=404, detail="Deal not found")
+    
+    gold_deal_cache.pop(deal["campaign_id"])
+    return JSONResponse({"message": "Gold deal saved", "deal_id": deal_id})
+
+@app.delete("/admin/gold-deals/{deal_id}")
+async def remove_gold_deal(deal_id: str, admin_token: Optional[str] = Cookie(None)):
+    """Return a gold deal to production annotation"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin authentication required")
+    
+    deal = await get_deal_summary(deal_id)
+    if not deal or not await db_manager.remove_gold_deal(deal_id):
+        raise HTTPException(status_code=404, detail="Deal not found")
+    
+    gold_deal_cache.pop(deal["campaign_id"])
+    return JSONResponse({"message": "Gold deal removed", "deal_id": deal_id})
+
+@app.get("/api/admin/annotator-accuracy")
+async def get_annotator_accuracy(campaign_id: str = DEFAULT_CAMPAIGN_ID, admin_token: Optional[str] = Cookie(None)):
+    """Per-annotator accuracy on gold deals, with low-quality annotators flagged"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    annotators = await db_manager.get_annotator_accuracy(campaign_id)
+    return {
+        "campaign_id": campaign_id,
+        "annotators": annotators,
+        "flagged": [annotator["user_email"] for annotator in annotators if annotator["flagged"]]
     }
 
+@app.get("/api/admin/annotator-analytics")
+async def get_annotator_analytics(campaign_id: str = DEFAULT_CAMPAIGN_ID, admin_token: Optional[str] = Cookie(None)):
+    """Per-annotator time, straight-lining, speed and consensus bias signals"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    report = await annotator_analytics.get_report(campaign_id, db_manager)
+    return {"campaign_id": campaign_id, **report}
+
+@app.get("/api/admin/llm-agreement")
+async def get_llm_agreement(campaign_id: str = DEFAULT_CAMPAIGN_ID,
+                            bins: int = Query(AGREEMENT_CONFIDENCE_BINS, ge=2, le=50),
+                            admin_token: Optional[str] = Cookie(None)):
+    """LLM confidence calibration, per-field score distributions and per-sentiment breakdown of human ratings"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    # Recomputed only when the campaign's annotations or the LLM outputs changed
+    watermark = await db_manager.get_agreement_version(campaign_id)
+    cache_key = (campaign_id, bins, watermark)
+    report = agreement_report_cache.get(cache_key)
+    if report is None:
+        rows = await db_manager.get_agreement_counts(campaign_id, bins)
+        report = build_agreement_report(rows, bins)
+        agreement_report_cache.set(cache_key, report)
+    
+    return {"campaign_id": campaign_id, "watermark": watermark, **report}
+
+@app.get("/api/admin/db-stats")
+async def get_db_stats(admin_token: Optional[str] = Cookie(None)):
+    """Query counters of this worker process, enabled with DB_QUERY_STATS"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not db_manager.query_stats:
+        raise HTTPException(status_code=404, detail="Query stats disabled, set DB_QUERY_STATS=true")
+    return {"pid": os.getpid(), **db_manager.query_stats.snapshot()}
+
+@app.get("/api/admin/profile")
+async def profile_worker(seconds: float = 10, interval_ms: float = 5, admin_token: Optional[str] = Cookie(None)):
+    """Sample the stacks of the serving worker for a number of seconds, as collapsed stacks for flamegraphs"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILER_MAX_SECONDS:g}")
+    if not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="interval_ms must be between 1 and 1000")
+    
+    profiler = acquire_profiler(interval_ms / 1000)
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    try:
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+    finally:
+        release_profiler()
+    
+    return Response(
+        content=profiler.collapsed(),
+        media_type="text/plain",
+        headers={
+            **profiler.headers(),
+            "Content-Disposition": f"attachment; filename=profile_{os.getpid()}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt",
+            "Cache-Control": "no-store"
+        }
+    )
+
+@app.get("/api/admin/annotations/by-score")
+async def get_annotations_by_score(
+    field: str,
+    min_score: Optional[int] = None,
+    max_score: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Get annotations filtered by a rating field's score range"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        annotations = await db_manager.get_annotations_by_score(field, min_score, max_score, limit)
+        distribution = await db_manager.get_score_distribution(field)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    for annotation in annotations:
+        annotation["ratings"] = parse_json_field(annotation, "ratings", {})
+        annotation["created_at"] = annotation["created_at"].isoformat() if annotation["created_at"] else None
+    
+    return {"field": field, "distribution": distribution, "annotations": annotations}
+
+@app.get("/api/admin/annotations/matching")
+async def get_annotations_matching(
+    ratings: str,
+    limit: int = Query(1000, ge=1, le=5000),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Get annotations whose ratings contain a JSON subset, e.g. {"reasoning": {"score": 1}}"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        ratings_subset = json.loads(ratings)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ratings must be a JSON object")
+    if not isinstance(ratings_subset, dict):
+        raise HTTPException(status_code=400, detail="ratings must be a JSON object")
+    
+    annotations = await db_manager.get_annotations_matching(ratings_subset, limit)
+    for annotation in annotations:
+        annotation["ratings"] = parse_json_field(annotation, "ratings", {})
+        annotation["created_at"] = annotation["created_at"].isoformat() if annotation["created_at"] else None
+    
+    return {"ratings": ratings_subset, "annotations": annotations}
+
+@app.get("/api/admin/llm-outputs/with-indicator")
+async def get_deals_with_llm_indicator(
+    column: str,
+    indicator: str,
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Get deals whose LLM output lists an indicator"""
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    try:
+        deal_ids = await db_manager.get_deals_with_llm_indicator(column, indicator)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return {"column": column, "indicator": indicator, "deal_ids": deal_ids}
+
+@app.get("/api/admin/search")
+async def search_activities(
+    q: str = Query(..., max_length=500),
+    campaign_id: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    admin_token: Optional[str] = Cookie(None)
+):
+    """Search activity bodies: deals ranked by relevance with a highlighted snippet each.
+
+    Accepts web search syntax: "quoted phrases", OR and -excluded words.
+    """
+    if not await verify_admin_session(admin_token):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    
+    found = await db_manager.search_deals(q, campaign_id, page_size, (page - 1) * page_size)
+    return {"query": q, "page": page, "page_size": page_size, **found}
+
 @app.get("/api/download/{data_type}")
-async def download_data(data_type: str, admin_token: Optional[str] = Cookie(None)):
+async def download_data(request: Request, data_type: str, admin_token: Optional[str] = Cookie(None)):
     """Download data as JSON"""
-    if not admin_token or admin_token != os.getenv("ADMIN_PASSWORD"):
+    if not await verify_admin_session(admin_token):
         raise HTTPException(status_code=403, detail="Admin access required")
     
+    # Skip the export entirely when the table has not changed since the last download
+    export_version = await db_manager.get_export_version(data_type)
+    if export_version is None:
+        raise HTTPException(status_code=404, detail="Invalid data type")
+    
+    etag = make_etag(data_type, export_version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     if data_type == "users":
         users = await db_manager.get_users()
+        # Convert datetime objects to ISO strings
+        for user in users:
+            if user["created_at"]:
+                user["created_at"] = user["created_at"].isoformat()
         data = {"users": users}
     elif data_type == "annotations":
         data = await db_manager.get_annotations()
     elif data_type == "deals":
         deals_raw = await db_manager.get_deals()
-        # Parse JSON fields for export
+        activities_by_deal = await db_manager.get_activities_by_deal(list(deals_raw))
+        # Reattach activities for export
         deals = {}
         for deal_id, deal_data in deals_raw.items():
             deals[deal_id] = dict(deal_data)
-            deals[deal_id]["activities"] = parse_json_field(deal_data, "activities", [])
+            deals[deal_id].pop("activity_count", None)
+            deals[deal_id]["activities"] = activities_by_deal.get(deal_id, [])
         data = deals
     elif data_type == "llm_outputs":
         llm_outputs_raw = await db_manager.get_llm_outputs()
-        # Parse JSON fields for export
+        # JSON columns are embedded in the export as stored, without parsing them
         llm_outputs = {}
         for deal_id, output_data in llm_outputs_raw.items():
             llm_outputs[deal_id] = {
                 "overall_sentiment": output_data.get("overall_sentiment"),
                 "sentiment_score": output_data.get("sentiment_score"),
                 "confidence": output_data.get("confidence"),
-                "activity_breakdown": parse_json_field(output_data, "activity_breakdown", {}),
-                "deal_momentum_indicators": parse_json_field(output_data, "deal_momentum_indicators", {}),
+                "activity_breakdown": raw_json_field(output_data, "activity_breakdown", {}),
+                "deal_momentum_indicators": raw_json_field(output_data, "deal_momentum_indicators", {}),
                 "reasoning": output_data.get("reasoning"),
-                "professional_gaps": parse_json_field(output_data, "professional_gaps", []),
-                "excellence_indicators": parse_json_field(output_data, "excellence_indicators", []),
-                "risk_indicators": parse_json_field(output_data, "risk_indicators", []),
-                "opportunity_indicators": parse_json_field(output_data, "opportunity_indicators", []),
+                "professional_gaps": raw_json_field(output_data, "professional_gaps", []),
+                "excellence_indicators": raw_json_field(output_data, "excellence_indicators", []),
+                "risk_indicators": raw_json_field(output_data, "risk_indicators", []),
+                "opportunity_indicators": raw_json_field(output_data, "opportunity_indicators", []),
                 "temporal_trend": output_data.get("temporal_trend"),
-                "recommended_actions": parse_json_field(output_data, "recommended_actions", []),
-                "context_analysis_notes": parse_json_field(output_data, "context_analysis_notes", [])
+                "recommended_actions": raw_json_field(output_data, "recommended_actions", []),
+                "context_analysis_notes": raw_json_field(output_data, "context_analysis_notes", [])
             }
         data = llm_outputs
     else:
         raise HTTPException(status_code=404, detail="Invalid data type")
     
     # Return as downloadable JSON
-    return JSONResponse(
+    response = FastJSONResponse(
         content=data,
         headers={
             "Content-Disposition": f"attachment; filename={data_type}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         }
     )
+    return set_validators(response, etag)
 
 @app.get("/health")
 async def health_check():
@@ -0,0 +1,587 @@
+import sys
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .models import RATING_FIELDS, DEFAULT_CAMPAIGN_ID, TARGET_ANNOTATIONS_PER_DEAL
+from .activity_store import store_deal_activities, decompress_chunk, SEARCH_CONFIG, DEAL_SEARCH_VECTOR
+from .convergence import (merge_ratings_stats, deal_uncertainty, is_converged,
+                          DEFAULT_MIN_ANNOTATIONS, DEFAULT_MAX_HALF_WIDTH)
+from .calibration import DEFAULT_CALIBRATION_RATE
+from .database import LLM_OUTPUT_INDICATOR_COLUMNS
+
+# Arbitrary key for pg_advisory_lock so concurrent deploys migrate one at a time
+MIGRATION_LOCK_ID = 72410193
+
+LLM_OUTPUT_JSON_DEFAULTS = {
+    "activity_breakdown": "{}",
+    "deal_momentum_indicators": "{}",
+    **{column: "[]" for column in LLM_OUTPUT_INDICATOR_COLUMNS},
+    "context_analysis_notes": "[]"
+}
+
+# Columns holding JSON documents
+JSON_COLUMNS = [
+    ("deals", "activities"),
+    ("annotations", "ratings"),
+    *[("llm_outputs", column) for column in LLM_OUTPUT_JSON_DEFAULTS]
+]
+
+async def move_activities_out_of_deals(connection):
+    """Copy each deal's activities array into the activities table, then drop the column"""
+    rows = await connection.fetch("SELECT deal_id, activities FROM deals ORDER BY deal_id")
+    for row in rows:
+        activities = json.loads(row['activities']) if row['activities'] else []
+        # Search vectors are backfilled by migration 10
+        await store_deal_activities(connection, row['deal_id'], activities, index_search=False)
+    await connection.execute("ALTER TABLE deals DROP COLUMN activities")
+    print(f"Moved activities for {len(rows)} deals")
+
+async def backfill_score_stats(connection):
+    """Build each deal's running score stats from its existing annotations"""
+    rows = await connection.fetch("""
+        SELECT p.deal_id, c.convergence_min_annotations, c.convergence_max_half_width,
+               array_agg(a.ratings::text) AS ratings
+        FROM deal_progress p
+        JOIN campaigns c ON c.campaign_id = p.campaign_id
+        JOIN annotations a ON a.deal_id = p.deal_id
+        GROUP BY p.deal_id, c.convergence_min_annotations, c.convergence_max_half_width
+    """)
+    updates = []
+    for row in rows:
+        stats = merge_ratings_stats(json.loads(ratings) for ratings in row['ratings'])
+        updates.append((row['deal_id'], json.dumps(stats), deal_uncertainty(stats),
+                        is_converged(stats, row['convergence_min_annotations'], row['convergence_max_half_width'])))
+    await connection.executemany("""
+        UPDATE deal_progress SET score_stats = $2, uncertainty = $3, converged = $4 WHERE deal_id = $1
+    """, updates)
+
+async def backfill_search_vectors(connection, batch_size: int = 1000):
+    """Index every stored body chunk, then build each deal's search vector from its chunks"""
+    last_hash = ""
+    indexed = 0
+    while True:
+        rows = await connection.fetch("""
+            SELECT body_hash, body FROM activity_bodies
+            WHERE body_hash > $1 ORDER BY body_hash LIMIT $2
+        """, last_hash, batch_size)
+        if not rows:
+            break
+        await connection.executemany(f"""
+            UPDATE activity_bodies SET search_vector = to_tsvector('{SEARCH_CONFIG}', $2) WHERE body_hash = $1
+        """, [(row['body_hash'], decompress_chunk(row['body'])) for row in rows])
+        indexed += len(rows)
+        last_hash = rows[-1]['body_hash']
+    await connection.execute(f"UPDATE deals SET search_vector = ({DEAL_SEARCH_VECTOR})")
+    # Built after the backfill so the index is written once
+    await connection.execute("CREATE INDEX IF NOT EXISTS idx_deals_search_vector ON deals USING GIN (search_vector)")
+    print(f"Indexed {indexed} body chunks for search")
+
+class Migration:
+    """A schema change applied once, inside a transaction"""
+
+    def __init__(self, version: int, name: str, statements: Optional[List[str]] = None,
+                 apply: Optional[Callable[[Any], Awaitable[None]]] = None):
+        self.version = version
+        self.name = name
+        self.statements = statements or []
+        self.apply = apply
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            email TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            is_admin BOOLEAN NOT NULL DEFAULT FALSE,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS deals (
+            deal_id TEXT PRIMARY KEY,
+            amount DOUBLE PRECISION,
+            dealstage TEXT,
+            dealtype TEXT,
+            deal_stage_probability DOUBLE PRECISION,
+            createdate TIMESTAMP,
+            closedate TIMESTAMP,
+            activities JSON NOT NULL DEFAULT '[]'
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS llm_outputs (
+            deal_id TEXT PRIMARY KEY REFERENCES deals (deal_id) ON DELETE CASCADE,
+            overall_sentiment TEXT NOT NULL,
+            sentiment_score DOUBLE PRECISION NOT NULL,
+            confidence DOUBLE PRECISION NOT NULL,
+            activity_breakdown JSON NOT NULL DEFAULT '{}',
+            deal_momentum_indicators JSON NOT NULL DEFAULT '{}',
+            reasoning TEXT,
+            professional_gaps JSON NOT NULL DEFAULT '[]',
+            excellence_indicators JSON NOT NULL DEFAULT '[]',
+            risk_indicators JSON NOT NULL DEFAULT '[]',
+            opportunity_indicators JSON NOT NULL DEFAULT '[]',
+            temporal_trend TEXT,
+            recommended_actions JSON NOT NULL DEFAULT '[]',
+            context_analysis_notes JSON NOT NULL DEFAULT '[]'
+        )
+        """,
+        # No foreign key to users: removing a user with keep_progress keeps their annotations
+        """
+        CREATE TABLE IF NOT EXISTS annotations (
+            id BIGSERIAL PRIMARY KEY,
+            deal_id TEXT NOT NULL REFERENCES deals (deal_id) ON DELETE CASCADE,
+            user_email TEXT NOT NULL,
+            ratings JSON NOT NULL,
+            time_spent_seconds INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT annotations_deal_id_user_email_key UNIQUE (deal_id, user_email)
+        )
+        """
+    ]),
+    # The (deal_id, user_email) unique index already serves deal_id lookups and GROUP BY deal_id
+    Migration(2, "annotation_indexes", [
+        # Covering index: per-user deal lists are answered by an index-only scan
+        "CREATE INDEX IF NOT EXISTS idx_annotations_user_email ON annotations (user_email) INCLUDE (deal_id)",
+        "CREATE INDEX IF NOT EXISTS idx_annotations_updated_at ON annotations (updated_at)",
+        "CREATE INDEX IF NOT EXISTS idx_users_created_at ON users (created_at)"
+    ]),
+    Migration(3, "jsonb_columns", [
+        *[
+            f"""
+            ALTER TABLE {table}
+                ALTER COLUMN {column} DROP DEFAULT,
+                ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb
+            """
+            for table, column in JSON_COLUMNS
+        ],
+        "ALTER TABLE deals ALTER COLUMN activities SET DEFAULT '[]'",
+        *[
+            f"ALTER TABLE llm_outputs ALTER COLUMN {column} SET DEFAULT '{default}'"
+            for column, default in LLM_OUTPUT_JSON_DEFAULTS.items()
+        ],
+        # Containment queries on whole ratings, e.g. ratings @> '{"reasoning": {"score": 1}}'
+        "CREATE INDEX IF NOT EXISTS idx_annotations_ratings ON annotations USING GIN (ratings jsonb_path_ops)",
+        # Range filters on a single field's score
+        *[
+            f"""
+            CREATE INDEX IF NOT EXISTS idx_annotations_score_{field}
+            ON annotations (((ratings -> '{field}' ->> 'score')::int))
+            """
+            for field in RATING_FIELDS
+        ],
+        # Element lookups on indicator lists, e.g. risk_indicators ? 'Budget freeze'
+        *[
+            f"CREATE INDEX IF NOT EXISTS idx_llm_outputs_{column} ON llm_outputs USING GIN ({column})"
+            for column in LLM_OUTPUT_INDICATOR_COLUMNS
+        ],
+        """
+        CREATE INDEX IF NOT EXISTS idx_llm_outputs_deal_momentum_indicators
+        ON llm_outputs USING GIN (deal_momentum_indicators jsonb_path_ops)
+        """
+    ]),
+    Migration(4, "activities_table", [
+        # Compressed paragraph chunks keyed by their SHA-256, shared across activities and deals
+        """
+        CREATE TABLE IF NOT EXISTS activity_bodies (
+            body_hash TEXT PRIMARY KEY,
+            body BYTEA NOT NULL,
+            size INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activities (
+            deal_id TEXT NOT NULL REFERENCES deals (deal_id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            activity_type TEXT,
+            metadata JSONB NOT NULL DEFAULT '{}',
+            body_refs JSONB NOT NULL DEFAULT '{}',
+            PRIMARY KEY (deal_id, seq)
+        )
+        """,
+        # Lets deal summaries show the activity count without reading activities
+        "ALTER TABLE deals ADD COLUMN IF NOT EXISTS activity_count INTEGER NOT NULL DEFAULT 0"
+    ], apply=move_activities_out_of_deals),
+    # Annotations of archived deals move to a cold partition that hot queries prune away.
+    # Unique keys on a partitioned table must include the partition key.
+    Migration(5, "partition_annotations", [
+        """
+        CREATE TABLE annotations_partitioned (
+            id BIGSERIAL NOT NULL,
+            deal_id TEXT NOT NULL REFERENCES deals (deal_id) ON DELETE CASCADE,
+            user_email TEXT NOT NULL,
+            ratings JSONB NOT NULL,
+            time_spent_seconds INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            archived BOOLEAN NOT NULL DEFAULT FALSE
+        ) PARTITION BY LIST (archived)
+        """,
+        "CREATE TABLE annotations_active PARTITION OF annotations_partitioned FOR VALUES IN (FALSE)",
+        "CREATE TABLE annotations_archived PARTITION OF annotations_partitioned FOR VALUES IN (TRUE)",
+        """
+        INSERT INTO annotations_partitioned (id, deal_id, user_email, ratings, time_spent_seconds,
+                                             created_at, updated_at)
+        SELECT id, deal_id, user_email, ratings, time_spent_seconds, created_at, updated_at
+        FROM annotations
+        """,
+        """
+        SELECT setval(pg_get_serial_sequence('annotations_partitioned', 'id'), COALESCE(MAX(id), 0) + 1, FALSE)
+        FROM annotations_partitioned
+        """,
+        "DROP TABLE annotations",
+        "ALTER TABLE annotations_partitioned RENAME TO annotations",
+        "ALTER SEQUENCE annotations_partitioned_id_seq RENAME TO annotations_id_seq",
+        "ALTER TABLE annotations ADD CONSTRAINT annotations_pkey PRIMARY KEY (id, archived)",
+        """
+        ALTER TABLE annotations
+        ADD CONSTRAINT annotations_deal_id_user_email_key UNIQUE (deal_id, user_email, archived)
+        """,
+        "CREATE INDEX idx_annotations_user_email ON annotations (user_email) INCLUDE (deal_id)",
+        "CREATE INDEX idx_annotations_updated_at ON annotations (updated_at)",
+        "CREATE INDEX idx_annotations_ratings ON annotations USING GIN (ratings jsonb_path_ops)",
+        *[
+            f"""
+            CREATE INDEX idx_annotations_score_{field}
+            ON annotations (((ratings -> '{field}' ->> 'score')::int))
+            """
+            for field in RATING_FIELDS
+        ],
+        "ALTER TABLE deals ADD COLUMN IF NOT EXISTS archived_at TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS idx_deals_active ON deals (deal_id) WHERE archived_at IS NULL"
+    ]),
+    Migration(6, "campaigns", [
+        f"""
+        CREATE TABLE IF NOT EXISTS campaigns (
+            campaign_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            target_annotations_per_deal INTEGER NOT NULL DEFAULT {TARGET_ANNOTATIONS_PER_DEAL},
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        f"""
+        INSERT INTO campaigns (campaign_id, name) VALUES ('{DEFAULT_CAMPAIGN_ID}', 'Default campaign')
+        ON CONFLICT (campaign_id) DO NOTHING
+        """,
+        f"""
+        ALTER TABLE deals ADD COLUMN IF NOT EXISTS campaign_id TEXT NOT NULL DEFAULT '{DEFAULT_CAMPAIGN_ID}'
+            REFERENCES campaigns (campaign_id)
+        """,
+        f"""
+        ALTER TABLE users ADD COLUMN IF NOT EXISTS campaign_id TEXT NOT NULL DEFAULT '{DEFAULT_CAMPAIGN_ID}'
+            REFERENCES campaigns (campaign_id)
+        """,
+        # Denormalized from deals so per-campaign annotation reads stay on one index
+        f"ALTER TABLE annotations ADD COLUMN IF NOT EXISTS campaign_id TEXT NOT NULL DEFAULT '{DEFAULT_CAMPAIGN_ID}'",
+        "CREATE INDEX IF NOT EXISTS idx_annotations_campaign_user ON annotations (campaign_id, user_email) INCLUDE (deal_id)",
+        # Per-deal counters, kept apart from deals so counter updates don't roll
+        # the deal row version that keys cached deal views and page ETags
+        """
+        CREATE TABLE IF NOT EXISTS deal_progress (
+            deal_id TEXT PRIMARY KEY REFERENCES deals (deal_id) ON DELETE CASCADE,
+            campaign_id TEXT NOT NULL REFERENCES campaigns (campaign_id),
+            annotation_count INTEGER NOT NULL DEFAULT 0,
+            archived BOOLEAN NOT NULL DEFAULT FALSE
+        )
+        """,
+        """
+        INSERT INTO deal_progress (deal_id, campaign_id, annotation_count, archived)
+        SELECT d.deal_id, d.campaign_id, COUNT(a.deal_id), d.archived_at IS NOT NULL
+        FROM deals d
+        LEFT JOIN annotations a ON a.deal_id = d.deal_id
+        GROUP BY d.deal_id
+        ON CONFLICT (deal_id) DO NOTHING
+        """,
+        # Assignment reads the least-annotated open deals of one campaign straight off this index
+        """
+        CREATE INDEX IF NOT EXISTS idx_deal_progress_assignment
+        ON deal_progress (campaign_id, archived, annotation_count, deal_id)
+        """
+    ]),
+    # llm_outputs keeps the latest version in full; each older version is a diff from the one after it
+    Migration(7, "llm_output_versions", [
+        """
+        CREATE TABLE IF NOT EXISTS llm_output_versions (
+            deal_id TEXT NOT NULL REFERENCES llm_outputs (deal_id) ON DELETE CASCADE,
+            version INTEGER NOT NULL,
+            label TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            reverse_diff JSONB,
+            PRIMARY KEY (deal_id, version)
+        )
+        """,
+        "ALTER TABLE llm_outputs ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+        """
+        INSERT INTO llm_output_versions (deal_id, version, label)
+        SELECT deal_id, version, 'initial' FROM llm_outputs
+        ON CONFLICT (deal_id, version) DO NOTHING
+        """,
+        # Which version an annotator rated; NULL for annotations made before versioning
+        "ALTER TABLE annotations ADD COLUMN IF NOT EXISTS llm_output_version INTEGER"
+    ]),
+    Migration(8, "adaptive_assignment", [
+        """
+        ALTER TABLE campaigns
+            ADD COLUMN IF NOT EXISTS assignment_mode TEXT NOT NULL DEFAULT 'fixed'
+                CHECK (assignment_mode IN ('fixed', 'adaptive'))
+        """,
+        f"""
+        ALTER TABLE campaigns
+            ADD COLUMN IF NOT EXISTS convergence_min_annotations INTEGER NOT NULL
+                DEFAULT {DEFAULT_MIN_ANNOTATIONS},
+            ADD COLUMN IF NOT EXISTS convergence_max_half_width DOUBLE PRECISION NOT NULL
+                DEFAULT {DEFAULT_MAX_HALF_WIDTH}
+        """,
+        # Running per-field n / sum / sum of squares of scores, updated on every write
+        """
+        ALTER TABLE deal_progress
+            ADD COLUMN IF NOT EXISTS score_stats JSONB NOT NULL DEFAULT '{}',
+            ADD COLUMN IF NOT EXISTS uncertainty DOUBLE PRECISION,
+            ADD COLUMN IF NOT EXISTS converged BOOLEAN NOT NULL DEFAULT FALSE
+        """
+    ], apply=backfill_score_stats),
+    Migration(9, "gold_standard", [
+        f"""
+        ALTER TABLE campaigns
+            ADD COLUMN IF NOT EXISTS calibration_rate DOUBLE PRECISION NOT NULL DEFAULT {DEFAULT_CALIBRATION_RATE}
+                CHECK (calibration_rate >= 0 AND calibration_rate <= 1)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS gold_deals (
+            deal_id TEXT PRIMARY KEY REFERENCES deals (deal_id) ON DELETE CASCADE,
+            expected_ratings JSONB NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Gold deals are left out of production assignment and counts
+        "ALTER TABLE deal_progress ADD COLUMN IF NOT EXISTS gold BOOLEAN NOT NULL DEFAULT FALSE",
+        # Running per-annotator counters, updated when annotations on gold deals are written
+        """
+        CREATE TABLE IF NOT EXISTS annotator_accuracy (
+            user_email TEXT NOT NULL,
+            campaign_id TEXT NOT NULL REFERENCES campaigns (campaign_id),
+            gold_annotations INTEGER NOT NULL DEFAULT 0,
+            fields_compared INTEGER NOT NULL DEFAULT 0,
+            exact_matches INTEGER NOT NULL DEFAULT 0,
+            abs_error_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_email, campaign_id)
+        )
+        """
+    ]),
+    # Bodies are stored compressed, so their vectors are computed from the text at write time
+    Migration(10, "activity_search", [
+        # Merges chunk vectors into one per deal; positions of later chunks are shifted past earlier ones
+        """
+        CREATE AGGREGATE tsvector_agg (tsvector) (
+            SFUNC = tsvector_concat,
+            STYPE = tsvector,
+            INITCOND = ''
+        )
+        """,
+        "ALTER TABLE activity_bodies ADD COLUMN IF NOT EXISTS search_vector TSVECTOR",
+        # Matching and ranking run on one row per deal rather than one per activity
+        "ALTER TABLE deals ADD COLUMN IF NOT EXISTS search_vector TSVECTOR"
+    ], apply=backfill_search_vectors),
+    Migration(11, "deal_browser", [
+        # Keyset pages of one campaign's deals in deal_id order
+        "CREATE INDEX IF NOT EXISTS idx_deal_progress_campaign_deal ON deal_progress (campaign_id, deal_id)"
+    ]),
+    # Sessions are signed tokens; workers keep these revocations in memory and reload them every few seconds.
+    # Times are epoch seconds, the clock session tokens use.
+    Migration(12, "session_revocations", [
+        """
+        CREATE TABLE IF NOT EXISTS session_revocations (
+            id BIGSERIAL PRIMARY KEY,
+            session_id TEXT,
+            subject TEXT,
+            revoked_before DOUBLE PRECISION,
+            expires_at DOUBLE PRECISION NOT NULL,
+            CHECK (session_id IS NOT NULL OR (subject IS NOT NULL AND revoked_before IS NOT NULL))
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_session_revocations_expires_at ON session_revocations (expires_at)"
+    ]),
+    # Users whose cached campaign and precomputed next deal every worker must drop; polled like revocations
+    Migration(13, "user_cache_invalidations", [
+        """
+        CREATE TABLE IF NOT EXISTS user_cache_invalidations (
+            id BIGSERIAL PRIMARY KEY,
+            email TEXT NOT NULL,
+            invalidated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_user_cache_invalidations_at ON user_cache_invalidations (invalidated_at)"
+    ]),
+]
+
+async def ensure_migrations_table(connection):
+    """Create the bookkeeping table for applied migrations"""
+    await connection.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+async def get_applied_versions(connection) -> List[int]:
+    """Get versions of migrations already applied"""
+    await ensure_migrations_table(connection)
+    rows = await connection.fetch("SELECT version FROM schema_migrations ORDER BY version")
+    return [row['version'] for row in rows]
+
+async def run_migrations(connection, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to target, returns the versions applied"""
+    await connection.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_ID)
+    try:
+        applied = set(await get_applied_versions(connection))
+        newly_applied = []
+
+        for migration in sorted(MIGRATIONS, key=lambda m: m.version):
+            if migration.version in applied:
+                continue
+            if target is not None and migration.version > target:
+                break
+
+            async with connection.transaction():
+                for statement in migration.statements:
+                    await connection.execute(statement)
+                if migration.apply:
+                    await migration.apply(connection)
+                await connection.execute("""
+                    INSERT INTO schema_migrations (version, name) VALUES ($1, $2)
+                """, migration.version, migration.name)
+
+            print(f"Applied migration {migration.version}: {migration.name}")
+            newly_applied.append(migration.version)
+
+        return newly_applied
+    finally:
+        await connection.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_ID)
+
+# Hot queries whose plans must stay on indexes, with parameters for the seeded dataset
+PLAN_CHECK_QUERIES: Dict[str, tuple] = {
+    "get_user_annotations": (
+        "SELECT deal_id FROM annotations WHERE user_email = $1",
+        ["plan-check-user-1@example.com"]
+    ),
+    "get_user_campaign_annotations": (
+        "SELECT deal_id FROM annotations WHERE campaign_id = $1 AND user_email = $2",
+        [DEFAULT_CAMPAIGN_ID, "plan-check-user-1@example.com"]
+    ),
+    "annotations_watermark": (
+        "SELECT MAX(updated_at) FROM annotations",
+        []
+    ),
+    "get_annotation_counts_by_deal": (
+        """
+        SELECT deal_id, annotation_count FROM deal_progress
+        WHERE campaign_id = $1 AND archived = FALSE AND gold = FALSE
+        """,
+        ["plan-check-campaign-001"]
+    ),
+    # get_user_progress reads completed deals with the get_user_campaign_annotations query
+    "get_user_progress": (
+        "SELECT COUNT(*) as total FROM deal_progress WHERE campaign_id = $1",
+        ["plan-check-campaign-001"]
+    ),
+}
+
+# Tables a plan check fails on when a query scans them sequentially
+PLAN_CHECK_RELATIONS = ("annotations", "deal_progress")
+
+# Seeded deals are split into this many campaigns, in contiguous runs of deals
+PLAN_CHECK_CAMPAIGNS = 100
+
+def find_seq_scans(plan: Dict[str, Any], relation: str) -> List[Dict[str, Any]]:
+    """Find sequential scan nodes on a relation or its partitions in an EXPLAIN (FORMAT JSON) plan"""
+    found = []
+    relation_name = plan.get("Relation Name", "")
+    if plan.get("Node Type") == "Seq Scan" and (relation_name == relation
+                                                or relation_name.startswith(f"{relation}_")):
+        found.append(plan)
+    for child in plan.get("Plans", []):
+        found.extend(find_seq_scans(child, relation))
+    return found
+
+async def seed_plan_check_data(connection, deal_count: int, user_count: int):
+    """Insert a synthetic dataset large enough for the planner to prefer indexes"""
+    await connection.execute("""
+        INSERT INTO deals (deal_id)
+        SELECT 'plan-check-deal-' || d FROM generate_series(1, $1) d
+    """, deal_count)
+    await connection.execute("""
+        INSERT INTO campaigns (campaign_id, name)
+        SELECT 'plan-check-campaign-' || lpad(c::text, 3, '0'), 'Plan check ' || c FROM generate_series(1, $1) c
+    """, PLAN_CHECK_CAMPAIGNS)
+    await connection.execute("""
+        INSERT INTO deal_progress (deal_id, campaign_id, annotation_count)
+        SELECT 'plan-check-deal-' || d, 'plan-check-campaign-' || lpad(((d - 1) * $2 / $1 + 1)::text, 3, '0'), $3
+        FROM generate_series(1, $1) d
+    """, deal_count, PLAN_CHECK_CAMPAIGNS, user_count)
+    await connection.execute("""
+        INSERT INTO annotations (deal_id, user_email, ratings, updated_at)
+        SELECT 'plan-check-deal-' || d, 'plan-check-user-' || u || '@example.com', '{}',
+               CURRENT_TIMESTAMP - (d || ' minutes')::interval
+        FROM generate_series(1, $1) d, generate_series(1, $2) u
+    """, deal_count, user_count)
+    await connection.execute("ANALYZE deals")
+    await connection.execute("ANALYZE deal_progress")
+    await connection.execute("ANALYZE annotations")
+
+async def check_query_plans(connection, deal_count: int = 2000, user_count: int = 25) -> Dict[str, List[str]]:
+    """EXPLAIN hot queries against a seeded dataset, returns sequential scans per query.
+
+    The seed data lives in a transaction that is always rolled back.
+    """
+    regressions = {}
+    transaction = connection.transaction()
+    await transaction.start()
+    try:
+        await seed_plan_check_data(connection, deal_count, user_count)
+        for name, (query, params) in PLAN_CHECK_QUERIES.items():
+            raw_plan = await connection.fetchval(f"EXPLAIN (FORMAT JSON) {query}", *params)
+            plan = json.loads(raw_plan)[0]["Plan"]
+            seq_scans = [node for relation in PLAN_CHECK_RELATIONS for node in find_seq_scans(plan, relation)]
+            if seq_scans:
+                regressions[name] = [node["Relation Name"] for node in seq_scans]
+    finally:
+        await transaction.rollback()
+    return regressions
+
+async def main(argv: List[str]) -> int:
+    from .database import db_manager
+
+    command = argv[0] if argv else "upgrade"
+    connection = await db_manager.connect()
+    try:
+        if command == "upgrade":
+            target = int(argv[1]) if len(argv) > 1 else None
+            applied = await run_migrations(connection, target)
+            if not applied:
+                print("Schema is up to date")
+        elif command == "status":
+            applied = set(await get_applied_versions(connection))
+            for migration in MIGRATIONS:
+                state = "applied" if migration.version in applied else "pending"
+                print(f"{migration.version:>4}  {state:<8} {migration.name}")
+        elif command == "check-plans":
+            regressions = await check_query_plans(connection)
+            for name in PLAN_CHECK_QUERIES:
+                if name in regressions:
+                    print(f"FAIL  {name}: sequential scan on {', '.join(regressions[name])}")
+                else:
+                    print(f"ok    {name}")
+            return 1 if regressions else 0
+        else:
+            print(f"Unknown command: {command} (expected upgrade, status or check-plans)")
+            return 2
+    finally:
+        await connection.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(sys.argv[1:])))
@@ -2,6 +2,20 @@ from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Dict, Any, Union
 from datetime import datetime
 
+# Campaign that existing deals, annotations and users belong to
+DEFAULT_CAMPAIGN_ID = "default"
+
+# Annotations a deal needs before it is complete, unless its campaign sets another target
+TARGET_ANNOTATIONS_PER_DEAL = 7
+
+# Sections of the LLM output that annotators score
+RATING_FIELDS = [
+    "overall_sentiment", "activity_breakdown", "deal_momentum_indicators",
+    "reasoning", "professional_gaps", "excellence_indicators",
+    "risk_indicators", "opportunity_indicators", "temporal_trend",
+    "recommended_actions"
+]
+
 class User(BaseModel):
     email: EmailStr
     name: str
@@ -0,0 +1,161 @@
+import os
+import sys
+import time
+import sysconfig
+import threading
+from collections import Counter
+from typing import Dict, Optional
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .auth import verify_admin_session
+
+# Seconds between stack samples
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL_MS", 5)) / 1000
+
+# Longest profile the admin endpoint will take
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", 60))
+
+# Per-request profiling via the X-Profile header needs its middleware; off by default
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
+
+PROFILE_HEADER = b"x-profile"
+
+# Frame file names are shortened to the part after the first of these prefixes
+PATH_PREFIXES = ("site-packages" + os.sep, os.getcwd() + os.sep, sysconfig.get_paths()["stdlib"] + os.sep)
+
+class SamplingProfiler:
+    """Statistical profiler that samples the stacks of every thread of this process.
+
+    A daemon thread wakes every `interval` seconds and records the current
+    stack of each other thread, so profiled code runs uninstrumented and
+    nothing is running between profiles. Stacks are reported in the
+    collapsed format read by flamegraph.pl and speedscope: one line per
+    distinct stack, root first, with frames joined by ';' and the sample count.
+    """
+
+    def __init__(self, interval: float = PROFILER_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.started_at = None
+        self.elapsed = 0.0
+        self._stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for prefix in PATH_PREFIXES:
+                if prefix in filename:
+                    filename = filename.split(prefix, 1)[1]
+                    break
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            self._stacks[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        """Start sampling in a background thread"""
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, heaviest first"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-Profile-Samples": str(self.samples),
+            "X-Profile-Seconds": f"{self.elapsed:.3f}",
+            "X-Profile-Pid": str(os.getpid())
+        }
+
+# One profile per worker at a time, overlapping samplers would skew each other
+_active_lock = threading.Lock()
+
+def acquire_profiler(interval: float = PROFILER_INTERVAL) -> Optional[SamplingProfiler]:
+    """Get a profiler unless one is already running in this worker"""
+    if not _active_lock.acquire(blocking=False):
+        return None
+    return SamplingProfiler(interval)
+
+def release_profiler():
+    _active_lock.release()
+
+class ProfileRequestMiddleware:
+    """Profile single requests carrying an X-Profile header from an admin.
+
+    The response is replaced by the collapsed stacks of the worker while the
+    request ran, including any concurrent requests on the same event loop.
+    The original status is returned in X-Profiled-Status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        if not await verify_admin_session(Request(scope).cookies.get("admin_token")):
+            await self.app(scope, receive, send)
+            return
+
+        profiler = acquire_profiler()
+        if profiler is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = {}
+
+        async def discard(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        try:
+            profiler.start()
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                profiler.stop()
+        finally:
+            release_profiler()
+
+        body = profiler.collapsed().encode("utf-8")
+        headers = {**profiler.headers(), "X-Profiled-Status": str(status.get("code", 500)),
+                   "Content-Type": "text/plain; charset=utf-8", "Content-Length": str(len(body)),
+                   "Cache-Control": "no-store"}
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -4,14 +4,17 @@ class DealValidationApp {
     constructor() {
         this.startTime = Date.now();
         this.currentDealId = null;
+        // One key per rating page so retried submits are not recorded twice
+        this.idempotencyKey = this.createIdempotencyKey();
         this.init();
     }
 
     init() {
         this.bindEvents();
-        // Only load progress if not on admin page
+        // Only subscribe to progress if not on admin page
         if (!window.location.pathname.includes('/admin')) {
-            this.loadProgress();
+            this.restoreSubmittedProgress();
+            this.subscribeProgress();
         }
         this.startTimeTracking();
         this.initializeUI();
@@ -44,6 +47,7 @@ class DealValidationApp {
         const ratingForm = document.getElementById('rating-form');
         if (ratingForm) {
             ratingForm.addEventListener('submit', (e) => this.handleRatingSubmit(e));
+            this.prefetchNextDeal(ratingForm.elements['deal_id'].value);
         }
 
         // Rating star interactions
@@ -155,6 +159,52 @@ class DealValidationApp {
         });
     }
 
+    async prefetchNextDeal(currentDealId) {
+        // Fetch the next deal's page while the annotator is still rating this one
+        try {
+            const response = await fetch(`/api/next-deal?current=${encodeURIComponent(currentDealId)}`);
+            if (!response.ok) return;
+            
+            const result = await response.json();
+            if (!result.prefetch_url) return;
+            
+            // Let the service worker hold the page when it controls this tab
+            if (navigator.serviceWorker && navigator.serviceWorker.controller) {
+                navigator.serviceWorker.controller.postMessage({
+                    type: 'prefetch-deal',
+                    url: result.prefetch_url
+                });
+                return;
+            }
+            
+            const link = document.createElement('link');
+            link.rel = 'prefetch';
+            link.href = result.prefetch_url;
+            document.head.appendChild(link);
+        } catch (error) {
+            console.error('Failed to prefetch next deal:', error);
+        }
+    }
+
+    createIdempotencyKey() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    }
+
+    async postWithRetry(url, body, attempts = 3) {
+        // Only network failures are retried; the idempotency key makes repeats safe
+        for (let attempt = 1; ; attempt++) {
+            try {
+                return await fetch(url, { method: 'POST', body });
+            } catch (error) {
+                if (attempt >= attempts) throw error;
+                await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+            }
+        }
+    }
+
     getCurrentDealId() {
         const urlParts = window.location.pathname.split('/');
         return urlParts[urlParts.length - 1];
@@ -207,26 +257,27 @@ class DealValidationApp {
             // Prepare form data
             const formData = new FormData(e.target);
             formData.append('time_spent', this.getTimeSpent());
+            formData.append('idempotency_key', this.idempotencyKey);
             
             // Submit to server
-            const response = await fetch('/submit-rating', {
-                method: 'POST',
-                body: formData
-            });
+            const response = await this.postWithRetry('/submit-rating', formData);
             
             const result = await response.json();
             
             if (response.ok) {
                 this.showAlert('✅ Rating submitted successfully!', 'success');
                 
-                // Redirect to next deal or completion page
+                // The next page was prefetched before this submit, so carry the new count over to it
+                sessionStorage.setItem('completedCount', result.completed_count);
+                
+                // Redirect to next deal (already prefetched) or completion page
                 setTimeout(() => {
                     if (result.next_deal) {
                         window.location.href = `/activities/${result.next_deal}`;
                     } else {
                         window.location.href = '/instructions?completed=true';
                     }
-                }, 2000);
+                }, 400);
                 
             } else {
                 throw new Error(result.detail || 'Submission failed');
@@ -268,38 +319,62 @@ class DealValidationApp {
         return allValid;
     }
 
+    subscribeProgress() {
+        // Fall back to a one-off fetch where server-sent events are unavailable
+        if (!window.EventSource) {
+            this.loadProgress();
+            return;
+        }
+        
+        this.progressStream = new LiveStream('/api/progress/stream', {
+            progress: (progress) => this.renderProgress(progress)
+        });
+    }
+
+    restoreSubmittedProgress() {
+        // Show the count from the last submit until the progress stream reports in
+        const completedCount = sessionStorage.getItem('completedCount');
+        if (completedCount === null) return;
+        
+        sessionStorage.removeItem('completedCount');
+        this.renderProgress({ completed_count: parseInt(completedCount) });
+    }
+
     async loadProgress() {
         try {
             const response = await fetch('/api/progress');
             if (!response.ok) throw new Error('Failed to load progress');
             
             const progress = await response.json();
-            
-            // Update all progress displays
-            const progressElements = document.querySelectorAll('#progress-info, .progress-info');
-            progressElements.forEach(element => {
-                if (element) {
-                    element.innerHTML = `
-                        <span class="progress-badge">
-                            ${progress.completed_count} Completed
-                        </span>
-                    `;
-                }
-            });
-            
-            // Update progress bar if exists
-            const progressBar = document.getElementById('progress-bar');
-            if (progressBar) {
-                const percentage = (progress.completed_count / progress.total_deals) * 100;
-                progressBar.style.width = `${percentage}%`;
-                progressBar.setAttribute('aria-valuenow', percentage);
-            }
+            this.renderProgress(progress);
             
         } catch (error) {
             console.error('Failed to load progress:', error);
         }
     }
 
+    renderProgress(progress) {
+        // Update all progress displays
+        const progressElements = document.querySelectorAll('#progress-info, .progress-info');
+        progressElements.forEach(element => {
+            if (element) {
+                element.innerHTML = `
+                    <span class="progress-badge">
+                        ${progress.completed_count} Completed
+                    </span>
+                `;
+            }
+        });
+        
+        // Update progress bar if exists
+        const progressBar = document.getElementById('progress-bar');
+        if (progressBar && progress.total_deals) {
+            const percentage = (progress.completed_count / progress.total_deals) * 100;
+            progressBar.style.width = `${percentage}%`;
+            progressBar.setAttribute('aria-valuenow', percentage);
+        }
+    }
+
     showAlert(message, type = 'info', duration = 5000) {
         // Remove existing alerts
         document.querySelectorAll('.alert-notification').forEach(alert => alert.remove());
@@ -355,6 +430,41 @@ class DealValidationApp {
     }
 }
 
+// Server-sent event subscription that disconnects while the tab is hidden
+class LiveStream {
+    constructor(url, handlers) {
+        this.url = url;
+        this.handlers = handlers;
+        this.source = null;
+        this.open();
+        
+        document.addEventListener('visibilitychange', () => {
+            if (document.hidden) {
+                this.close();
+            } else {
+                // Reconnecting replays a fresh snapshot, so nothing is missed while hidden
+                this.open();
+            }
+        });
+    }
+
+    open() {
+        if (this.source) return;
+        
+        this.source = new EventSource(this.url);
+        Object.entries(this.handlers).forEach(([event, handler]) => {
+            this.source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+        });
+    }
+
+    close() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+    }
+}
+
 // Activity display enhancements
 class ActivityDisplay {
     constructor() {
@@ -410,12 +520,68 @@ class ActivityDisplay {
 // Admin functionality
 class AdminDashboard {
     constructor() {
+        const campaignSelect = document.getElementById('campaign-select');
+        this.campaignQuery = campaignSelect ? `?campaign_id=${encodeURIComponent(campaignSelect.value)}` : '';
         this.init();
     }
 
     init() {
         this.bindEvents();
-        this.loadStats();
+        this.subscribeUpdates();
+    }
+
+    subscribeUpdates() {
+        // The stream's initial stats snapshot drives the dashboard; fetch once only without SSE
+        if (!window.EventSource) {
+            this.loadStats();
+            return;
+        }
+        
+        this.updateStream = new LiveStream(`/api/admin/stream${this.campaignQuery}`, {
+            stats: (stats) => this.renderStats(stats),
+            annotation: (update) => this.applyAnnotationUpdate(update)
+        });
+    }
+
+    renderStats(stats) {
+        this.stats = stats;
+        
+        const setText = (id, value) => {
+            const element = document.getElementById(id);
+            if (element) element.textContent = value;
+        };
+        
+        setText('total-annotations-stat', stats.total_annotations);
+        setText('completed-deals-stat', stats.completed_deals);
+        setText('total-deals-stat', stats.total_deals);
+        
+        if (stats.total_deals > 0) {
+            setText('completion-percentage', `${(stats.completed_deals / stats.total_deals * 100).toFixed(1)}%`);
+        }
+        if (stats.target_total_annotations > 0) {
+            setText('overall-progress-stat', `${(stats.total_annotations / stats.target_total_annotations * 100).toFixed(1)}%`);
+        }
+    }
+
+    applyAnnotationUpdate(update) {
+        if (this.stats) {
+            this.stats.total_annotations += 1;
+            if (update.deal_completed) {
+                this.stats.completed_deals += 1;
+            }
+            this.renderStats(this.stats);
+        }
+        
+        // Update the deal row if the distribution panel is showing it
+        const row = document.querySelector(`[data-deal-id="${update.deal_id}"]`);
+        if (row) {
+            const percentage = update.target_annotations > 0 ? 
+                update.current_annotations / update.target_annotations * 100 : 0;
+            row.querySelector('.deal-annotation-count').textContent = 
+                `${update.current_annotations}/${update.target_annotations} annotations`;
+            row.querySelector('.progress-fill').style.width = `${percentage}%`;
+            row.querySelector('.deal-progress-percentage').textContent = `${percentage.toFixed(1)}%`;
+        }
     }
 
     bindEvents() {
@@ -462,18 +628,10 @@ class AdminDashboard {
 
     async loadStats() {
         try {
-            const response = await fetch('/api/admin/stats');
+            const response = await fetch(`/api/admin/stats${this.campaignQuery}`);
             if (!response.ok) return;
             
-            const stats = await response.json();
-            
-            // Update UI with stats
-            if (stats.overall_progress !== undefined) {
-                const progressElement = document.getElementById('overall-progress-stat');
-                if (progressElement) {
-                    progressElement.textContent = `${stats.overall_progress.toFixed(1)}%`;
-                }
-            }
+            this.renderStats(await response.json());
         } catch (error) {
             console.error('Failed to load admin stats:', error);
         }
@@ -484,71 +642,94 @@ class AdminDashboard {
         app.showAlert(message, type);
     }
 
-    async loadDealDistribution() {
+    async loadDealDistribution(append = false) {
+        const params = new URLSearchParams(this.campaignQuery);
+        params.set('limit', '20');
+        const statusSelect = document.getElementById('distribution-status');
+        if (statusSelect && statusSelect.value) params.set('status', statusSelect.value);
+        if (append && this.distributionCursor) params.set('after', this.distributionCursor);
+        
         try {
-            const response = await fetch('/api/admin/deal-distribution');
+            const response = await fetch(`/api/admin/deal-distribution?${params}`);
             if (!response.ok) return;
             
             const data = await response.json();
-            this.displayDealDistribution(data);
+            this.distributionCursor = data.next_cursor;
+            this.displayDealDistribution(data, append);
         } catch (error) {
             console.error('Failed to load deal distribution:', error);
         }
     }
 
-    displayDealDistribution(data) {
-        const container = document.getElementById('deal-distribution-details');
-        if (!container) return;
+    renderDistributionRow(deal) {
+        const statusColor = deal.status === 'completed' || deal.status === 'converged' ? 'var(--success-color)' : 
+                        deal.status === 'in_progress' ? 'var(--warning-color)' : 'var(--text-muted)';
         
-        let html = `
-            <div style="background: var(--bg-secondary); padding: 1.5rem; border-radius: 8px;">
-                <h4>Deal-by-Deal Progress (First 20 deals shown)</h4>
-                <div style="max-height: 400px; overflow-y: auto; margin-top: 1rem;">
+        return `
+            <div data-deal-id="${deal.deal_id}" style="display: flex; align-items: center; justify-content: space-between; padding: 0.75rem; border-bottom: 1px solid var(--border-color);">
+                <div>
+                    <strong>Deal #${deal.deal_id}</strong>
+                    <span class="deal-annotation-count" style="margin-left: 1rem; color: ${statusColor};">
+                        ${deal.current_annotations}/${deal.target_annotations} annotations
+                    </span>
+                </div>
+                <div style="display: flex; align-items: center; gap: 1rem;">
+                    <div class="progress-bar" style="width: 120px;">
+                        <div class="progress-fill" style="width: ${deal.progress_percentage}%;"></div>
+                    </div>
+                    <span class="deal-progress-percentage" style="font-weight: 600;">${deal.progress_percentage.toFixed(1)}%</span>
+                </div>
+            </div>
         `;
+    }
+
+    displayDealDistribution(data, append = false) {
+        const container = document.getElementById('deal-distribution-details');
+        if (!container) return;
         
-        // Show first 20 deals for performance
-        const dealsToShow = data.deal_details.slice(0, 20);
-        
-        dealsToShow.forEach(deal => {
-            const statusColor = deal.status === 'completed' ? 'var(--success-color)' : 
-                            deal.status === 'in_progress' ? 'var(--warning-color)' : 'var(--text-muted)';
+        const rows = data.deal_details.map(deal => this.renderDistributionRow(deal)).join('');
+        const list = document.getElementById('distribution-list');
+        if (append && list) {
+            list.insertAdjacentHTML('beforeend', rows);
+        } else {
+            const status = document.getElementById('distribution-status');
+            const selected = status ? status.value : '';
+            const option = (value, label) =>
+                `<option value="${value}"${value === selected ? ' selected' : ''}>${label}</option>`;
             
-            html += `
-                <div style="display: flex; align-items: center; justify-content: space-between; padding: 0.75rem; border-bottom: 1px solid var(--border-color);">
-                    <div>
-                        <strong>Deal #${deal.deal_id}</strong>
-                        <span style="margin-left: 1rem; color: ${statusColor};">
-                            ${deal.current_annotations}/${deal.target_annotations} annotations
-                        </span>
+            container.innerHTML = `
+                <div style="background: var(--bg-secondary); padding: 1.5rem; border-radius: 8px;">
+                    <div style="display: flex; align-items: center; justify-content: space-between;">
+                        <h4>Deal-by-Deal Progress (least annotated first)</h4>
+                        <select id="distribution-status" onchange="loadDealDistribution()">
+                            ${option('', `All active (${data.not_started_deals + data.in_progress_deals + data.completed_deals - data.archived_deals})`)}
+                            ${option('not_started', `Not started (${data.not_started_deals})`)}
+                            ${option('in_progress', `In progress (${data.in_progress_deals})`)}
+                            ${option('completed', `Completed (${data.completed_deals - data.archived_deals - data.converged_deals})`)}
+                            ${option('converged', `Converged (${data.converged_deals})`)}
+                        </select>
                     </div>
-                    <div style="display: flex; align-items: center; gap: 1rem;">
-                        <div class="progress-bar" style="width: 120px;">
-                            <div class="progress-fill" style="width: ${deal.progress_percentage}%;"></div>
-                        </div>
-                        <span style="font-weight: 600;">${deal.progress_percentage.toFixed(1)}%</span>
+                    <div id="distribution-list" style="max-height: 400px; overflow-y: auto; margin-top: 1rem;">${rows}</div>
+                    <div style="margin-top: 1rem; text-align: center; color: var(--text-muted);">
+                        <span id="distribution-shown"></span> of ${data.total_deals} deals (${data.archived_deals} archived)
+                        <button id="distribution-more" onclick="loadDealDistribution(true)" class="btn btn-secondary" style="margin-left: 1rem;">Load more</button>
                     </div>
                 </div>
             `;
-        });
-        
-        html += `
-                </div>
-                <div style="margin-top: 1rem; text-align: center; color: var(--text-muted);">
-                    Showing ${dealsToShow.length} of ${data.total_deals} deals
-                </div>
-            </div>
-        `;
+        }
         
-        container.innerHTML = html;
+        document.getElementById('distribution-shown').textContent =
+            `Showing ${document.querySelectorAll('#distribution-list [data-deal-id]').length}`;
+        document.getElementById('distribution-more').style.display = data.next_cursor ? '' : 'none';
         container.style.display = 'block';
     }
 }
 
 // Move this outside the class and after the class definition
-window.loadDealDistribution = function() {
+window.loadDealDistribution = function(append = false) {
     const adminDashboard = window.adminDashboard;
     if (adminDashboard) {
-        adminDashboard.loadDealDistribution();
+        adminDashboard.loadDealDistribution(append);
     }
 };
 
@@ -725,7 +906,14 @@ window.updateSectionProgress = function() {
 // Service worker registration
 if ('serviceWorker' in navigator) {
     window.addEventListener('load', () => {
-        navigator.serviceWorker.register('/static/js/sw.js')
+        // Remove the old worker registered under /static/js/, it never controlled pages
+        navigator.serviceWorker.getRegistrations().then(registrations => {
+            registrations
+                .filter(registration => registration.active && registration.active.scriptURL.includes('/static/js/sw.js'))
+                .forEach(registration => registration.unregister());
+        });
+        
+        navigator.serviceWorker.register('/sw.js')
             .then(registration => {
                 console.log('Service Worker registered:', registration);
             })
@@ -1,46 +1,120 @@
 // Deal Validation App - Service Worker
-const CACHE_NAME = 'deal-validation-v1';
-const urlsToCache = [
-    '/',
-    '/static/css/style.css',
-    '/static/js/app.js',
-    '/instructions',
-    // Add other static resources as needed
-];
-
-// Install event - cache resources
+// Served from /sw.js; the placeholders are filled in by the server at startup
+const CACHE_VERSION = '__CACHE_VERSION__';
+const STATIC_CACHE = `deal-validation-static-${CACHE_VERSION}`;
+const PAGES_CACHE = `deal-validation-pages-${CACHE_VERSION}`;
+const DEALS_CACHE = `deal-validation-deals-${CACHE_VERSION}`;
+const CURRENT_CACHES = [STATIC_CACHE, PAGES_CACHE, DEALS_CACHE];
+
+// Fingerprinted static assets, safe to keep until the version changes
+const PRECACHE_URLS = __PRECACHE_URLS__;
+
+// Deal pages that can be prefetched ahead of the annotator reaching them
+const DEAL_PAGE_PATTERN = /^\/(activities|rating)\/[^/]+$/;
+
+// Annotator pages kept for offline use; admin and login pages always go to the network
+const OFFLINE_PAGE_PATTERN = /^\/(instructions|(activities|rating)\/[^/]+)$/;
+
+// Install event - precache static assets
 self.addEventListener('install', (event) => {
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then((cache) => {
-                console.log('Opened cache');
-                return cache.addAll(urlsToCache);
-            })
+        caches.open(STATIC_CACHE)
+            .then((cache) => cache.addAll(PRECACHE_URLS))
+            .then(() => self.skipWaiting())
     );
 });
 
-// Fetch event - serve from cache when offline
-self.addEventListener('fetch', (event) => {
-    event.respondWith(
-        caches.match(event.request)
-            .then((response) => {
-                // Return cached version or fetch from network
-                return response || fetch(event.request);
-            })
+// Activate event - clean up caches from previous versions
+self.addEventListener('activate', (event) => {
+    event.waitUntil(
+        caches.keys()
+            .then((cacheNames) => Promise.all(
+                cacheNames
+                    .filter((cacheName) => !CURRENT_CACHES.includes(cacheName))
+                    .map((cacheName) => caches.delete(cacheName))
+            ))
+            .then(() => self.clients.claim())
     );
 });
 
-// Activate event - clean up old caches
-self.addEventListener('activate', (event) => {
-    event.waitUntil(
-        caches.keys().then((cacheNames) => {
-            return Promise.all(
-                cacheNames.map((cacheName) => {
-                    if (cacheName !== CACHE_NAME) {
-                        return caches.delete(cacheName);
+// Message event - prefetch upcoming deal pages
+self.addEventListener('message', (event) => {
+    const message = event.data || {};
+
+    if (message.type === 'prefetch-deal' && DEAL_PAGE_PATTERN.test(new URL(message.url, self.location.origin).pathname)) {
+        event.waitUntil(
+            fetch(message.url, { credentials: 'same-origin' })
+                .then((response) => {
+                    if (response.ok && !response.redirected) {
+                        return caches.open(DEALS_CACHE).then((cache) => cache.put(message.url, response));
                     }
                 })
-            );
-        })
-    );
-});
\ No newline at end of file
+                .catch((error) => console.log('Deal prefetch failed:', error))
+        );
+    }
+});
+
+// Static assets - cache first, the URL changes whenever the content does
+async function cacheFirst(request) {
+    const cached = await caches.match(request, { cacheName: STATIC_CACHE });
+    if (cached) return cached;
+
+    const response = await fetch(request);
+    if (response.ok) {
+        const cache = await caches.open(STATIC_CACHE);
+        cache.put(request, response.clone());
+    }
+    return response;
+}
+
+// Prefetched deal pages are served once, then dropped so they never go stale
+async function prefetchedDealPage(request) {
+    const cache = await caches.open(DEALS_CACHE);
+    const cached = await cache.match(request);
+    if (cached) {
+        await cache.delete(request);
+        return cached;
+    }
+    return networkFirst(request);
+}
+
+// Annotator pages - network first, falling back to the last copy when offline
+async function networkFirst(request) {
+    const cache = await caches.open(PAGES_CACHE);
+    try {
+        const response = await fetch(request);
+        if (response.ok && !response.redirected) {
+            cache.put(request, response.clone());
+        }
+        return response;
+    } catch (error) {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        throw error;
+    }
+}
+
+// Fetch event - pick a strategy per route
+self.addEventListener('fetch', (event) => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    // Leave writes, cross-origin requests and APIs (including event streams) to the network
+    if (request.method !== 'GET' || url.origin !== self.location.origin || url.pathname.startsWith('/api/')) {
+        return;
+    }
+
+    // Personalized pages must not outlive the session
+    if (url.pathname === '/logout') {
+        event.waitUntil(Promise.all([caches.delete(PAGES_CACHE), caches.delete(DEALS_CACHE)]));
+        return;
+    }
+
+    if (url.pathname.startsWith('/static/')) {
+        event.respondWith(cacheFirst(request));
+    } else if (request.mode === 'navigate' && DEAL_PAGE_PATTERN.test(url.pathname)) {
+        event.respondWith(prefetchedDealPage(request));
+    } else if (request.mode === 'navigate' && OFFLINE_PAGE_PATTERN.test(url.pathname)) {
+        event.respondWith(networkFirst(request));
+    }
+});
@@ -0,0 +1,293 @@
+import os
+import json
+import fcntl
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUBMISSION_JOURNAL_DIR = os.getenv("SUBMISSION_JOURNAL_DIR", "data/submissions")
+SUBMISSION_FLUSH_INTERVAL = float(os.getenv("SUBMISSION_FLUSH_INTERVAL", 0.5))
+SUBMISSION_FLUSH_BATCH_SIZE = int(os.getenv("SUBMISSION_FLUSH_BATCH_SIZE", 500))
+
+# How many idempotency keys to remember for replaying responses to retried submits
+IDEMPOTENCY_CACHE_SIZE = 10000
+
+# Submissions the database refused, kept per worker slot for inspection and manual replay
+DEAD_LETTER_FILE = "dead-letter.jsonl"
+
+class SubmissionRejected(Exception):
+    """Raised by a writer when a submission can never be stored, as opposed to a failed attempt"""
+
+class SubmissionQueue:
+    """Write-behind queue for annotation submissions.
+
+    Each submission is appended to an fsync'd journal segment before the
+    request returns, then batch-inserted by a background flusher. A segment
+    is only deleted once every record in it has been written to the
+    database, and segments left behind by a crash are replayed on startup.
+    Inserts upsert on (deal_id, user_email), so replaying a segment that was
+    partially flushed cannot create duplicate annotations.
+
+    Every worker process locks its own journal slot under ``journal_dir``;
+    a slot abandoned by a crashed worker is recovered by the next worker
+    that starts and claims it.
+
+    When the writer rejects a batch, its records are retried one at a time
+    and those rejected on their own are moved to the slot's dead-letter
+    journal, so one bad record cannot hold back the rest of the queue.
+    """
+
+    def __init__(self, journal_dir: str = SUBMISSION_JOURNAL_DIR,
+                 flush_interval: float = SUBMISSION_FLUSH_INTERVAL,
+                 batch_size: int = SUBMISSION_FLUSH_BATCH_SIZE):
+        self.journal_dir = journal_dir
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        # Unflushed submissions keyed by (deal_id, user_email)
+        self.pending: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        # Responses keyed by (user_email, idempotency_key), so one user's key cannot replay another's response
+        self.responses: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+        self._segment = 0
+        self._segment_records = 0
+        self._journal = None
+        self._lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._flush_task = None
+        self._writer = None
+        self._slot_dir = None
+        self._slot_lock = None
+
+    def _claim_slot(self):
+        slot = 0
+        while True:
+            slot_dir = os.path.join(self.journal_dir, f"worker-{slot}")
+            os.makedirs(slot_dir, exist_ok=True)
+            lock_file = open(os.path.join(slot_dir, ".lock"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                slot += 1
+                continue
+            self._slot_dir = slot_dir
+            self._slot_lock = lock_file
+            return
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._slot_dir, f"segment-{segment:012d}.jsonl")
+
+    def _segment_numbers(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self._slot_dir):
+            if name.startswith("segment-") and name.endswith(".jsonl"):
+                segments.append(int(name[len("segment-"):-len(".jsonl")]))
+        return sorted(segments)
+
+    async def start(self, writer):
+        """Recover unflushed journal segments and start the background flusher.
+
+        ``writer`` is an async callable taking a list of submission records
+        and returning True once they are durably stored, False when the
+        attempt failed, or raising SubmissionRejected when a record is bad.
+        """
+        self._writer = writer
+        self._claim_slot()
+
+        recovered = 0
+        for segment in self._segment_numbers():
+            with open(self._segment_path(segment), "r", encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn final line from a crash mid-append; the client never got a response
+                        continue
+                    record["segment"] = segment
+                    self._remember(record)
+                    recovered += 1
+            self._segment = max(self._segment, segment)
+
+        self._segment += 1
+        self._journal = open(self._segment_path(self._segment), "a", encoding="utf-8")
+
+        if recovered:
+            print(f"Recovered {recovered} unflushed annotation submissions")
+            await self.flush()
+
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still pending"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+
+        await self.flush()
+
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+            # Drop the active segment if nothing is left in it
+            if not self.pending and os.path.exists(self._segment_path(self._segment)):
+                if os.path.getsize(self._segment_path(self._segment)) == 0:
+                    os.remove(self._segment_path(self._segment))
+
+        if self._slot_lock:
+            self._slot_lock.close()
+            self._slot_lock = None
+
+    def _remember(self, record: Dict[str, Any]):
+        self.pending[(record["deal_id"], record["user_email"])] = record
+        if record.get("idempotency_key"):
+            key = (record["user_email"], record["idempotency_key"])
+            self.responses[key] = record["response"]
+            self.responses.move_to_end(key)
+            while len(self.responses) > IDEMPOTENCY_CACHE_SIZE:
+                self.responses.popitem(last=False)
+
+    def get_response(self, user_email: str, idempotency_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Get the stored response for a submission this user already made"""
+        if not idempotency_key:
+            return None
+        return self.responses.get((user_email, idempotency_key))
+
+    def pending_deals_for_user(self, user_email: str) -> Set[str]:
+        """Get deal_ids submitted by a user that are not yet in the database"""
+        return {deal_id for deal_id, email in self.pending if email == user_email}
+
+    def pending_counts_by_deal(self) -> Dict[str, int]:
+        """Get count of unflushed submissions per deal"""
+        counts = {}
+        for deal_id, _ in self.pending:
+            counts[deal_id] = counts.get(deal_id, 0) + 1
+        return counts
+
+    def discard_users(self, user_emails: List[str]) -> int:
+        """Drop unflushed submissions of removed users; journaled copies are skipped when written"""
+        emails = set(user_emails)
+        discarded = [key for key in self.pending if key[1] in emails]
+        for key in discarded:
+            del self.pending[key]
+        return len(discarded)
+
+    async def enqueue(self, deal_id: str, user_email: str, ratings: Dict[str, Any],
+                      time_spent: int, response: Dict[str, Any],
+                      idempotency_key: Optional[str] = None,
+                      campaign_id: Optional[str] = None,
+                      llm_output_version: Optional[int] = None):
+        """Durably journal a submission; returns once it survives a crash"""
+        record = {
+            "idempotency_key": idempotency_key,
+            "campaign_id": campaign_id,
+            "deal_id": deal_id,
+            "user_email": user_email,
+            "llm_output_version": llm_output_version,
+            "ratings": ratings,
+            "time_spent": time_spent,
+            "submitted_at": datetime.now(timezone.utc).isoformat(),
+            "response": response
+        }
+        line = json.dumps(record) + "\n"
+
+        async with self._lock:
+            record["segment"] = self._segment
+            journal = self._journal
+            await asyncio.to_thread(self._append, journal, line)
+            self._segment_records += 1
+            self._remember(record)
+
+        if len(self.pending) >= self.batch_size:
+            self._wakeup.set()
+
+    @staticmethod
+    def _append(journal, line: str):
+        journal.write(line)
+        journal.flush()
+        os.fsync(journal.fileno())
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Records stay journaled and pending; the next tick retries
+                print(f"Error flushing annotation submissions: {e}")
+
+    async def flush(self) -> bool:
+        """Write all pending submissions to the database in one batch"""
+        async with self._flush_lock:
+            if not self.pending:
+                return True
+
+            # Seal the active segment so new submissions go to a fresh one
+            async with self._lock:
+                if self._journal and self._segment_records:
+                    self._journal.close()
+                    self._segment += 1
+                    self._segment_records = 0
+                    self._journal = open(self._segment_path(self._segment), "a", encoding="utf-8")
+                sealed = self._segment - 1
+                batch = [record for record in self.pending.values() if record["segment"] <= sealed]
+
+            if not batch:
+                return True
+
+            written = await self._write(batch)
+            for record in written:
+                key = (record["deal_id"], record["user_email"])
+                if self.pending.get(key) is record:
+                    del self.pending[key]
+            if len(written) < len(batch):
+                return False
+
+            for segment in self._segment_numbers():
+                if segment <= sealed:
+                    os.remove(self._segment_path(segment))
+
+            return True
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Write a batch, falling back to one record at a time when it is rejected; returns the records handled"""
+        try:
+            return batch if await self._writer(batch) else []
+        except SubmissionRejected as e:
+            if len(batch) > 1:
+                print(f"Annotation batch rejected, writing {len(batch)} submissions one at a time: {e}")
+
+        handled = []
+        for record in batch:
+            try:
+                if not await self._writer([record]):
+                    # The database is failing rather than the record; retry the rest on the next flush
+                    break
+            except SubmissionRejected as e:
+                await asyncio.to_thread(self._dead_letter, record, str(e))
+            handled.append(record)
+        return handled
+
+    def _dead_letter(self, record: Dict[str, Any], error: str):
+        print(f"Dead-lettering submission of deal {record['deal_id']} by {record['user_email']}: {error}")
+        entry = {key: value for key, value in record.items() if key != "segment"}
+        entry["error"] = error
+        entry["rejected_at"] = datetime.now(timezone.utc).isoformat()
+        with open(os.path.join(self._slot_dir, DEAD_LETTER_FILE), "a", encoding="utf-8") as journal:
+            self._append(journal, json.dumps(entry) + "\n")
+
+# Global submission queue instance
+submission_queue = SubmissionQueue()
@@ -0,0 +1,29 @@
+import os
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+
+TEMPLATES_DIR = "templates"
+
+# Compiled template bytecode, shared by workers and kept across restarts
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "data/template_cache")
+
+# Check template files for changes on every render; only useful while editing templates
+TEMPLATE_AUTO_RELOAD = os.getenv("TEMPLATE_AUTO_RELOAD", "false").lower() == "true"
+
+def create_templates(directory: str = TEMPLATES_DIR, cache_dir: str = TEMPLATE_CACHE_DIR) -> Jinja2Templates:
+    """Templates backed by a persistent bytecode cache"""
+    os.makedirs(cache_dir, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir),
+        auto_reload=TEMPLATE_AUTO_RELOAD
+    )
+    return Jinja2Templates(env=env)
+
+def precompile_templates(templates: Jinja2Templates) -> int:
+    """Load every template so requests never compile one; cached bytecode is reused when the source is unchanged"""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
@@ -0,0 +1,68 @@
+"""Time annotator analytics on a synthetic campaign.
+
+Run with ``python -m benchmarks.annotator_analytics [--annotations N]``.
+Builds an AnnotationMatrix from N generated rows, computes the report, then
+applies a batch of resubmissions and new annotations the way a refresh does.
+"""
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from app.models import RATING_FIELDS
+from app.analytics import AnnotationMatrix, annotator_report
+
+def make_rows(start_id: int, count: int, users: int, deals: int, rng: np.random.Generator,
+              updated_at: datetime) -> List[Dict]:
+    """Generate annotation rows shaped like AnnotatorAnalytics reads them"""
+    user_ids = rng.integers(0, users, count)
+    deal_ids = rng.integers(0, deals, count)
+    time_spent = rng.lognormal(5, 0.6, count).astype(int)
+    truth = rng.integers(1, 6, (deals, len(RATING_FIELDS)))
+    scores = np.clip(truth[deal_ids] + rng.integers(-1, 2, (count, len(RATING_FIELDS))), 1, 5).tolist()
+    confidences = rng.integers(1, 6, (count, len(RATING_FIELDS))).tolist()
+    return [
+        {"id": start_id + i, "user_email": f"user{user_ids[i]}@example.com", "deal_id": f"deal_{deal_ids[i]}",
+         "time_spent_seconds": int(time_spent[i]), "updated_at": updated_at,
+         "scores": scores[i], "confidences": confidences[i]}
+        for i in range(count)
+    ]
+
+def timed(label: str, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<28} {time.perf_counter() - start:8.3f}s")
+    return result
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Time annotator analytics on synthetic annotations")
+    parser.add_argument("--annotations", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--deals", type=int, default=100_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+    now = datetime.now()
+    rows = timed("generate rows", make_rows, 1, args.annotations, args.users, args.deals, rng, now)
+    print(f"{args.annotations} annotations x {len(RATING_FIELDS)} fields, {args.users} annotators, {args.deals} deals")
+
+    matrix = AnnotationMatrix()
+    timed("initial load", matrix.upsert, rows)
+    report = timed("full report", annotator_report, matrix)
+
+    # Half resubmissions of existing ids, half new annotations
+    batch = make_rows(args.annotations - args.batch // 2 + 1, args.batch, args.users, args.deals, rng,
+                      now + timedelta(seconds=1))
+    timed(f"incremental load ({args.batch})", matrix.upsert, batch)
+    report = timed("report after batch", annotator_report, matrix)
+
+    print(f"rows: {matrix.size}, flagged annotators: {len(report['flagged'])}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,242 @@
+"""Generate a synthetic dataset at production scale.
+
+Run with ``python -m benchmarks.generate_dataset --deals 5000 --users 50 [--out DIR] [--load]``.
+Deals get a realistic mix of email, call, meeting, note and task activities
+(email threads quote earlier messages), each with a matching LLM output.
+Users are named ``synthetic-<n>@example.com`` so the load harness can log in
+as them, and a share of deals is partially annotated.
+"""
+import os
+import sys
+import json
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.models import RATING_FIELDS, DEFAULT_CAMPAIGN_ID
+
+# Relative frequency of each activity type
+ACTIVITY_MIX = {"email": 0.45, "note": 0.18, "call": 0.15, "meeting": 0.12, "task": 0.10}
+
+DEAL_STAGES = ["Appointment scheduled", "Qualified to buy", "Presentation scheduled",
+               "Decision maker bought-in", "Contract sent", "Closed won", "Closed lost"]
+DEAL_TYPES = ["newbusiness", "existingbusiness", "renewal"]
+SENTIMENTS = ["positive", "neutral", "negative"]
+
+PHRASES = [
+    "Thanks for the time on the call today.", "Following up on the proposal we sent last week.",
+    "The client asked for a revised quote with volume pricing.", "Legal is reviewing the contract terms.",
+    "They mentioned a competitor is offering a lower price.", "Budget approval is expected next quarter.",
+    "The champion is leaving the company at the end of the month.", "Demo went well, the team was engaged.",
+    "We agreed on next steps and a timeline for the pilot.", "No response to the last two emails.",
+    "Procurement needs a security questionnaire completed.", "They want to expand to two more regions.",
+    "Pricing objections came up again during the meeting.", "The decision maker joined the call for the first time.",
+    "Implementation concerns were raised by the IT team.", "They asked for customer references in their industry."
+]
+
+INDICATORS = [
+    "Proactive follow-up", "Clear next steps", "Delayed responses", "Competitor mentioned",
+    "Budget confirmed", "Multiple stakeholders engaged", "Pricing pushback", "Executive sponsor involved",
+    "Missed meeting", "Expansion interest", "Legal review in progress", "Champion at risk"
+]
+
+def synthetic_user_email(index: int) -> str:
+    """Email of the nth synthetic annotator"""
+    return f"synthetic-{index}@example.com"
+
+def paragraph(rng: random.Random) -> str:
+    return " ".join(rng.sample(PHRASES, rng.randint(2, 5)))
+
+def timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+def make_activity(rng: random.Random, activity_type: str, moment: datetime, thread: List[str]) -> Dict[str, Any]:
+    """One activity with the fields of its type from the Activity model"""
+    activity: Dict[str, Any] = {"activity_type": activity_type, "id": str(rng.randint(10 ** 10, 10 ** 11))}
+    if activity_type == "email":
+        # Replies quote the earlier messages of the thread
+        body = paragraph(rng)
+        thread.insert(0, body)
+        activity.update({
+            "sent_at": timestamp(moment), "from": "rep@company.com", "to": ["buyer@client.com"],
+            "subject": rng.choice(["Follow up", "Proposal", "Next steps", "Pricing", "Contract"]),
+            "body": "\n\n".join(thread[:6]), "state": "email",
+            "direction": rng.choice(["outgoing", "incoming"])
+        })
+    elif activity_type == "call":
+        activity.update({
+            "createdate": timestamp(moment), "call_title": "Client call", "call_body": paragraph(rng),
+            "call_direction": rng.choice(["OUTBOUND", "INBOUND"]), "call_duration": rng.randint(5, 60),
+            "call_status": rng.choice(["COMPLETED", "NO_ANSWER"])
+        })
+    elif activity_type == "meeting":
+        activity.update({
+            "meeting_start_time": timestamp(moment), "meeting_end_time": timestamp(moment + timedelta(hours=1)),
+            "meeting_title": "Discovery meeting", "meeting_location": "Zoom", "meeting_location_type": "virtual",
+            "meeting_outcome": rng.choice(["COMPLETED", "RESCHEDULED", "NO_SHOW"]),
+            "internal_meeting_notes": paragraph(rng)
+        })
+    elif activity_type == "note":
+        activity.update({"createdate": timestamp(moment), "note_body": paragraph(rng)})
+    else:
+        activity.update({
+            "createdate": timestamp(moment), "task_subject": "Send follow-up", "task_body": paragraph(rng),
+            "task_status": rng.choice(["COMPLETED", "NOT_STARTED"]), "task_priority": rng.choice(["HIGH", "LOW"]),
+            "task_type": rng.choice(["EMAIL", "CALL", "TODO"])
+        })
+    return activity
+
+def make_deal(rng: random.Random, index: int, campaign_id: str = DEFAULT_CAMPAIGN_ID,
+              activity_count: Optional[int] = None) -> Dict[str, Any]:
+    """A deal whose activity count follows a long tail, with a few huge deals"""
+    created = datetime(2023, 1, 1, tzinfo=timezone.utc) + timedelta(days=rng.randint(0, 365))
+    if activity_count is None:
+        activity_count = rng.randint(200, 600) if rng.random() < 0.02 else int(rng.lognormvariate(2.5, 0.7)) + 1
+    types = rng.choices(list(ACTIVITY_MIX), weights=list(ACTIVITY_MIX.values()), k=activity_count)
+
+    thread: List[str] = []
+    moment = created
+    activities = []
+    for activity_type in types:
+        moment += timedelta(hours=rng.randint(1, 72))
+        activities.append(make_activity(rng, activity_type, moment, thread))
+    rng.shuffle(activities)
+
+    stage = rng.choice(DEAL_STAGES)
+    return {
+        "deal_id": f"synthetic-{index:07d}",
+        "campaign_id": campaign_id,
+        "activities": activities,
+        "amount": str(rng.randint(1, 500) * 1000),
+        "createdate": timestamp(created),
+        "closedate": timestamp(moment) if stage.startswith("Closed") else None,
+        "dealstage": stage,
+        "deal_stage_probability": "100.0" if stage == "Closed won" else f"{rng.randint(1, 9) * 10}.0",
+        "dealtype": rng.choice(DEAL_TYPES)
+    }
+
+def make_llm_output(rng: random.Random, deal: Dict[str, Any]) -> Dict[str, Any]:
+    """An LLM output matching the deal's activity types"""
+    sentiment = rng.choice(SENTIMENTS)
+    base = {"positive": 0.6, "neutral": 0.0, "negative": -0.6}[sentiment]
+    counts: Dict[str, int] = {}
+    for activity in deal["activities"]:
+        counts[activity["activity_type"]] = counts.get(activity["activity_type"], 0) + 1
+    return {
+        "overall_sentiment": sentiment,
+        "sentiment_score": round(max(-1.0, min(1.0, rng.gauss(base, 0.2))), 2),
+        "confidence": round(rng.uniform(0.4, 0.99), 2),
+        "activity_breakdown": {
+            activity_type: {
+                "sentiment": rng.choice(SENTIMENTS),
+                "sentiment_score": round(rng.uniform(-1, 1), 2),
+                "key_indicators": rng.sample(INDICATORS, 2),
+                "count": count
+            }
+            for activity_type, count in counts.items()
+        },
+        "deal_momentum_indicators": {
+            "stage_progression": rng.choice(["advancing", "stalled", "regressing"]),
+            "client_engagement_trend": rng.choice(["increasing", "stable", "decreasing"]),
+            "competitive_position": rng.choice(["strengthening", "stable", "weakening"])
+        },
+        "reasoning": paragraph(rng),
+        "professional_gaps": rng.sample(INDICATORS, rng.randint(0, 2)),
+        "excellence_indicators": rng.sample(INDICATORS, rng.randint(0, 3)),
+        "risk_indicators": rng.sample(INDICATORS, rng.randint(0, 3)),
+        "opportunity_indicators": rng.sample(INDICATORS, rng.randint(0, 3)),
+        "temporal_trend": rng.choice(["improving", "stable", "declining"]),
+        "recommended_actions": rng.sample(INDICATORS, rng.randint(1, 3)),
+        "context_analysis_notes": [paragraph(rng)]
+    }
+
+def make_ratings(rng: random.Random) -> Dict[str, Dict[str, Any]]:
+    """Ratings for every field, in the shape submit-rating stores"""
+    return {
+        field: {"score": rng.randint(1, 5), "confidence": rng.randint(1, 5), "notes": ""}
+        for field in RATING_FIELDS
+    }
+
+def generate_dataset(deals: int, users: int, annotated_share: float = 0.3, max_annotations: int = 5,
+                     seed: int = 42, campaign_id: str = DEFAULT_CAMPAIGN_ID) -> Dict[str, Any]:
+    """Users, deals, LLM outputs and partial annotations"""
+    rng = random.Random(seed)
+    user_list = [
+        {"email": synthetic_user_email(i), "name": f"Synthetic Annotator {i}", "is_admin": False,
+         "created_at": timestamp(datetime.now(timezone.utc))}
+        for i in range(users)
+    ]
+    deal_list = [make_deal(rng, i, campaign_id) for i in range(deals)]
+    llm_outputs = {deal["deal_id"]: make_llm_output(rng, deal) for deal in deal_list}
+
+    annotations = []
+    for deal in deal_list:
+        if users and rng.random() < annotated_share:
+            for user in rng.sample(user_list, min(users, rng.randint(1, max_annotations))):
+                annotations.append({
+                    "deal_id": deal["deal_id"], "user_email": user["email"],
+                    "ratings": make_ratings(rng), "time_spent": int(rng.lognormvariate(5, 0.6))
+                })
+
+    return {"users": user_list, "deals": deal_list, "llm_outputs": llm_outputs, "annotations": annotations}
+
+def write_dataset(dataset: Dict[str, Any], out_dir: str):
+    """Write the dataset in the data file formats from the README"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = {
+        "users.json": {"users": dataset["users"]},
+        "deals.json": dataset["deals"],
+        "llm_outputs.json": dataset["llm_outputs"],
+        "annotations.json": dataset["annotations"]
+    }
+    for name, content in files.items():
+        with open(os.path.join(out_dir, name), "w") as f:
+            json.dump(content, f)
+
+async def load_dataset(dataset: Dict[str, Any], campaign_id: str = DEFAULT_CAMPAIGN_ID, batch_size: int = 500):
+    """Insert the dataset into the database configured in the environment"""
+    from app.database import db_manager
+
+    await db_manager.initialize()
+    try:
+        for user in dataset["users"]:
+            await db_manager.create_user(user["email"], user["name"], user["is_admin"], campaign_id)
+        for deal in dataset["deals"]:
+            await db_manager.create_deal(deal)
+            await db_manager.create_llm_output(deal["deal_id"], dataset["llm_outputs"][deal["deal_id"]])
+        annotations = dataset["annotations"]
+        for start in range(0, len(annotations), batch_size):
+            await db_manager.create_annotations_batch(annotations[start:start + batch_size])
+    finally:
+        await db_manager.close()
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic deal validation dataset")
+    parser.add_argument("--deals", type=int, default=1000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--annotated-share", type=float, default=0.3)
+    parser.add_argument("--max-annotations", type=int, default=5)
+    parser.add_argument("--campaign-id", default=DEFAULT_CAMPAIGN_ID)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="directory to write users/deals/llm_outputs/annotations JSON files to")
+    parser.add_argument("--load", action="store_true", help="insert into the database from the environment")
+    args = parser.parse_args(argv)
+
+    dataset = generate_dataset(args.deals, args.users, args.annotated_share, args.max_annotations,
+                               args.seed, args.campaign_id)
+    activities = sum(len(deal["activities"]) for deal in dataset["deals"])
+    print(f"Generated {len(dataset['users'])} users, {len(dataset['deals'])} deals with {activities} activities, "
+          f"{len(dataset['annotations'])} annotations")
+
+    if args.out:
+        write_dataset(dataset, args.out)
+        print(f"Wrote dataset to {args.out}")
+    if args.load:
+        asyncio.run(load_dataset(dataset, args.campaign_id))
+        print("Loaded dataset into the database")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,217 @@
+"""End-to-end load test against a running app.
+
+Run with ``python -m benchmarks.load_test --base-url http://localhost:8000 --annotators 20 --admins 2``.
+Annotator sessions log in as the synthetic users from generate_dataset and
+loop through /start-annotation, the activities page, the rating page and a
+submit; admin sessions poll the dashboard APIs. Each scenario reports
+throughput, per-endpoint latency percentiles and, when the app runs with
+DB_QUERY_STATS=true, database queries per request (counters are per worker
+process, so run the app with a single worker for exact numbers).
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+from app.models import RATING_FIELDS
+from benchmarks.generate_dataset import synthetic_user_email
+
+SCENARIOS = {
+    "annotate": {"annotators": True, "admins": False},
+    "admin": {"annotators": False, "admins": True},
+    "mixed": {"annotators": True, "admins": True}
+}
+
+class Recorder:
+    """Thread-safe latency samples per endpoint"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def request(self, session: requests.Session, label: str, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        start = time.perf_counter()
+        try:
+            response = session.request(method, url, timeout=60, **kwargs)
+        except requests.RequestException:
+            response = None
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.samples.setdefault(label, []).append(elapsed)
+            if response is None or response.status_code >= 400:
+                self.errors[label] = self.errors.get(label, 0) + 1
+        return response
+
+    def total(self) -> int:
+        return sum(len(samples) for samples in self.samples.values())
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+def annotator_session(base_url: str, index: int, deals: int, think_time: float, recorder: Recorder) -> int:
+    """Log in and rate up to `deals` deals, returns how many were submitted"""
+    rng = random.Random(index)
+    session = requests.Session()
+    recorder.request(session, "login", "POST", f"{base_url}/login",
+                     data={"email": synthetic_user_email(index)}, allow_redirects=False)
+
+    submitted = 0
+    for _ in range(deals):
+        response = recorder.request(session, "start-annotation", "GET", f"{base_url}/start-annotation",
+                                    allow_redirects=False)
+        location = response.headers.get("location", "") if response is not None else ""
+        match = re.search(r"/activities/([^/?]+)", location)
+        if not match:
+            break
+        deal_id = match.group(1)
+
+        recorder.request(session, "activities", "GET", f"{base_url}/activities/{deal_id}")
+        rating_page = recorder.request(session, "rating", "GET", f"{base_url}/rating/{deal_id}")
+        version = re.search(r'name="llm_output_version" value="(\d+)"', rating_page.text) if rating_page is not None else None
+        time.sleep(think_time)
+
+        form = {"deal_id": deal_id, "time_spent": str(rng.randint(30, 600)), "idempotency_key": str(uuid.uuid4())}
+        if version:
+            form["llm_output_version"] = version.group(1)
+        for field in RATING_FIELDS:
+            form[f"{field}_score"] = str(rng.randint(1, 5))
+            form[f"{field}_confidence"] = str(rng.randint(1, 5))
+        response = recorder.request(session, "submit-rating", "POST", f"{base_url}/submit-rating", data=form)
+        if response is not None and response.ok:
+            submitted += 1
+    return submitted
+
+def admin_login(base_url: str, password: str) -> requests.Session:
+    session = requests.Session()
+    session.post(f"{base_url}/admin", data={"admin_password": password}, timeout=60)
+    return session
+
+def admin_session(base_url: str, password: str, interval: float, stop: threading.Event, recorder: Recorder):
+    """Poll the admin dashboard APIs until stopped"""
+    session = admin_login(base_url, password)
+    while not stop.is_set():
+        recorder.request(session, "admin-stats", "GET", f"{base_url}/api/admin/stats")
+        recorder.request(session, "deal-distribution", "GET", f"{base_url}/api/admin/deal-distribution")
+        stop.wait(interval)
+
+def db_stats(session: requests.Session, base_url: str) -> Optional[Dict[str, Any]]:
+    response = session.get(f"{base_url}/api/admin/db-stats", timeout=60)
+    return response.json() if response.ok else None
+
+def run_scenario(name: str, args) -> Dict[str, Any]:
+    """Run one scenario and summarize it"""
+    scenario = SCENARIOS[name]
+    recorder = Recorder()
+    stop = threading.Event()
+    stats_session = admin_login(args.base_url, args.admin_password)
+    before = db_stats(stats_session, args.base_url)
+
+    annotators = args.annotators if scenario["annotators"] else 0
+    admins = args.admins if scenario["admins"] else 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, annotators + admins)) as pool:
+        admin_futures = [pool.submit(admin_session, args.base_url, args.admin_password, args.poll_interval,
+                                     stop, recorder) for _ in range(admins)]
+        annotator_futures = [pool.submit(annotator_session, args.base_url, args.user_offset + i,
+                                         args.deals_per_session, args.think_time, recorder)
+                             for i in range(annotators)]
+        submitted = sum(future.result() for future in annotator_futures)
+        if not annotators:
+            stop.wait(args.duration)
+        stop.set()
+        for future in admin_futures:
+            future.result()
+    wall_time = time.perf_counter() - start
+
+    after = db_stats(stats_session, args.base_url)
+    requests_made = recorder.total()
+    result = {
+        "scenario": name,
+        "annotators": annotators,
+        "admins": admins,
+        "wall_seconds": round(wall_time, 3),
+        "requests": requests_made,
+        "throughput_rps": round(requests_made / wall_time, 2) if wall_time else None,
+        "submissions": submitted,
+        "endpoints": {
+            label: {
+                "count": len(samples),
+                "errors": recorder.errors.get(label, 0),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2)
+            }
+            for label, samples in sorted(recorder.samples.items())
+        },
+        "db_queries": None
+    }
+    if before and after:
+        queries = after["queries"] - before["queries"]
+        result["db_queries"] = {
+            "total": queries,
+            "per_request": round(queries / requests_made, 2) if requests_made else None,
+            "query_seconds": round(after["query_seconds"] - before["query_seconds"], 3)
+        }
+    return result
+
+def print_result(result: Dict[str, Any]):
+    print(f"\n== {result['scenario']}: {result['annotators']} annotators, {result['admins']} admins ==")
+    print(f"{result['requests']} requests in {result['wall_seconds']}s = {result['throughput_rps']} req/s, "
+          f"{result['submissions']} submissions")
+    print(f"{'endpoint':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, stats in result["endpoints"].items():
+        print(f"{label:<20}{stats['count']:>8}{stats['errors']:>8}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+    if result["db_queries"]:
+        db = result["db_queries"]
+        print(f"DB queries: {db['total']} ({db['per_request']} per request, {db['query_seconds']}s in queries)")
+    else:
+        print("DB queries: n/a (start the app with DB_QUERY_STATS=true)")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Drive concurrent annotator and admin sessions against the app")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="all")
+    parser.add_argument("--annotators", type=int, default=20)
+    parser.add_argument("--user-offset", type=int, default=0, help="first synthetic user index to log in as")
+    parser.add_argument("--deals-per-session", type=int, default=5)
+    parser.add_argument("--think-time", type=float, default=0.0, help="seconds between rating page and submit")
+    parser.add_argument("--admins", type=int, default=2)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run the admin-only scenario")
+    parser.add_argument("--admin-password", default=os.getenv("ADMIN_PASSWORD"))
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    if not args.admin_password:
+        print("Admin password required (--admin-password or ADMIN_PASSWORD)")
+        return 2
+
+    results = []
+    for name in (SCENARIOS if args.scenario == "all" else [args.scenario]):
+        result = run_scenario(name, args)
+        print_result(result)
+        results.append(result)
+        # Each scenario continues with fresh users so they still have deals to rate
+        args.user_offset += args.annotators
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,413 @@
+"""Micro-benchmarks for the request hot paths, with JSON baselines.
+
+Run with ``python -m benchmarks.micro run [--filter PREFIX] [--save FILE]`` and
+compare two runs with ``python -m benchmarks.micro compare BASELINE [--current FILE]``.
+Database calls are replaced by in-memory data built with generate_dataset, so
+the numbers measure only Python work: sorting, JSON parsing, deal assignment,
+export serialization, sessions and template rendering. compare exits non-zero when
+a benchmark got slower than the baseline by more than the threshold.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import inspect
+import argparse
+import platform
+import statistics
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# app.main reads its configuration on import; nothing here connects to the database
+for name, value in {"DB_HOST": "localhost", "DB_NAME": "benchmark", "DB_USER": "benchmark",
+                    "DB_PASSWORD": "benchmark", "ADMIN_PASSWORD": "benchmark",
+                    "SECRET_KEY": "benchmark-secret"}.items():
+    os.environ.setdefault(name, value)
+
+from jose import jwt as jose_jwt
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app import auth
+from app import main as app_main
+from app.database import db_manager
+from app.fast_json import FastJSONResponse, RawJSON, raw_json_field
+from app.activity_store import sort_activities_chronologically
+from app.activity_views import activity_view
+from benchmarks.generate_dataset import make_deal, make_llm_output, make_ratings, synthetic_user_email
+
+# Activities per deal for the size-dependent benchmarks
+DEAL_SIZES = {"small": 10, "medium": 100, "huge": 2000}
+
+DEFAULT_THRESHOLD = 0.2
+REPEATS = 5
+TARGET_SECONDS = 0.2
+
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+def benchmark(name: str):
+    """Register a setup function that returns the callable to time, sync or async"""
+    def register(setup: Callable[[], Callable]):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+def request_scope() -> Request:
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [], "query_string": b""})
+
+def sized_deal(size: str, seed: int = 1) -> Dict[str, Any]:
+    return make_deal(random.Random(seed), seed, activity_count=DEAL_SIZES[size])
+
+def patch_db(**methods):
+    """Serve db_manager methods from memory, calling results that are functions for fresh rows"""
+    for method_name, result in methods.items():
+        async def fake(*args, _result=result, **kwargs):
+            return _result() if callable(_result) else _result
+        setattr(db_manager, method_name, fake)
+
+def reset_caches():
+    for cache in (app_main.user_campaigns, app_main.campaign_cache, app_main.gold_deal_cache):
+        cache.clear()
+
+# Activity sorting and JSON parsing
+
+for size in DEAL_SIZES:
+    @benchmark(f"sort_activities/{size}")
+    def setup_sort(size=size):
+        activities = sized_deal(size)["activities"]
+        return lambda: sort_activities_chronologically(activities)
+
+@benchmark("parse_json_field/str")
+def setup_parse_str():
+    output = make_llm_output(random.Random(1), sized_deal("medium"))
+    row = {"activity_breakdown": json.dumps(output["activity_breakdown"])}
+    return lambda: app_main.parse_json_field(row, "activity_breakdown", {})
+
+@benchmark("parse_json_field/dict")
+def setup_parse_dict():
+    output = make_llm_output(random.Random(1), sized_deal("medium"))
+    row = {"activity_breakdown": output["activity_breakdown"]}
+    return lambda: app_main.parse_json_field(row, "activity_breakdown", {})
+
+# Deal assignment
+
+@benchmark("get_next_deal_for_user")
+def setup_next_deal():
+    rng = random.Random(1)
+    deal_count = 5000
+    email = synthetic_user_email(0)
+    counts = {f"synthetic-{i:07d}": rng.randint(0, 2) for i in range(deal_count)}
+    completed = [deal_id for deal_id in counts if rng.random() < 0.2]
+    patch_db(get_user_by_email={"email": email, "campaign_id": app_main.DEFAULT_CAMPAIGN_ID},
+             get_user_annotations=completed, get_campaign=None, get_gold_deal_ids=[],
+             get_annotation_counts_by_deal=counts, get_user_cache_invalidations=([], datetime.now()))
+    reset_caches()
+    return lambda: app_main.get_next_deal_for_user(email)
+
+# Export serialization, one benchmark per download_data branch
+
+# Deals in the export benchmarks, large runs the exports at production scale
+EXPORT_SIZES = {"default": 200, "large": 5000}
+
+@lru_cache(maxsize=None)
+def export_data(deal_count: int) -> Dict[str, Any]:
+    rng = random.Random(1)
+    created = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    deals = [make_deal(rng, i) for i in range(deal_count)]
+    users = [{"email": synthetic_user_email(i), "name": f"Synthetic Annotator {i}", "is_admin": False,
+              "campaign_id": app_main.DEFAULT_CAMPAIGN_ID, "created_at": created + timedelta(minutes=i)}
+             for i in range(50)]
+
+    deal_rows, activities_by_deal, llm_rows, annotations = {}, {}, {}, {}
+    for deal in deals:
+        deal_id = deal["deal_id"]
+        deal_rows[deal_id] = {key: value for key, value in deal.items() if key != "activities"}
+        deal_rows[deal_id]["activity_count"] = len(deal["activities"])
+        activities_by_deal[deal_id] = sort_activities_chronologically(deal["activities"])
+        # JSONB columns come back from asyncpg as text
+        llm_rows[deal_id] = {key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                             for key, value in make_llm_output(rng, deal).items()}
+        annotations[deal_id] = {
+            user["email"]: {"user_email": user["email"], "campaign_id": app_main.DEFAULT_CAMPAIGN_ID,
+                            "timestamp": created.isoformat(), "ratings": RawJSON(json.dumps(make_ratings(rng))),
+                            "llm_output_version": 1, "time_spent_seconds": rng.randint(30, 600)}
+            for user in rng.sample(users, 3)
+        }
+    return {"users": users, "deals": deal_rows, "activities": activities_by_deal,
+            "llm_outputs": llm_rows, "annotations": annotations}
+
+def export_benchmark(data_type: str, size: str):
+    name = f"download_data/{data_type}" + ("" if size == "default" else f"/{size}")
+
+    @benchmark(name)
+    def setup_download():
+        data = export_data(EXPORT_SIZES[size])
+        patch_db(get_export_version="1", get_users=lambda: [dict(user) for user in data["users"]],
+                 get_annotations=data["annotations"], get_deals=data["deals"],
+                 get_activities_by_deal=data["activities"], get_llm_outputs=data["llm_outputs"],
+                 get_session_revocations=[])
+        request = request_scope()
+        admin_token = auth.create_admin_token()
+        return lambda: app_main.download_data(request, data_type, admin_token=admin_token)
+
+for data_type in ("users", "annotations", "deals", "llm_outputs"):
+    export_benchmark(data_type, "default")
+for data_type in ("annotations", "llm_outputs"):
+    export_benchmark(data_type, "large")
+
+# The large LLM output export encoded both ways: parsing the JSON columns for the stdlib
+# encoder as before, and splicing the column text with FastJSONResponse
+
+LLM_OUTPUT_JSON_COLUMNS = ("activity_breakdown", "deal_momentum_indicators", "professional_gaps",
+                           "excellence_indicators", "risk_indicators", "opportunity_indicators",
+                           "recommended_actions", "context_analysis_notes")
+
+@benchmark("json/llm_outputs/large/stdlib")
+def setup_json_stdlib():
+    rows = export_data(EXPORT_SIZES["large"])["llm_outputs"]
+
+    def encode():
+        outputs = {deal_id: {key: app_main.parse_json_field(row, key) if key in LLM_OUTPUT_JSON_COLUMNS else value
+                             for key, value in row.items()}
+                   for deal_id, row in rows.items()}
+        return JSONResponse(outputs).body
+    return encode
+
+@benchmark("json/llm_outputs/large/fast")
+def setup_json_fast():
+    rows = export_data(EXPORT_SIZES["large"])["llm_outputs"]
+
+    def encode():
+        outputs = {deal_id: {key: raw_json_field(row, key) if key in LLM_OUTPUT_JSON_COLUMNS else value
+                             for key, value in row.items()}
+                   for deal_id, row in rows.items()}
+        return FastJSONResponse(outputs).body
+    return encode
+
+# Sessions
+
+@benchmark("jwt/create_access_token")
+def setup_create_token():
+    return lambda: auth.create_access_token({"sub": synthetic_user_email(0)})
+
+@benchmark("jwt/verify_token")
+def setup_verify_token():
+    token = auth.create_access_token({"sub": synthetic_user_email(0)})
+
+    def verify():
+        auth.verified_tokens.clear()
+        return auth.verify_token(token)
+    return verify
+
+@benchmark("jwt/verify_token/cached")
+def setup_verify_token_cached():
+    token = auth.create_access_token({"sub": synthetic_user_email(0)})
+    return lambda: auth.verify_token(token)
+
+# Per-request authentication before signed sessions: a JWT decode and a user lookup.
+# The fake lookup costs nothing here, so in production each request also saved a database round trip.
+@benchmark("auth/get_current_user/legacy")
+def setup_legacy_current_user():
+    email = synthetic_user_email(0)
+    token = auth.create_access_token({"sub": email})
+    patch_db(get_user_by_email={"email": email, "campaign_id": app_main.DEFAULT_CAMPAIGN_ID})
+
+    async def authenticate():
+        payload = jose_jwt.decode(token, auth.KEYS_BY_ID[auth.SIGNING_KEYS[0][0]], algorithms=[auth.ALGORITHM])
+        if not await db_manager.get_user_by_email(payload["sub"]):
+            raise RuntimeError("user not found")
+        return payload["sub"]
+    return authenticate
+
+@benchmark("auth/get_current_user")
+def setup_current_user():
+    email = synthetic_user_email(0)
+    token = auth.create_access_token({"sub": email})
+    patch_db(get_user_by_email={"email": email, "campaign_id": app_main.DEFAULT_CAMPAIGN_ID},
+             get_session_revocations=[])
+    request = request_scope()
+    return lambda: auth.get_current_user(request, token)
+
+@benchmark("auth/verify_admin_session")
+def setup_admin_session():
+    patch_db(get_session_revocations=[])
+    admin_token = auth.create_admin_token()
+    return lambda: auth.verify_admin_session(admin_token)
+
+# Template rendering
+
+def progress_context() -> Dict[str, Any]:
+    return {"completed_count": 12, "total_deals": 500, "completed_deals": []}
+
+def deal_metadata(deal: Dict[str, Any]) -> Dict[str, Any]:
+    """The deal as get_deal_by_id returns it"""
+    metadata = {key: value for key, value in deal.items() if key != "activities"}
+    metadata.update({"activity_count": len(deal["activities"]), "row_version": "1"})
+    return metadata
+
+def activity_views(deal: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """The activities as get_deal_view caches them"""
+    return [activity_view(activity) for activity in sort_activities_chronologically(deal["activities"])]
+
+for size in DEAL_SIZES:
+    @benchmark(f"render/activities/{size}")
+    def setup_render_activities(size=size):
+        deal = sized_deal(size)
+        template = app_main.templates.get_template("activities.html")
+        context = {"request": request_scope(), "deal": deal_metadata(deal),
+                   "activities": activity_views(deal),
+                   "deal_id": deal["deal_id"], "user_email": synthetic_user_email(0),
+                   "progress": progress_context()}
+        return lambda: template.render(context)
+
+    @benchmark(f"render/rating/{size}")
+    def setup_render_rating(size=size):
+        deal = sized_deal(size)
+        llm_output = make_llm_output(random.Random(1), deal)
+        llm_output.update({"version": 1, "latest_version": 1})
+        template = app_main.templates.get_template("rating.html")
+        context = {"request": request_scope(), "deal": deal_metadata(deal), "llm_output": llm_output,
+                   "deal_id": deal["deal_id"], "user_email": synthetic_user_email(0),
+                   "progress": progress_context()}
+        return lambda: template.render(context)
+
+# Measurement
+
+def measure(func: Callable, repeats: int = REPEATS, target: float = TARGET_SECONDS) -> Dict[str, Any]:
+    """Time func, growing the iteration count until one repeat takes about `target` seconds"""
+    loop = asyncio.new_event_loop()
+    is_async = inspect.iscoroutine(probe := func())
+    if is_async:
+        loop.run_until_complete(probe)
+
+        async def run_batch(iterations: int):
+            for _ in range(iterations):
+                await func()
+
+        def batch(iterations: int):
+            loop.run_until_complete(run_batch(iterations))
+    else:
+        def batch(iterations: int):
+            for _ in range(iterations):
+                func()
+
+    try:
+        iterations = 1
+        while True:
+            start = time.perf_counter()
+            batch(iterations)
+            elapsed = time.perf_counter() - start
+            if elapsed >= target / 10 or iterations >= 1_000_000:
+                break
+            iterations *= 10
+        iterations = max(1, int(iterations * target / max(elapsed, 1e-9)))
+
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            batch(iterations)
+            timings.append((time.perf_counter() - start) / iterations)
+    finally:
+        loop.close()
+
+    return {
+        "iterations": iterations,
+        "repeats": repeats,
+        "min_us": round(min(timings) * 1e6, 3),
+        "median_us": round(statistics.median(timings) * 1e6, 3)
+    }
+
+def run(name_filter: Optional[str] = None, repeats: int = REPEATS, target: float = TARGET_SECONDS) -> Dict[str, Any]:
+    """Run the registered benchmarks whose name starts with name_filter"""
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter and not name.startswith(name_filter):
+            continue
+        results[name] = measure(setup(), repeats, target)
+        print(f"{name:<36}{results[name]['median_us']:>14.2f} us  (min {results[name]['min_us']:.2f})")
+    return {
+        "metadata": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        },
+        "results": results
+    }
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Print the change of each benchmark against the baseline, returns the regressed names"""
+    regressions = []
+    base_results, current_results = baseline["results"], current["results"]
+    print(f"{'benchmark':<36}{'baseline us':>14}{'current us':>14}{'change':>10}")
+    for name in sorted(set(base_results) | set(current_results)):
+        if name not in current_results:
+            print(f"{name:<36}{base_results[name]['median_us']:>14.2f}{'missing':>14}")
+            continue
+        if name not in base_results:
+            print(f"{name:<36}{'new':>14}{current_results[name]['median_us']:>14.2f}")
+            continue
+        # Medians for the comparison, min is too sensitive to a single lucky repeat
+        before, after = base_results[name]["median_us"], current_results[name]["median_us"]
+        change = (after - before) / before if before else 0.0
+        marker = ""
+        if change > threshold:
+            marker = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            marker = "  faster"
+        print(f"{name:<36}{before:>14.2f}{after:>14.2f}{change:>+10.1%}{marker}")
+    return regressions
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+def save(results: Dict[str, Any], path: str):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Saved results to {path}")
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Run micro-benchmarks and compare them against a baseline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--filter", help="only run benchmarks whose name starts with this")
+    run_parser.add_argument("--repeats", type=int, default=REPEATS)
+    run_parser.add_argument("--target", type=float, default=TARGET_SECONDS, help="seconds per repeat")
+    run_parser.add_argument("--save", help="write results to this JSON file")
+
+    compare_parser = commands.add_parser("compare", help="compare against a baseline, exit 1 on regressions")
+    compare_parser.add_argument("baseline", help="baseline JSON file")
+    compare_parser.add_argument("--current", help="results JSON file to compare, runs the benchmarks when omitted")
+    compare_parser.add_argument("--filter", help="only run benchmarks whose name starts with this")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slowdown of the median that counts as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.filter, args.repeats, args.target)
+        if args.save:
+            save(results, args.save)
+        return 0
+
+    baseline = load(args.baseline)
+    current = load(args.current) if args.current else run(args.filter)
+    if args.filter:
+        baseline["results"] = {name: result for name, result in baseline["results"].items()
+                               if name.startswith(args.filter)}
+    print()
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\nNo regressions above {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,68 @@
+"""Time activities.html rendering per activity.
+
+Run with ``python -m benchmarks.render_templates [--sizes 10,100,2000]``.
+Renders the activities page for generated deals of each size from the view
+models get_deal_view caches, and reports page bytes and milliseconds in
+total and per activity, plus how long compiling every template takes with a
+cold and a warm bytecode cache.
+"""
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+from typing import List
+
+from app.templating import create_templates, precompile_templates
+from app.activity_store import sort_activities_chronologically
+from app.activity_views import activity_view
+from benchmarks.generate_dataset import make_deal
+
+def time_precompile(cache_dir: str) -> float:
+    templates = create_templates(cache_dir=cache_dir)
+    templates.env.globals["static_url"] = lambda path: f"/static/{path}"
+    start = time.perf_counter()
+    precompile_templates(templates)
+    return time.perf_counter() - start
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Time activities.html rendering for deals of several sizes")
+    parser.add_argument("--sizes", default="10,100,2000", help="comma separated activity counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    cache_dir = tempfile.mkdtemp(prefix="template-cache-")
+    try:
+        cold = time_precompile(cache_dir)
+        warm = time_precompile(cache_dir)
+        print(f"precompile all templates: {cold * 1000:.1f} ms cold, {warm * 1000:.1f} ms from bytecode cache")
+
+        templates = create_templates(cache_dir=cache_dir)
+        templates.env.globals["static_url"] = lambda path: f"/static/{path}"
+        precompile_templates(templates)
+        template = templates.get_template("activities.html")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"{'activities':>10}{'bytes':>12}{'bytes/act':>11}{'ms':>10}{'ms/act':>10}")
+    for size in [int(size) for size in args.sizes.split(",")]:
+        deal = make_deal(random.Random(size), size, activity_count=size)
+        activities = [activity_view(activity) for activity in sort_activities_chronologically(deal["activities"])]
+        metadata = {key: value for key, value in deal.items() if key != "activities"}
+        metadata["activity_count"] = size
+        context = {"deal": metadata, "activities": activities, "deal_id": deal["deal_id"],
+                   "user_email": "synthetic-0@example.com", "progress": {"completed_count": 12}}
+
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            html = template.render(context)
+            timings.append(time.perf_counter() - start)
+        size_bytes = len(html.encode("utf-8"))
+        elapsed = min(timings) * 1000
+        print(f"{size:>10}{size_bytes:>12}{size_bytes / size:>11.0f}{elapsed:>10.2f}{elapsed / size:>10.4f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
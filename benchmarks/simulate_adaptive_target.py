@@ -0,0 +1,124 @@
+"""Simulate fixed vs adaptive annotation targets.
+
+Run with ``python -m benchmarks.simulate_adaptive_target [--deals N] [--seed S]``.
+Deals get a true score per field; annotators rate with noise, and a share of
+deals are contested (raters disagree much more). The fixed strategy collects
+the target on every deal; the adaptive strategy uses app.convergence to retire
+deals once their scores converge and spends the rest on contested ones.
+"""
+import sys
+import random
+import argparse
+from typing import Dict, List
+
+from app.models import RATING_FIELDS, TARGET_ANNOTATIONS_PER_DEAL
+from app.convergence import (
+    update_score_stats, deal_uncertainty, is_converged, assignment_priority, mean_scores,
+    DEFAULT_MIN_ANNOTATIONS, DEFAULT_MAX_HALF_WIDTH
+)
+
+CONTESTED_SHARE = 0.2
+RATER_NOISE = 0.35
+CONTESTED_RATER_NOISE = 1.2
+
+def make_deals(count: int, rng: random.Random) -> List[Dict]:
+    """Generate deals with true per-field scores"""
+    deals = []
+    for i in range(count):
+        deals.append({
+            "deal_id": f"sim_{i:05d}",
+            "truth": {field: rng.randint(1, 5) for field in RATING_FIELDS},
+            "noise": CONTESTED_RATER_NOISE if rng.random() < CONTESTED_SHARE else RATER_NOISE
+        })
+    return deals
+
+def rate(deal: Dict, rng: random.Random) -> Dict[str, Dict[str, int]]:
+    """One noisy annotator's ratings of a deal"""
+    ratings = {}
+    for field, truth in deal["truth"].items():
+        score = round(rng.gauss(truth, deal["noise"]))
+        ratings[field] = {"score": min(5, max(1, score))}
+    return ratings
+
+def accuracy(deals: List[Dict], stats_by_deal: Dict[str, Dict]) -> float:
+    """Share of fields whose rounded consensus score matches the truth"""
+    matches = total = 0
+    for deal in deals:
+        means = mean_scores(stats_by_deal[deal["deal_id"]])
+        for field, truth in deal["truth"].items():
+            total += 1
+            matches += field in means and round(means[field]) == truth
+    return matches / total if total else 0.0
+
+def run_fixed(deals: List[Dict], target: int, seed: int) -> Dict:
+    """Collect the target number of annotations on every deal"""
+    rng = random.Random(seed)
+    stats_by_deal = {}
+    for deal in deals:
+        stats = {}
+        for _ in range(target):
+            stats = update_score_stats(stats, added=rate(deal, rng))
+        stats_by_deal[deal["deal_id"]] = stats
+    return {"annotations": len(deals) * target, "accuracy": accuracy(deals, stats_by_deal)}
+
+def run_adaptive(deals: List[Dict], target: int, min_annotations: int, max_half_width: float, seed: int) -> Dict:
+    """Assign one annotation at a time by assignment_priority until every deal converges or hits the target"""
+    rng = random.Random(seed)
+    stats_by_deal = {deal["deal_id"]: {} for deal in deals}
+    counts = {deal["deal_id"]: 0 for deal in deals}
+    # Kept per deal like deal_progress.uncertainty, recomputed only when the deal is rated
+    uncertainty = {deal["deal_id"]: None for deal in deals}
+    by_id = {deal["deal_id"]: deal for deal in deals}
+    open_deals = set(by_id)
+    annotations = 0
+
+    while open_deals:
+        deal_id = min(open_deals, key=lambda d: (
+            assignment_priority(counts[d], uncertainty[d], min_annotations), d
+        ))
+        stats_by_deal[deal_id] = update_score_stats(stats_by_deal[deal_id], added=rate(by_id[deal_id], rng))
+        counts[deal_id] += 1
+        uncertainty[deal_id] = deal_uncertainty(stats_by_deal[deal_id])
+        annotations += 1
+        if counts[deal_id] >= target or is_converged(stats_by_deal[deal_id], min_annotations, max_half_width):
+            open_deals.discard(deal_id)
+
+    converged = sum(1 for deal_id in by_id if is_converged(stats_by_deal[deal_id], min_annotations, max_half_width))
+    return {"annotations": annotations, "accuracy": accuracy(deals, stats_by_deal), "converged_deals": converged}
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Simulate fixed vs adaptive annotation targets")
+    parser.add_argument("--deals", type=int, default=500)
+    parser.add_argument("--target", type=int, default=TARGET_ANNOTATIONS_PER_DEAL)
+    parser.add_argument("--min-annotations", type=int, default=DEFAULT_MIN_ANNOTATIONS)
+    parser.add_argument("--max-half-width", type=float, default=DEFAULT_MAX_HALF_WIDTH)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    deals = make_deals(args.deals, random.Random(args.seed))
+    fixed = run_fixed(deals, args.target, args.seed + 1)
+    adaptive = run_adaptive(deals, args.target, args.min_annotations, args.max_half_width, args.seed + 1)
+
+    # Smallest fixed target reaching the adaptive accuracy
+    matching = None
+    for target in range(1, args.target * 2 + 1):
+        result = run_fixed(deals, target, args.seed + 1)
+        if result["accuracy"] >= adaptive["accuracy"]:
+            matching = result
+            matching["target"] = target
+            break
+
+    saved = fixed["annotations"] - adaptive["annotations"]
+    print(f"{args.deals} deals, {len(RATING_FIELDS)} fields, {CONTESTED_SHARE:.0%} contested, target {args.target}")
+    print(f"fixed:    {fixed['annotations']:>7} annotations, accuracy {fixed['accuracy']:.3f}")
+    print(f"adaptive: {adaptive['annotations']:>7} annotations, accuracy {adaptive['accuracy']:.3f} "
+          f"({adaptive['converged_deals']} deals converged)")
+    print(f"saved:    {saved:>7} annotations ({saved / fixed['annotations']:.1%}), "
+          f"accuracy change {adaptive['accuracy'] - fixed['accuracy']:+.3f}")
+    if matching:
+        print(f"equal accuracy: fixed needs target {matching['target']} = {matching['annotations']} annotations, "
+              f"adaptive saves {matching['annotations'] - adaptive['annotations']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))